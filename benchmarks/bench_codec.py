@@ -0,0 +1,52 @@
+# benchmarks/bench_codec.py
+"""
+Сравнение JSON-кодеков (stdlib / orjson / msgspec) на событиях
+реалистичного размера: разбор тела входящего сообщения и сериализация
+исходящего события.
+
+Запуск: PYTHONPATH=src python benchmarks/bench_codec.py
+"""
+import json
+import timeit
+
+from music_adapter.core.codec import get_codec
+
+LINE = "Я помню чудное мгновенье: передо мной явилась ты\n"
+
+def make_event(text_bytes: int) -> dict:
+    text = LINE * max(1, text_bytes // len(LINE.encode()))
+    return {
+        "id": "7f2c1e9a",
+        "title": "Song",
+        "text": text,
+        "length": 215.5,
+        "authors": ["Author One", "Author Two"],
+        "metadata": {"platform": "spotify", "timestamp": "2025-05-10T12:00:00Z"},
+        "generate_type": "image",
+    }
+
+def _legacy_dumps(obj):
+    return json.dumps(obj).encode()
+
+def main():
+    codecs = []
+    for name in ("json", "orjson", "msgspec"):
+        try:
+            codecs.append(get_codec(name))
+        except ValueError:
+            print(f"{name}: not installed, skipped")
+    print(f"{'size':>8} {'codec':<8} {'loads us':>10} {'dumps us':>10}")
+    for size in (1_000, 10_000, 100_000):
+        event = make_event(size)
+        body = _legacy_dumps(event)
+        number = max(20, 200_000 // size)
+        legacy_loads = min(timeit.repeat(lambda: json.loads(body), number=number, repeat=3)) / number
+        legacy_dumps = min(timeit.repeat(lambda: _legacy_dumps(event), number=number, repeat=3)) / number
+        print(f"{len(body):>8} {'legacy':<8} {legacy_loads * 1e6:>10.1f} {legacy_dumps * 1e6:>10.1f}")
+        for name, loads, dumps in codecs:
+            t_loads = min(timeit.repeat(lambda: loads(body), number=number, repeat=3)) / number
+            t_dumps = min(timeit.repeat(lambda: dumps(event), number=number, repeat=3)) / number
+            print(f"{len(body):>8} {name:<8} {t_loads * 1e6:>10.1f} {t_dumps * 1e6:>10.1f}")
+
+if __name__ == "__main__":
+    main()
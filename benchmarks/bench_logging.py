@@ -0,0 +1,97 @@
+# benchmarks/bench_logging.py
+"""
+Стоимость записи лога о событии для вызывающего потока (event loop):
+синхронный StreamHandler с f-строкой (как было) против очереди с фоновым
+JSON-писателем, с сэмплированием и без. Приёмник — /dev/null и «медленный»
+stdout (каждая запись ждёт --slow-write-us микросекунд).
+
+Запуск: PYTHONPATH=src python benchmarks/bench_logging.py --messages 50000
+"""
+import argparse
+import logging
+import os
+import queue
+import time
+
+from music_adapter.logger import (
+    LOG_DROPPED, BoundedQueueHandler, DrainingQueueListener, EventSampler, JsonFormatter
+)
+
+class SlowStream:
+    """Поток вывода, каждая запись которого занимает delay секунд (медленный коллектор)."""
+    def __init__(self, delay: float):
+        self._delay = delay
+        self._sink = open(os.devnull, "w")
+
+    def write(self, text: str) -> None:
+        time.sleep(self._delay)
+        self._sink.write(text)
+
+    def flush(self) -> None:
+        self._sink.flush()
+
+def _dropped() -> dict:
+    return {r: LOG_DROPPED.labels(reason=r)._value.get() for r in ("sampled", "overflow")}
+
+def run(mode: str, stream, messages: int, queue_size: int, sample_rate: float) -> dict:
+    logger = logging.getLogger(f"bench.{mode}.{time.perf_counter_ns()}")
+    logger.propagate = False
+    logger.setLevel(logging.INFO)
+    stream_handler = logging.StreamHandler(stream)
+    listener = None
+    if mode == "sync":
+        stream_handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s [%(name)s] %(message)s"))
+        logger.addHandler(stream_handler)
+    else:
+        stream_handler.setFormatter(JsonFormatter())
+        records: queue.Queue = queue.Queue(maxsize=queue_size)
+        handler = BoundedQueueHandler(records)
+        if sample_rate < 1.0:
+            handler.addFilter(EventSampler(sample_rate))
+        logger.addHandler(handler)
+        listener = DrainingQueueListener(records, stream_handler)
+        listener.start()
+
+    dropped = _dropped()
+    start = time.perf_counter()
+    for i in range(messages):
+        event_id = f"{i:08x}"
+        total = 0.123
+        if mode == "sync":
+            logger.info(f"Event {event_id} processed in {total:.2f}s")
+        else:
+            logger.info("Event %s processed in %.2fs", event_id, total, extra={"event_id": event_id})
+    caller = time.perf_counter() - start
+    if listener is not None:
+        listener.stop()
+    for handler in list(logger.handlers):
+        logger.removeHandler(handler)
+    return {
+        "caller_us_per_msg": round(caller / messages * 1e6, 2),
+        "total_s": round(time.perf_counter() - start, 3),
+        **{reason: int(value - dropped[reason]) for reason, value in _dropped().items()},
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--messages", type=int, default=50000)
+    parser.add_argument("--queue-size", type=int, default=10000)
+    parser.add_argument("--slow-write-us", type=float, default=50.0)
+    args = parser.parse_args()
+
+    sinks = {
+        "devnull": lambda: open(os.devnull, "w"),
+        "slow": lambda: SlowStream(args.slow_write_us / 1e6),
+    }
+    modes = [("sync", 1.0), ("queue", 1.0), ("queue_sampled_10pct", 0.1)]
+    print(f"{'sink':8} {'mode':22} {'caller µs/msg':>14} {'total s':>9} {'sampled':>8} {'overflow':>9}")
+    for sink_name, make_sink in sinks.items():
+        for mode, rate in modes:
+            result = run(mode.split("_")[0], make_sink(), args.messages, args.queue_size, rate)
+            print(
+                f"{sink_name:8} {mode:22} {result['caller_us_per_msg']:>14} "
+                f"{result['total_s']:>9} {result['sampled']:>8} {result['overflow']:>9}"
+            )
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+# benchmarks/bench_schema_validator.py
+"""
+Микробенчмарк валидации событий: jsonschema.validate() на каждое событие
+против предкомпилированного валидатора (с fast-path и без).
+
+Запуск: PYTHONPATH=src python benchmarks/bench_schema_validator.py
+(переменные окружения как в .env.example)
+"""
+import timeit
+from jsonschema import validate, ValidationError
+
+from music_adapter.core import schema_validator
+from music_adapter.core.schema_validator import _load_schema, validate_event, validate_many
+
+VALID = {
+    "id": "1",
+    "title": "Song",
+    "text": "lyrics " * 200,
+    "length": 215.5,
+    "authors": ["A", "B"],
+    "metadata": {"platform": "p", "timestamp": "2025-05-10T12:00:00Z"},
+}
+INVALID = {"id": "1", "title": "Song", "text": "lyrics"}
+N = 5000
+
+def _legacy(event):
+    try:
+        validate(instance=event, schema=_load_schema())
+    except ValidationError:
+        pass
+
+def _current(event):
+    try:
+        validate_event(event)
+    except ValueError:
+        pass
+
+def _bench(name, fn, event):
+    seconds = min(timeit.repeat(lambda: fn(event), number=N, repeat=3))
+    print(f"{name:<32} {seconds / N * 1e6:10.2f} us/event")
+
+def main():
+    for label, event in (("valid", VALID), ("invalid", INVALID)):
+        print(f"--- {label} event")
+        _bench("jsonschema.validate", _legacy, event)
+        schema_validator.settings.SCHEMA_FAST_PATH = False
+        schema_validator._get_fast_path.cache_clear()
+        _bench("compiled validator", _current, event)
+        schema_validator.settings.SCHEMA_FAST_PATH = True
+        schema_validator._get_fast_path.cache_clear()
+        _bench("compiled + fast-path", _current, event)
+    batch = [VALID, INVALID] * 500
+    seconds = min(timeit.repeat(lambda: validate_many(batch), number=5, repeat=3)) / 5
+    print(f"--- validate_many({len(batch)}): {seconds / len(batch) * 1e6:.2f} us/event")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+# benchmarks/bench_tracing.py
+"""
+Стоимость трассировки на событие: handle_message и два дочерних
+HTTP-спана при экспорте всех трасс и с хвостовым сэмплированием
+(TailSamplingProcessor). Экспортёр кодирует спаны в OTLP protobuf, как
+OTLPSpanExporter, но без сети; процессор — синхронный, так что время —
+весь CPU трассировки, который при BatchSpanProcessor делится между
+event loop и фоновым потоком. Доля ошибок и медленных событий задаётся
+флагами — они экспортируются всегда.
+
+Запуск: PYTHONPATH=src python benchmarks/bench_tracing.py --events 20000
+"""
+import argparse
+import random
+import time
+
+from opentelemetry import trace
+from opentelemetry.exporter.otlp.proto.common.trace_encoder import encode_spans
+from opentelemetry.sdk.trace import TracerProvider
+from opentelemetry.sdk.trace.export import SimpleSpanProcessor, SpanExporter, SpanExportResult
+from opentelemetry.trace import Status, StatusCode
+
+from music_adapter.core.tail_sampling import TailSamplingProcessor
+
+class EncodingExporter(SpanExporter):
+    """Сериализует спаны в OTLP protobuf и считает байты."""
+
+    def __init__(self):
+        self.spans = 0
+        self.bytes = 0
+
+    def export(self, spans):
+        self.spans += len(spans)
+        self.bytes += len(encode_spans(spans).SerializeToString())
+        return SpanExportResult.SUCCESS
+
+    def shutdown(self):
+        pass
+
+def run(name: str, events: int, error_rate: float, slow_rate: float, sample_rate=None):
+    exporter = EncodingExporter()
+    processor = SimpleSpanProcessor(exporter)
+    if sample_rate is not None:
+        processor = TailSamplingProcessor(processor, sample_rate=sample_rate, latency_threshold=2.0)
+    provider = TracerProvider(shutdown_on_exit=False)
+    provider.add_span_processor(processor)
+    tracer = provider.get_tracer("bench")
+    rnd = random.Random(1)
+
+    start = time.process_time()
+    for i in range(events):
+        slow = rnd.random() < slow_rate
+        root = tracer.start_span("handle_message", start_time=time.time_ns() - (3 * 10**9 if slow else 0))
+        root.set_attribute("event.id", f"e{i}")
+        with trace.use_span(root, end_on_exit=False):
+            for service in ("preprocessor", "generator"):
+                with tracer.start_as_current_span(f"HTTP POST {service}"):
+                    pass
+        if rnd.random() < error_rate:
+            root.set_status(Status(StatusCode.ERROR, "503"))
+        root.end()
+    elapsed = time.process_time() - start
+    provider.shutdown()
+    print(
+        f"{name:<16} {elapsed / events * 1e6:>10.1f} {exporter.spans:>10} "
+        f"{exporter.bytes / 1024:>10.0f}"
+    )
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--events", type=int, default=20000)
+    parser.add_argument("--error-rate", type=float, default=0.01)
+    parser.add_argument("--slow-rate", type=float, default=0.01)
+    args = parser.parse_args()
+    print(f"{'mode':<16} {'us/event':>10} {'spans':>10} {'KiB':>10}")
+    run("export all", args.events, args.error_rate, args.slow_rate)
+    for rate in (0.1, 0.01):
+        run(f"tail {rate:g}", args.events, args.error_rate, args.slow_rate, sample_rate=rate)
+
+if __name__ == "__main__":
+    main()
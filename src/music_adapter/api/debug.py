@@ -0,0 +1,40 @@
+# src/music_adapter/api/debug.py
+import asyncio
+import math
+from aiohttp import web
+
+from music_adapter.config.settings import get_settings
+from music_adapter.core.profiler import sample_stacks, to_folded
+
+settings = get_settings()
+_profiling = False
+MIN_INTERVAL = 0.001  # чаще — поток профайлера крутится вхолостую и отнимает GIL
+
+async def profile(request: web.Request) -> web.Response:
+    """
+    GET /debug/profile?seconds=N[&interval_ms=M] → свёрнутые стеки
+    ("a;b;c 42" на строку) для flamegraph.pl / speedscope. seconds — не
+    больше PROFILE_MAX_SECONDS, interval_ms — не меньше 1 мс.
+    Профайлер работает в отдельном потоке; одновременно — один запуск.
+    """
+    global _profiling
+    try:
+        seconds = float(request.query.get("seconds", 10))
+        interval = float(request.query.get("interval_ms", settings.PROFILE_INTERVAL_MS)) / 1000
+    except ValueError:
+        return web.json_response({"error": "seconds and interval_ms must be numbers"}, status=400)
+    if not (math.isfinite(seconds) and math.isfinite(interval)) or seconds <= 0 or interval <= 0:
+        return web.json_response({"error": "seconds and interval_ms must be positive"}, status=400)
+    seconds = min(seconds, settings.PROFILE_MAX_SECONDS)
+    interval = max(interval, MIN_INTERVAL)
+    if _profiling:
+        return web.json_response({"error": "profile already running"}, status=409)
+    _profiling = True
+    try:
+        counts = await asyncio.to_thread(sample_stacks, seconds, interval)
+    finally:
+        _profiling = False
+    return web.Response(text=to_folded(counts), content_type="text/plain")
+
+def add_debug_routes(app: web.Application) -> None:
+    app.router.add_get("/debug/profile", profile)
@@ -1,6 +1,7 @@
 # src/music_adapter/api/health.py
+import logging
 from aiohttp import web
-from prometheus_client import generate_latest, CONTENT_TYPE_LATEST
+from prometheus_client import generate_latest, CONTENT_TYPE_LATEST, REGISTRY
 
 async def health(request):
     """
@@ -9,22 +10,50 @@ async def health(request):
     """
     return web.json_response({"status": "ok"})
 
+async def ready(request):
+    """
+    GET /ready → готовность принимать трафик.
+    app["ready_check"]() возвращает {проверка: bool}; 503, если хоть одна не прошла.
+    """
+    check = request.app.get("ready_check")
+    checks = check() if check is not None else {}
+    ok = all(checks.values())
+    return web.json_response(
+        {"status": "ready" if ok else "not_ready", "checks": checks},
+        status=200 if ok else 503
+    )
+
 async def metrics(request):
     """
     Проброс /metrics для Prometheus.
+    Реестр берётся из app["registry"] (в multiprocess-режиме — агрегирующий).
     """
-    data = generate_latest()
-    return web.Response(body=data, content_type=CONTENT_TYPE_LATEST)
+    data = generate_latest(request.app.get("registry", REGISTRY))
+    # CONTENT_TYPE_LATEST содержит charset — aiohttp не принимает его в content_type
+    return web.Response(body=data, headers={"Content-Type": CONTENT_TYPE_LATEST})
 
-def run_health_server(host: str = "0.0.0.0", port: int = None):
-    from music_adapter.config.settings import get_settings
-    settings = get_settings()
+def create_app(registry=None, health_handler=health, ready_check=None) -> web.Application:
     app = web.Application()
-    app.router.add_get("/health", health)
+    if registry is not None:
+        app["registry"] = registry
+    if ready_check is not None:
+        app["ready_check"] = ready_check
+    app.router.add_get("/health", health_handler)
+    app.router.add_get("/ready", ready)
     app.router.add_get("/metrics", metrics)
+    return app
+
+async def start_health_server(
+    app: web.Application,
+    host: str = "0.0.0.0",
+    port: int = None
+) -> web.AppRunner:
+    """Запустить health-сервер в текущем (уже работающем) event loop."""
+    from music_adapter.config.settings import get_settings
+    settings = get_settings()
     runner = web.AppRunner(app)
-    loop = runner.loop  # aiohttp internal loop
-    loop.run_until_complete(runner.setup())
+    await runner.setup()
     site = web.TCPSite(runner, host, port or settings.HEALTH_PORT)
-    loop.run_until_complete(site.start())
-    print(f"Health endpoint listening on {host}:{port or settings.HEALTH_PORT}")
\ No newline at end of file
+    await site.start()
+    logging.getLogger(__name__).info(f"Health endpoint listening on {host}:{port or settings.HEALTH_PORT}")
+    return runner
@@ -0,0 +1,39 @@
+# src/music_adapter/api/jobs.py
+import hashlib
+import hmac
+import json
+from typing import Any, Awaitable, Callable, Dict
+from aiohttp import web
+
+SIGNATURE_HEADER = "X-Signature-256"
+
+def sign(secret: str, body: bytes) -> str:
+    """Значение SIGNATURE_HEADER: sha256=<hex HMAC-SHA256 тела на общем секрете>."""
+    return "sha256=" + hmac.new(secret.encode(), body, hashlib.sha256).hexdigest()
+
+def job_callback(on_result: Callable[[str, Dict[str, Any]], Awaitable[bool]], secret: str):
+    """
+    Webhook завершения задачи генерации.
+    POST /jobs/callback {"job_id": str, "status": str, "url"?: str, "error"?: str}
+    с подписью тела в SIGNATURE_HEADER (JOB_CALLBACK_SECRET)
+    → 200 {"accepted": bool}; accepted=false — задача неизвестна или уже завершена.
+    Без подписи или с неверной подписью — 401.
+    """
+    async def handler(request: web.Request) -> web.Response:
+        raw = await request.read()
+        signature = request.headers.get(SIGNATURE_HEADER, "")
+        if not hmac.compare_digest(signature.encode(), sign(secret, raw).encode()):
+            return web.json_response({"error": "invalid signature"}, status=401)
+        try:
+            body = json.loads(raw)
+            job_id = body["job_id"]
+        except (ValueError, KeyError, TypeError):
+            return web.json_response({"error": "job_id is required"}, status=400)
+        accepted = await on_result(str(job_id), body)
+        return web.json_response({"accepted": accepted})
+    return handler
+
+def add_job_routes(app: web.Application, on_result, secret: str) -> None:
+    if not secret:
+        raise ValueError("Job callback requires a non-empty secret")
+    app.router.add_post("/jobs/callback", job_callback(on_result, secret))
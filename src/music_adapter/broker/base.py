@@ -0,0 +1,213 @@
+# src/music_adapter/broker/base.py
+import asyncio
+import logging
+from abc import ABC, abstractmethod
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+from music_adapter.config.settings import get_settings
+from music_adapter.core.compression import compress
+
+settings = get_settings()
+
+log = logging.getLogger(__name__)
+
+class OutboundMessage:
+    """Сообщение для publish_batch: routing key (топик Kafka), тело, заголовки."""
+    __slots__ = ("routing_key", "body", "headers", "content_type", "content_encoding")
+
+    def __init__(
+        self,
+        routing_key: str,
+        body: bytes,
+        headers: Optional[Dict[str, Any]] = None,
+        content_type: Optional[str] = None,
+        content_encoding: Optional[str] = None
+    ):
+        self.routing_key = routing_key
+        self.body = body
+        self.headers = headers or {}
+        self.content_type = content_type
+        self.content_encoding = content_encoding
+
+async def drain_queue(queue: asyncio.Queue, max_messages: int, timeout: float) -> List[Any]:
+    """Первое сообщение ждём до timeout, остальное — что уже лежит в очереди."""
+    try:
+        first = await asyncio.wait_for(queue.get(), timeout)
+    except asyncio.TimeoutError:
+        return []
+    batch = [first]
+    while len(batch) < max_messages and not queue.empty():
+        batch.append(queue.get_nowait())
+    return batch
+
+class _BatchConsumer:
+    """
+    Цикл consume_batch → обработчик на каждое сообщение (отдельной
+    задачей, задачи держатся в handlers до завершения). Неподтверждённых
+    сообщений не больше prefetch: слот освобождается, когда бэкенд
+    вызывает _release() при ack/reject.
+    """
+    def __init__(
+        self,
+        backend: "BrokerBackend",
+        queue: str,
+        handler: Callable[[Any], Any],
+        prefetch: Optional[int]
+    ):
+        self.backend = backend
+        self.queue = queue
+        self.handler = handler
+        self.prefetch = prefetch
+        self.unsettled = 0
+        self.slot_freed = asyncio.Event()
+        self.task: Optional[asyncio.Task] = None
+        self.handlers: Set[asyncio.Task] = set()
+
+    def limit(self) -> int:
+        return self.prefetch or self.backend._prefetch
+
+    def release(self) -> None:
+        self.unsettled -= 1
+        self.slot_freed.set()
+
+    async def run(self) -> None:
+        while True:
+            while self.unsettled >= self.limit():
+                self.slot_freed.clear()
+                await self.slot_freed.wait()
+            batch = await self.backend.consume_batch(
+                self.queue, self.limit() - self.unsettled, self.backend.poll_timeout
+            )
+            for msg in batch:
+                self.unsettled += 1
+                msg.consumer = self
+                task = asyncio.ensure_future(self.handler(msg))
+                self.handlers.add(task)
+                task.add_done_callback(self._handler_done)
+
+    def _handler_done(self, task: asyncio.Task) -> None:
+        self.handlers.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            log.error(f"Unhandled error in handler for {self.queue}", exc_info=task.exception())
+
+class BrokerBackend(ABC):
+    """
+    Интерфейс брокера: connect, consume_batch, publish_batch, commit, close.
+
+    Сообщения из consume_batch имеют интерфейс входящего сообщения
+    aio-pika (body, headers, content_type, content_encoding, delivery_tag,
+    ack(), reject()).
+    commit() подтверждает обработанные сообщения (ack в AMQP, коммит
+    смещений в Kafka); ack() сообщения — commit() одного сообщения.
+
+    Поверх этого — API, которым пользуется MusicAdapter: subscribe()
+    с обработчиком на сообщение и prefetch, publish/publish_dlq. Бэкенд
+    с собственным push-потребителем (RabbitMQ) может переопределить
+    subscribe().
+    """
+    poll_timeout = 0.1  # сколько consume_batch ждёт первое сообщение
+    # бэкенд реализует publish_retry(routing_key, body, headers, content_type, delay,
+    # content_encoding) — возврат сообщения в очередь через delay секунд (RETRY_ENABLED)
+    delayed_retry = False
+
+    def __init__(self, prefetch: int, dlq: str = "dlq"):
+        self._prefetch = prefetch
+        self._dlq = dlq
+        self._batch_consumers: List[_BatchConsumer] = []
+
+    @abstractmethod
+    async def connect(self) -> None:
+        ...
+
+    @abstractmethod
+    async def consume_batch(self, queue_name: str, max_messages: int, timeout: float) -> List[Any]:
+        """До max_messages сообщений; ждёт первое не дольше timeout секунд."""
+
+    @abstractmethod
+    async def publish_batch(self, messages: List[OutboundMessage]) -> None:
+        """Отправить пачку; возвращается, когда брокер подтвердил все сообщения."""
+
+    @abstractmethod
+    async def commit(self, messages: List[Any]) -> None:
+        """Подтвердить обработку сообщений, полученных из consume_batch."""
+
+    @abstractmethod
+    async def close(self) -> None:
+        ...
+
+    @abstractmethod
+    def is_connected(self) -> bool:
+        """Соединение с брокером установлено (для /ready)."""
+
+    @property
+    def dlq(self) -> str:
+        """Имя очереди (топика) недоставленных сообщений."""
+        return self._dlq
+
+    def is_consuming(self) -> bool:
+        """Есть работающие подписки (для /ready)."""
+        return any(not c.task.done() for c in self._batch_consumers)
+
+    def _release(self, msg: Any) -> None:
+        """Вызывается бэкендом, когда сообщение подтверждено или отклонено."""
+        consumer = getattr(msg, "consumer", None)
+        if isinstance(consumer, _BatchConsumer):
+            consumer.release()
+
+    async def set_prefetch(self, count: int) -> None:
+        self._prefetch = count
+        for consumer in self._batch_consumers:
+            consumer.slot_freed.set()
+
+    async def subscribe(
+        self,
+        queue_name: str,
+        handler: Callable[[Any], Any],
+        prefetch: Optional[int] = None
+    ) -> None:
+        consumer = _BatchConsumer(self, queue_name, handler, prefetch)
+        consumer.task = asyncio.ensure_future(consumer.run())
+        self._batch_consumers.append(consumer)
+        log.info(f"Subscribed to queue {queue_name}")
+
+    async def stop_consuming(self, timeout: float = 10.0) -> None:
+        """
+        Остановить циклы подписок и подождать обработчики уже выданных
+        сообщений не дольше timeout; оставшиеся доработают сами (0 — не
+        ждать, если вызывающий дожидается обработки сам).
+        """
+        for consumer in self._batch_consumers:
+            consumer.task.cancel()
+        await asyncio.gather(*(c.task for c in self._batch_consumers), return_exceptions=True)
+        handlers = set().union(*(c.handlers for c in self._batch_consumers))
+        self._batch_consumers.clear()
+        if handlers and timeout > 0:
+            _, pending = await asyncio.wait(handlers, timeout=timeout)
+            if pending:
+                log.warning(f"{len(pending)} message handlers still running after {timeout}s")
+
+    @staticmethod
+    def _compress(body: bytes, content_encoding: Optional[str]) -> Tuple[bytes, Optional[str]]:
+        """Сжатие исходящего тела (COMPRESSION_BROKER); уже закодированное тело не трогается."""
+        if content_encoding is None and settings.COMPRESSION_BROKER:
+            return compress(body, "broker")
+        return body, content_encoding
+
+    async def publish(
+        self,
+        routing_key: str,
+        body: bytes,
+        headers: Optional[Dict[str, str]] = None,
+        content_type: Optional[str] = None,
+        content_encoding: Optional[str] = None
+    ) -> None:
+        body, content_encoding = self._compress(body, content_encoding)
+        await self.publish_batch([OutboundMessage(routing_key, body, headers, content_type, content_encoding)])
+
+    async def publish_dlq(
+        self,
+        body: bytes,
+        headers: Optional[Dict[str, str]] = None,
+        content_encoding: Optional[str] = None
+    ) -> None:
+        await self.publish(self._dlq, body, headers, content_encoding=content_encoding)
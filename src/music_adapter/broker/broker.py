@@ -1,40 +1,73 @@
 # src/music_adapter/broker/broker.py
 import asyncio
 import logging
-from typing import Callable, Optional, Dict
+from typing import Any, Callable, List, Optional, Dict
 from aio_pika import connect_robust, IncomingMessage, Message, ExchangeType
 from aio_pika.abc import AbstractIncomingMessage
 
+from music_adapter.broker.base import BrokerBackend, OutboundMessage, drain_queue
+from music_adapter.broker.publisher import Publisher
+from music_adapter.broker.spool import PublishSpool, SpooledMessage, SpoolFullError
 from music_adapter.config.settings import get_settings
+from music_adapter.core.retry import parse_retry_delays, tier_name
 from music_adapter.core.utils import retry_with_backoff
 
 settings = get_settings()
 log = logging.getLogger(__name__)
 
-class Broker:
+class Broker(BrokerBackend):
     """
-    Подключается к AMQP, умеет retry/backoff при старте,
+    RabbitMQ-бэкенд. Подключается к AMQP, умеет retry/backoff при старте,
     автоматически пересоединяется, создаёт DLX и DLQ.
+    С SPOOL_ENABLED неудавшиеся публикации пишутся в PublishSpool и
+    отправляются после переподключения (и периодически, пока спул не пуст).
+    С RETRY_ENABLED объявляются очереди уровней задержки для publish_retry.
     """
+    delayed_retry = True
+
     def __init__(self):
+        super().__init__(settings.BROKER_PREFETCH, dlq="dlq")
         self._conn = None
         self._channel = None
         self._exchange = None
+        self._exchange_name = settings.IN_TOPIC + ".exchange"
+        self._publisher = Publisher(
+            settings.BROKER_PUBLISH_CHANNELS, settings.BROKER_PUBLISH_MAX_PENDING
+        )
+        self._consumers = []  # (queue, consumer_tag)
+        self._extra_channels = []  # каналы очередей со своим prefetch
+        self._buffers: Dict[str, asyncio.Queue] = {}  # очереди, читаемые через consume_batch
         self._dlx = "dlx"
-        self._dlq = "dlq"
+        self._retry_delays = parse_retry_delays(settings.RETRY_DELAYS) if settings.RETRY_ENABLED else []
+        self._spool: Optional[PublishSpool] = None
+        if settings.SPOOL_ENABLED:
+            self._spool = PublishSpool(
+                settings.SPOOL_DIR,
+                segment_bytes=settings.SPOOL_SEGMENT_BYTES,
+                max_bytes=settings.SPOOL_MAX_BYTES,
+                fsync=settings.SPOOL_FSYNC,
+                fsync_interval=settings.SPOOL_FSYNC_INTERVAL,
+            )
+        self._spool_task: Optional[asyncio.Task] = None
+        self._spool_wakeup = asyncio.Event()
 
     async def connect(self):
         """Попытаться подключиться с retry/backoff."""
         await retry_with_backoff(self._connect_once, retries=5, base_delay=1.0)
+        if self._spool is not None:
+            if self._spool_task is None:
+                self._spool_task = asyncio.create_task(self._replay_loop())
+            self._spool_wakeup.set()
 
     async def _connect_once(self):
         self._conn = await connect_robust(settings.BROKER_URL)
         self._channel = await self._conn.channel()
-        await self._channel.set_qos(prefetch_count=settings.BROKER_PREFETCH)
+        # global_: лимит на канал применяется и к уже запущенному потребителю
+        await self._channel.set_qos(prefetch_count=self._prefetch, global_=True)
 
         # Основной exchange (прямого типа) и DLX + DLQ
         self._exchange = await self._channel.declare_exchange(
-            settings.IN_TOPIC + ".exchange", ExchangeType.DIRECT, durable=True
+            self._exchange_name, ExchangeType.DIRECT, durable=True
         )
         dlx_ex = await self._channel.declare_exchange(
             self._dlx, ExchangeType.FANOUT, durable=True
@@ -43,12 +76,54 @@ class Broker:
             self._dlq, durable=True
         )
         await dlq_queue.bind(dlx_ex)
+        await self._declare_retry_tiers()
+
+        # Публикация — через отдельные confirm-каналы, не через канал потребителя
+        await self._publisher.open(self._conn)
 
         log.info("Broker connected, exchange and DLQ declared")
 
         # Переподписаться на закрытие
         self._conn.add_close_callback(lambda exc: asyncio.create_task(self._on_disconnect(exc)))
 
+    async def _declare_retry_tiers(self) -> None:
+        """
+        Уровень задержки — fanout exchange и очередь с TTL без потребителей.
+        Истёкшее сообщение dead-letter'ится в основной exchange с исходным
+        routing key, т.е. обратно в очередь, откуда оно пришло. TTL у всех
+        сообщений уровня один, поэтому они истекают по порядку с головы.
+        """
+        for delay in self._retry_delays:
+            name = tier_name(settings.IN_TOPIC, delay)
+            tier_ex = await self._channel.declare_exchange(name, ExchangeType.FANOUT, durable=True)
+            tier_queue = await self._channel.declare_queue(
+                name,
+                durable=True,
+                arguments={
+                    "x-message-ttl": int(round(delay * 1000)),
+                    "x-dead-letter-exchange": self._exchange_name,
+                }
+            )
+            await tier_queue.bind(tier_ex)
+        if self._retry_delays:
+            log.info(f"Retry tiers declared: {', '.join(f'{d:g}s' for d in self._retry_delays)}")
+
+    def is_connected(self) -> bool:
+        return self._conn is not None and not self._conn.is_closed
+
+    def is_consuming(self) -> bool:
+        return bool(self._consumers) and self._channel is not None and not self._channel.is_closed
+
+    async def set_prefetch(self, count: int) -> None:
+        """
+        Изменить QoS канала на лету (сохраняется и при переподключении).
+        QoS на потребителя (global=false) RabbitMQ применяет только к
+        потребителям, созданным после вызова, поэтому лимит — на весь канал.
+        """
+        self._prefetch = count
+        if self._channel and not self._channel.is_closed:
+            await self._channel.set_qos(prefetch_count=count, global_=True)
+
     async def _on_disconnect(self, exc):
         log.warning(f"Broker connection closed: {exc}, reconnecting...")
         await asyncio.sleep(2)
@@ -57,47 +132,179 @@ class Broker:
     async def subscribe(
         self,
         queue_name: str,
-        handler: Callable[[AbstractIncomingMessage], None]
+        handler: Callable[[AbstractIncomingMessage], None],
+        prefetch: Optional[int] = None
     ) -> None:
         """
-        Подписаться на очередь с DLX-настройкой.
+        Подписаться на очередь с DLX-настройкой (push-потребитель aio-pika,
+        без цикла consume_batch).
         Все не ack’нутые месседжи уйдут на DLX.
+        prefetch — отдельный канал со своим QoS (очереди lane'ов),
+        иначе общий канал с BROKER_PREFETCH.
         """
-        # очередь с dead-letter-exchange
-        queue = await self._channel.declare_queue(
-            queue_name,
-            durable=True,
-            arguments={"x-dead-letter-exchange": self._dlx}
-        )
-        await queue.bind(self._exchange, routing_key=queue_name)
-        await queue.consume(handler, no_ack=False)
+        channel = self._channel
+        if prefetch is not None:
+            channel = await self._conn.channel()
+            await channel.set_qos(prefetch_count=prefetch)
+            self._extra_channels.append(channel)
+        if queue_name == self._dlq:
+            # DLQ (music_adapter.replay) объявлена при подключении: без DLX, привязана к dlx
+            queue = await channel.declare_queue(queue_name, durable=True)
+        else:
+            # очередь с dead-letter-exchange
+            queue = await channel.declare_queue(
+                queue_name,
+                durable=True,
+                arguments={"x-dead-letter-exchange": self._dlx}
+            )
+            await queue.bind(self._exchange, routing_key=queue_name)
+        tag = await queue.consume(handler, no_ack=False)
+        self._consumers.append((queue, tag))
         log.info(f"Subscribed to queue {queue_name}")
 
+    async def consume_batch(
+        self, queue_name: str, max_messages: int, timeout: float
+    ) -> List[AbstractIncomingMessage]:
+        """
+        Пачка из буфера push-потребителя; число неподтверждённых
+        сообщений ограничено QoS канала.
+        """
+        buffer = self._buffers.get(queue_name)
+        if buffer is None:
+            buffer = self._buffers[queue_name] = asyncio.Queue()
+            await self.subscribe(queue_name, buffer.put)
+        return await drain_queue(buffer, max_messages, timeout)
+
+    async def commit(self, messages: List[AbstractIncomingMessage]) -> None:
+        for msg in messages:
+            await msg.ack()
+
+    async def stop_consuming(self, timeout: float = 10.0) -> None:
+        """
+        Отменить подписки, не закрывая канал (для ack уже принятых).
+        Обработчики доставленных сообщений — задачи aio-pika, их дожидается
+        вызывающий (MusicAdapter._wait_handlers), timeout не используется.
+        """
+        for queue, tag in self._consumers:
+            try:
+                await queue.cancel(tag)
+            except Exception as e:
+                log.warning(f"Failed to cancel consumer {tag}: {e}")
+        self._consumers.clear()
+
     async def publish(
         self,
         routing_key: str,
         body: bytes,
-        headers: Optional[Dict[str, str]] = None
+        headers: Optional[Dict[str, str]] = None,
+        content_type: Optional[str] = None,
+        content_encoding: Optional[str] = None
     ) -> None:
         """
         Публикация в основной exchange.
+        Возвращается после publisher confirm от брокера.
+        С COMPRESSION_BROKER тело сжимается, алгоритм — в свойстве content_encoding.
         """
-        msg = Message(body, headers=headers or {})
-        await self._exchange.publish(msg, routing_key=routing_key)
+        body, content_encoding = self._compress(body, content_encoding)
+        msg = Message(body, headers=headers or {}, content_type=content_type, content_encoding=content_encoding)
+        await self._publish_or_spool(self._exchange_name, msg, routing_key)
+
+    async def publish_batch(self, messages: List[OutboundMessage]) -> None:
+        """Пачка публикаций в основной exchange, ждёт confirm всех."""
+        await asyncio.gather(*(
+            self.publish(m.routing_key, m.body, m.headers, m.content_type, m.content_encoding)
+            for m in messages
+        ))
 
     async def publish_dlq(
         self,
         body: bytes,
-        headers: Optional[Dict[str, str]] = None
+        headers: Optional[Dict[str, str]] = None,
+        content_encoding: Optional[str] = None
     ) -> None:
         """
         Явная отправка в DLQ (если нужно).
         """
-        dlx_ex = await self._channel.get_exchange(self._dlx)
-        msg = Message(body, headers=headers or {})
-        await dlx_ex.publish(msg, routing_key="")
+        body, content_encoding = self._compress(body, content_encoding)
+        msg = Message(body, headers=headers or {}, content_encoding=content_encoding)
+        await self._publish_or_spool(self._dlx, msg, "")
+
+    async def publish_retry(
+        self,
+        routing_key: str,
+        body: bytes,
+        headers: Optional[Dict[str, Any]],
+        content_type: Optional[str],
+        delay: float,
+        content_encoding: Optional[str] = None
+    ) -> None:
+        """Публикация в очередь уровня delay; через TTL сообщение вернётся в routing_key."""
+        if delay not in self._retry_delays:
+            raise ValueError(f"No retry tier for delay {delay}s")
+        body, content_encoding = self._compress(body, content_encoding)
+        msg = Message(body, headers=headers or {}, content_type=content_type, content_encoding=content_encoding)
+        await self._publish_or_spool(tier_name(settings.IN_TOPIC, delay), msg, routing_key)
+
+    async def _publish_or_spool(self, exchange: str, msg: Message, routing_key: str) -> None:
+        """
+        Публикация; если брокер недоступен и спул включён — запись в спул,
+        и вызывающий считает сообщение отправленным (входящее можно ack'нуть).
+        Переполненный спул — исходная ошибка публикации.
+        """
+        try:
+            await self._publisher.publish(exchange, msg, routing_key)
+        except Exception as e:
+            if self._spool is None:
+                raise
+            try:
+                await self._spool.append(
+                    exchange, routing_key, msg.body, msg.headers, msg.content_type, msg.content_encoding
+                )
+            except SpoolFullError as full:
+                log.error(f"Publish to {routing_key!r} failed and spool rejected it: {full}")
+                raise e
+            log.warning(f"Publish to {routing_key!r} failed ({e!r}), message spooled")
+
+    async def _publish_spooled(self, batch: List[SpooledMessage]) -> None:
+        await asyncio.gather(*(
+            self._publisher.publish(
+                item.exchange,
+                Message(
+                    item.body, headers=item.headers,
+                    content_type=item.content_type, content_encoding=item.content_encoding
+                ),
+                item.routing_key,
+            )
+            for item in batch
+        ))
+
+    async def _replay_loop(self) -> None:
+        """Отправка спула: сразу после (пере)подключения и раз в SPOOL_REPLAY_INTERVAL."""
+        while True:
+            try:
+                await asyncio.wait_for(self._spool_wakeup.wait(), settings.SPOOL_REPLAY_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+            self._spool_wakeup.clear()
+            if not self._spool.records or self._conn is None or self._conn.is_closed:
+                continue
+            try:
+                await self._spool.replay(self._publish_spooled, settings.SPOOL_REPLAY_BATCH)
+            except Exception as e:
+                log.warning(f"Spool replay interrupted: {e!r}, {self._spool.records} messages left")
 
     async def close(self) -> None:
+        if self._spool_task is not None:
+            self._spool_task.cancel()
+            self._spool_task = None
+        # дождаться confirm по всем отправленным публикациям
+        await self._publisher.close()
+        if self._spool is not None:
+            self._spool.close()
+        for channel in self._extra_channels:
+            if not channel.is_closed:
+                await channel.close()
+        self._extra_channels.clear()
         if self._channel and not self._channel.is_closed:
             await self._channel.close()
         if self._conn and not self._conn.is_closed:
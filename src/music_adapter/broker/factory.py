@@ -0,0 +1,21 @@
+# src/music_adapter/broker/factory.py
+from music_adapter.broker.base import BrokerBackend
+from music_adapter.config.settings import get_settings
+
+settings = get_settings()
+
+BACKENDS = ("rabbitmq", "kafka", "memory")
+
+def create_broker() -> BrokerBackend:
+    """Бэкенд брокера по BROKER_BACKEND; aiokafka нужен только для kafka."""
+    backend = settings.BROKER_BACKEND
+    if backend == "rabbitmq":
+        from music_adapter.broker.broker import Broker
+        return Broker()
+    if backend == "kafka":
+        from music_adapter.broker.kafka import KafkaBroker
+        return KafkaBroker()
+    if backend == "memory":
+        from music_adapter.broker.memory import MemoryBroker
+        return MemoryBroker(prefetch=settings.BROKER_PREFETCH)
+    raise ValueError(f"Unknown BROKER_BACKEND {backend!r}, expected one of {BACKENDS}")
@@ -0,0 +1,235 @@
+# src/music_adapter/broker/kafka.py
+import asyncio
+import logging
+from collections import deque
+from typing import Any, Deque, Dict, Hashable, Iterable, List, Optional, Set
+
+from music_adapter.broker.base import BrokerBackend, OutboundMessage
+from music_adapter.config.settings import get_settings
+from music_adapter.core.utils import retry_with_backoff
+
+settings = get_settings()
+log = logging.getLogger(__name__)
+
+def bootstrap_servers(url: str) -> str:
+    """ "kafka://h1:9092,h2:9092" → "h1:9092,h2:9092"."""
+    return url.split("://", 1)[1] if "://" in url else url
+
+class OffsetTracker:
+    """
+    Смещения, которые можно коммитить. Сообщения партиции обрабатываются
+    параллельно и завершаются в любом порядке; закоммитить можно только
+    смещение после непрерывного префикса обработанных (в порядке
+    доставки — смещения в топике могут идти с пропусками).
+    """
+    def __init__(self):
+        self._delivered: Dict[Hashable, Deque[int]] = {}
+        self._done: Dict[Hashable, Set[int]] = {}
+
+    def delivered(self, tp: Hashable, offset: int) -> None:
+        self._delivered.setdefault(tp, deque()).append(offset)
+        self._done.setdefault(tp, set())
+
+    def done(self, tp: Hashable, offset: int) -> None:
+        # партиция могла уйти другому потребителю при ребалансе
+        if tp in self._done:
+            self._done[tp].add(offset)
+
+    def ready(self) -> Dict[Hashable, int]:
+        """{партиция: следующее смещение} для партиций, где префикс сдвинулся."""
+        result: Dict[Hashable, int] = {}
+        for tp, delivered in self._delivered.items():
+            done = self._done[tp]
+            while delivered and delivered[0] in done:
+                offset = delivered.popleft()
+                done.discard(offset)
+                result[tp] = offset + 1
+        return result
+
+    def revoke(self, tps: Iterable[Hashable]) -> None:
+        for tp in tps:
+            self._delivered.pop(tp, None)
+            self._done.pop(tp, None)
+
+class KafkaMessage:
+    """
+    Запись Kafka с интерфейсом входящего сообщения aio-pika: ack() —
+    отметить обработанной (смещение коммитится, когда обработаны все
+    предыдущие записи партиции), reject() — переслать в DLQ (или обратно
+    в топик при requeue) и тоже отметить.
+    """
+    def __init__(self, broker: "KafkaBroker", source: "_TopicConsumer", tp: Any, record: Any):
+        self._broker = broker
+        self.source = source
+        self.tp = tp
+        self.topic = record.topic
+        self.offset = record.offset
+        self.delivery_tag = record.offset
+        self.body = record.value
+        self.headers = {key: value.decode("utf-8") for key, value in (record.headers or ())}
+        self.content_type = self.headers.pop("content-type", None)
+        self.content_encoding = self.headers.pop("content-encoding", None)
+        self.consumer = None
+        self.settled = False
+
+    async def ack(self) -> None:
+        await self._broker.commit([self])
+
+    async def reject(self, requeue: bool = False) -> None:
+        await self._broker.publish(
+            self.topic if requeue else self._broker._dlq,
+            self.body, self.headers, self.content_type, self.content_encoding
+        )
+        await self._broker.commit([self])
+
+class _TopicConsumer:
+    def __init__(self, consumer: Any):
+        self.consumer = consumer
+        self.offsets = OffsetTracker()
+        self.commit_lock = asyncio.Lock()
+
+    async def commit(self) -> None:
+        # одновременные ack'и схлопываются: следующий под локом увидит уже
+        # сдвинутый префикс и закоммитит его одним запросом
+        async with self.commit_lock:
+            offsets = self.offsets.ready()
+            if not offsets:
+                return
+            try:
+                await self.consumer.commit(offsets)
+            except Exception as e:
+                # не коммит — повторная доставка после ребаланса, не потеря
+                log.warning(f"Kafka offset commit failed: {e}")
+
+def _rebalance_listener(source: _TopicConsumer):
+    from aiokafka import ConsumerRebalanceListener
+
+    class Listener(ConsumerRebalanceListener):
+        async def on_partitions_revoked(self, revoked):
+            await source.commit()
+            source.offsets.revoke(revoked)
+
+        async def on_partitions_assigned(self, assigned):
+            pass
+
+    return Listener()
+
+class KafkaBroker(BrokerBackend):
+    """
+    Kafka-бэкенд на aiokafka. Топик = routing key / имя очереди, на каждую
+    подписку — свой потребитель в группе KAFKA_GROUP_ID. Записи берутся
+    пачками (getmany), каждая запись пачки обрабатывается отдельной
+    задачей — в том числе записи одной партиции, поэтому порядок внутри
+    партиции не сохраняется. Смещения коммитятся вручную после ack, т.е.
+    после подтверждённой публикации результата, по непрерывному префиксу
+    (OffsetTracker). Доставка at-least-once.
+    """
+    def __init__(self):
+        super().__init__(settings.BROKER_PREFETCH, dlq="dlq")
+        self._bootstrap = bootstrap_servers(settings.BROKER_URL)
+        self._producer = None
+        self._sources: Dict[str, _TopicConsumer] = {}
+
+    async def connect(self) -> None:
+        from aiokafka import AIOKafkaProducer
+
+        async def start():
+            producer = AIOKafkaProducer(
+                bootstrap_servers=self._bootstrap,
+                acks="all",
+                enable_idempotence=True,
+                linger_ms=settings.KAFKA_LINGER_MS,
+            )
+            try:
+                await producer.start()
+            except Exception:
+                await producer.stop()
+                raise
+            return producer
+
+        self._producer = await retry_with_backoff(start, retries=5, base_delay=1.0)
+        log.info(f"Kafka producer connected to {self._bootstrap}")
+
+    def is_connected(self) -> bool:
+        return self._producer is not None
+
+    async def _source(self, topic: str) -> _TopicConsumer:
+        source = self._sources.get(topic)
+        if source is None:
+            from aiokafka import AIOKafkaConsumer
+            consumer = AIOKafkaConsumer(
+                bootstrap_servers=self._bootstrap,
+                group_id=settings.KAFKA_GROUP_ID,
+                enable_auto_commit=False,
+                auto_offset_reset="earliest",
+                max_poll_records=settings.KAFKA_MAX_POLL_RECORDS,
+            )
+            source = _TopicConsumer(consumer)
+            consumer.subscribe([topic], listener=_rebalance_listener(source))
+            await consumer.start()
+            self._sources[topic] = source
+            log.info(f"Kafka consumer joined group {settings.KAFKA_GROUP_ID} for {topic}")
+        return source
+
+    async def consume_batch(self, queue_name: str, max_messages: int, timeout: float) -> List[KafkaMessage]:
+        source = await self._source(queue_name)
+        records = await source.consumer.getmany(
+            timeout_ms=int(timeout * 1000), max_records=max_messages
+        )
+        batch = []
+        for tp, items in records.items():
+            for record in items:
+                source.offsets.delivered(tp, record.offset)
+                batch.append(KafkaMessage(self, source, tp, record))
+        return batch
+
+    async def commit(self, messages: List[KafkaMessage]) -> None:
+        sources = []
+        for msg in messages:
+            if msg.settled:
+                continue
+            msg.settled = True
+            msg.source.offsets.done(msg.tp, msg.offset)
+            self._release(msg)
+            if msg.source not in sources:
+                sources.append(msg.source)
+        for source in sources:
+            await source.commit()
+
+    @staticmethod
+    def _headers(msg: OutboundMessage) -> List[Any]:
+        headers = [(key, str(value).encode("utf-8")) for key, value in msg.headers.items()]
+        if msg.content_type:
+            headers.append(("content-type", msg.content_type.encode("utf-8")))
+        if msg.content_encoding:
+            headers.append(("content-encoding", msg.content_encoding.encode("utf-8")))
+        return headers
+
+    async def publish_batch(self, messages: List[OutboundMessage]) -> None:
+        """Все сообщения уходят в буфер продюсера разом, затем ждём подтверждения."""
+        if self._producer is None:
+            raise RuntimeError("Kafka producer is not connected")
+        futures = []
+        for msg in messages:
+            key: Optional[str] = msg.headers.get("correlation_id")
+            futures.append(await self._producer.send(
+                msg.routing_key,
+                msg.body,
+                key=key.encode("utf-8") if key else None,
+                headers=self._headers(msg),
+            ))
+        await asyncio.gather(*futures)
+
+    async def close(self) -> None:
+        # подписки обычно уже остановлены в MusicAdapter.shutdown
+        if self._batch_consumers:
+            await self.stop_consuming()
+        for source in self._sources.values():
+            await source.commit()
+            await source.consumer.stop()
+        self._sources.clear()
+        if self._producer is not None:
+            # stop() дожидается отправки буфера
+            await self._producer.stop()
+            self._producer = None
+        log.info("Kafka connections closed cleanly")
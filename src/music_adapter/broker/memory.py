@@ -0,0 +1,158 @@
+# src/music_adapter/broker/memory.py
+import asyncio
+import logging
+from collections import defaultdict
+from typing import Any, Dict, List, Optional, Set
+
+from music_adapter.broker.base import BrokerBackend, OutboundMessage, drain_queue
+
+log = logging.getLogger(__name__)
+
+class MemoryMessage:
+    """
+    Сообщение MemoryBroker с интерфейсом входящего сообщения aio-pika:
+    body, headers, content_type, content_encoding, delivery_tag, ack(), reject().
+    """
+    def __init__(
+        self,
+        broker: "MemoryBroker",
+        queue: str,
+        body: bytes,
+        headers: Optional[Dict[str, Any]] = None,
+        content_type: Optional[str] = None,
+        delivery_tag: int = 0,
+        content_encoding: Optional[str] = None,
+    ):
+        self._broker = broker
+        self.queue = queue
+        self.body = body
+        self.headers = headers or {}
+        self.content_type = content_type
+        self.content_encoding = content_encoding
+        self.delivery_tag = delivery_tag
+        self.consumer = None  # потребитель, которому доставлено сообщение
+        self.delivered_at: Optional[float] = None
+        self.settled_at: Optional[float] = None
+        self.outcome: Optional[str] = None  # ack | requeue | reject
+
+    async def ack(self) -> None:
+        await self._settle("ack")
+
+    async def reject(self, requeue: bool = False) -> None:
+        await self._settle("requeue" if requeue else "reject")
+
+    async def _settle(self, outcome: str) -> None:
+        if self.outcome is not None:
+            raise RuntimeError(f"Message {self.delivery_tag} already settled: {self.outcome}")
+        self.outcome = outcome
+        self.settled_at = asyncio.get_running_loop().time()
+        await self._broker._settled(self)
+
+class MemoryBroker(BrokerBackend):
+    """
+    Брокер в памяти процесса с интерфейсом BrokerBackend: очереди по
+    routing key, prefetch (не больше N неподтверждённых сообщений на
+    потребителя), reject без requeue — в очередь DLQ. Для тестов и
+    нагрузочного стенда. history=False — не хранить опубликованные
+    сообщения (долгие прогоны), остаются только счётчики.
+    publish_retry — таймер вместо очереди с TTL.
+    """
+    delayed_retry = True
+
+    def __init__(self, prefetch: int = 10, dlq: str = "dlq", history: bool = True):
+        super().__init__(prefetch, dlq)
+        self._history = history
+        self.counts: Dict[str, int] = defaultdict(int)
+        self._queues: Dict[str, asyncio.Queue] = {}
+        self._published: Dict[str, List[MemoryMessage]] = defaultdict(list)
+        self._tags = 0
+        self._timers: Set[asyncio.TimerHandle] = set()
+        self.connected = False
+
+    def _queue(self, name: str) -> asyncio.Queue:
+        if name not in self._queues:
+            self._queues[name] = asyncio.Queue()
+        return self._queues[name]
+
+    async def connect(self) -> None:
+        self.connected = True
+
+    def is_connected(self) -> bool:
+        return self.connected
+
+    async def consume_batch(self, queue_name: str, max_messages: int, timeout: float) -> List[MemoryMessage]:
+        batch = await drain_queue(self._queue(queue_name), max_messages, timeout)
+        now = asyncio.get_running_loop().time()
+        for msg in batch:
+            msg.delivered_at = now
+        return batch
+
+    async def commit(self, messages: List[MemoryMessage]) -> None:
+        for msg in messages:
+            await msg.ack()
+
+    async def _settled(self, msg: MemoryMessage) -> None:
+        if msg.outcome == "requeue":
+            self._enqueue(msg.queue, msg.body, msg.headers, msg.content_type, msg.content_encoding)
+        elif msg.outcome == "reject":
+            self._enqueue(self._dlq, msg.body, msg.headers, msg.content_type, msg.content_encoding)
+        self._release(msg)
+
+    def _enqueue(
+        self,
+        routing_key: str,
+        body: bytes,
+        headers: Optional[Dict[str, Any]] = None,
+        content_type: Optional[str] = None,
+        content_encoding: Optional[str] = None,
+    ) -> MemoryMessage:
+        self._tags += 1
+        msg = MemoryMessage(self, routing_key, body, headers, content_type, self._tags, content_encoding)
+        self.counts[routing_key] += 1
+        if self._history:
+            self._published[routing_key].append(msg)
+        self._queue(routing_key).put_nowait(msg)
+        return msg
+
+    async def publish_batch(self, messages: List[OutboundMessage]) -> None:
+        for msg in messages:
+            self._enqueue(msg.routing_key, msg.body, msg.headers, msg.content_type, msg.content_encoding)
+
+    async def publish_retry(
+        self,
+        routing_key: str,
+        body: bytes,
+        headers: Optional[Dict[str, Any]],
+        content_type: Optional[str],
+        delay: float,
+        content_encoding: Optional[str] = None
+    ) -> None:
+        body, content_encoding = self._compress(body, content_encoding)
+
+        def expire():
+            self._timers.discard(timer)
+            self._enqueue(routing_key, body, headers, content_type, content_encoding)
+        timer = asyncio.get_running_loop().call_later(delay, expire)
+        self._timers.add(timer)
+
+    def inject(
+        self,
+        queue_name: str,
+        body: bytes,
+        headers: Optional[Dict[str, Any]] = None,
+        content_encoding: Optional[str] = None
+    ) -> MemoryMessage:
+        """Положить входящее сообщение в очередь (как внешний продюсер)."""
+        return self._enqueue(queue_name, body, headers, content_encoding=content_encoding)
+
+    def published(self, routing_key: str) -> List[MemoryMessage]:
+        """Все сообщения, опубликованные с этим routing key (включая DLQ)."""
+        return list(self._published.get(routing_key, ()))
+
+    async def close(self) -> None:
+        if self._batch_consumers:
+            await self.stop_consuming()
+        for timer in self._timers:
+            timer.cancel()
+        self._timers.clear()
+        self.connected = False
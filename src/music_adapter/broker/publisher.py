@@ -0,0 +1,89 @@
+# src/music_adapter/broker/publisher.py
+import asyncio
+import logging
+from typing import Dict, List, Set, Tuple
+import prometheus_client
+from aio_pika import Message
+from aio_pika.abc import AbstractChannel, AbstractConnection, AbstractExchange
+
+log = logging.getLogger(__name__)
+
+PUBLISH_PENDING = prometheus_client.Gauge(
+    "adapter_publish_pending",
+    "Publishes sent and awaiting broker confirm",
+    multiprocess_mode="livesum"
+)
+PUBLISH_CONFIRM_LATENCY = prometheus_client.Histogram(
+    "adapter_publish_confirm_seconds",
+    "Time from publish to broker confirm",
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+)
+
+class Publisher:
+    """
+    Публикация через отдельные от потребителя каналы с publisher confirms.
+
+    Публикации не сериализуются: каждая отправляется сразу и ждёт
+    своего confirm, так что одновременно в полёте до max_pending сообщений
+    на пул каналов, а брокер подтверждает их пачками (basic.ack multiple).
+    Хэндлы exchange кэшируются на канал.
+    """
+    def __init__(self, pool_size: int, max_pending: int):
+        self._pool_size = max(1, pool_size)
+        self._window = asyncio.Semaphore(max(1, max_pending))
+        self._channels: List[AbstractChannel] = []
+        self._exchanges: Dict[Tuple[int, str], AbstractExchange] = {}
+        self._pending: Set[asyncio.Future] = set()
+        self._next = 0
+
+    async def open(self, connection: AbstractConnection) -> None:
+        """Открыть пул каналов (и при переподключении тоже)."""
+        self._exchanges.clear()
+        self._channels = [
+            await connection.channel(publisher_confirms=True)
+            for _ in range(self._pool_size)
+        ]
+        self._next = 0
+        log.info(f"Publisher opened {self._pool_size} confirm channel(s)")
+
+    async def _exchange(self, index: int, name: str) -> AbstractExchange:
+        key = (index, name)
+        exchange = self._exchanges.get(key)
+        if exchange is None:
+            # exchange уже объявлен при подключении — без лишнего round-trip
+            exchange = await self._channels[index].get_exchange(name, ensure=False)
+            self._exchanges[key] = exchange
+        return exchange
+
+    async def publish(self, exchange: str, message: Message, routing_key: str) -> None:
+        """Отправить и дождаться confirm (ack брокера)."""
+        if not self._channels:
+            raise RuntimeError("Publisher is not open")
+        async with self._window:
+            index = self._next
+            self._next = (self._next + 1) % len(self._channels)
+            target = await self._exchange(index, exchange)
+            loop = asyncio.get_running_loop()
+            started = loop.time()
+            fut = asyncio.ensure_future(target.publish(message, routing_key=routing_key))
+            self._pending.add(fut)
+            PUBLISH_PENDING.inc()
+            try:
+                await asyncio.shield(fut)
+            finally:
+                self._pending.discard(fut)
+                PUBLISH_PENDING.dec()
+            PUBLISH_CONFIRM_LATENCY.observe(loop.time() - started)
+
+    async def flush(self) -> None:
+        """Дождаться подтверждения всех отправленных публикаций."""
+        if self._pending:
+            await asyncio.gather(*list(self._pending), return_exceptions=True)
+
+    async def close(self) -> None:
+        await self.flush()
+        for channel in self._channels:
+            if not channel.is_closed:
+                await channel.close()
+        self._channels = []
+        self._exchanges.clear()
@@ -0,0 +1,309 @@
+# src/music_adapter/broker/spool.py
+import asyncio
+import fcntl
+import logging
+import os
+import struct
+import threading
+import time
+import zlib
+from typing import Any, Awaitable, Callable, Dict, IO, List, Optional, Tuple
+import prometheus_client
+
+from music_adapter.core import codec
+
+log = logging.getLogger(__name__)
+
+SPOOL_DEPTH = prometheus_client.Gauge(
+    "adapter_spool_depth",
+    "Messages in the on-disk publish spool awaiting replay",
+    multiprocess_mode="livesum"
+)
+SPOOL_BYTES = prometheus_client.Gauge(
+    "adapter_spool_bytes",
+    "Bytes in the on-disk publish spool awaiting replay",
+    multiprocess_mode="livesum"
+)
+SPOOL_WRITES = prometheus_client.Counter(
+    "adapter_spool_writes_total",
+    "Messages written to the spool after a failed publish"
+)
+SPOOL_REPLAYED = prometheus_client.Counter(
+    "adapter_spool_replayed_total",
+    "Spooled messages published to the broker on replay"
+)
+SPOOL_REJECTED = prometheus_client.Counter(
+    "adapter_spool_rejected_total",
+    "Messages not spooled because the spool size limit was reached"
+)
+
+FSYNC_POLICIES = ("always", "interval", "never")
+
+# запись: длина полезной нагрузки + crc32, затем meta (JSON, без "\n") + "\n" + тело
+_HEADER = struct.Struct(">II")
+_SUFFIX = ".seg"
+_ACK_SUFFIX = ".ack"
+
+class SpoolFullError(Exception):
+    pass
+
+class SpooledMessage:
+    __slots__ = ("exchange", "routing_key", "body", "headers", "content_type", "content_encoding", "end")
+
+    def __init__(
+        self,
+        exchange: str,
+        routing_key: str,
+        body: bytes,
+        headers: Dict[str, Any],
+        content_type: Optional[str],
+        end: int = 0,
+        content_encoding: Optional[str] = None
+    ):
+        self.exchange = exchange
+        self.routing_key = routing_key
+        self.body = body
+        self.headers = headers
+        self.content_type = content_type
+        self.content_encoding = content_encoding
+        self.end = end  # смещение конца записи в сегменте
+
+def _encode(msg: SpooledMessage) -> bytes:
+    fields = {
+        "exchange": msg.exchange,
+        "routing_key": msg.routing_key,
+        "headers": msg.headers,
+        "content_type": msg.content_type,
+    }
+    if msg.content_encoding:
+        fields["content_encoding"] = msg.content_encoding
+    meta = codec.dumps(fields)
+    payload = meta + b"\n" + msg.body
+    return _HEADER.pack(len(payload), zlib.crc32(payload)) + payload
+
+def read_segment(path: str, offset: int = 0) -> Tuple[List[SpooledMessage], int]:
+    """
+    Прочитать записи сегмента начиная с offset. Возвращает (записи,
+    смещение конца последней целой записи). Недописанный или битый
+    хвост (падение посреди записи) отбрасывается.
+    """
+    records: List[SpooledMessage] = []
+    with open(path, "rb") as f:
+        f.seek(offset)
+        data = f.read()
+    pos = 0
+    while pos + _HEADER.size <= len(data):
+        length, crc = _HEADER.unpack_from(data, pos)
+        start = pos + _HEADER.size
+        payload = data[start:start + length]
+        if len(payload) < length or zlib.crc32(payload) != crc:
+            log.warning(f"Spool segment {path}: corrupt tail at offset {offset + pos}, skipped")
+            break
+        meta, _, body = payload.partition(b"\n")
+        fields = codec.loads(meta)
+        pos = start + length
+        records.append(SpooledMessage(
+            fields["exchange"], fields["routing_key"], body,
+            fields.get("headers") or {}, fields.get("content_type"), offset + pos,
+            fields.get("content_encoding")
+        ))
+    return records, offset + pos
+
+def _claim_directory(root: str) -> Tuple[str, IO]:
+    """
+    Взять подкаталог root/N под эксклюзивный flock: у каждого процесса
+    (в т.ч. воркеров --workers N) свой спул, а перезапущенный воркер
+    подхватывает каталог упавшего вместе с неотправленными сообщениями.
+    """
+    index = 0
+    while True:
+        path = os.path.join(root, str(index))
+        os.makedirs(path, exist_ok=True)
+        lock = open(os.path.join(path, ".lock"), "a")
+        try:
+            fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            return path, lock
+        except BlockingIOError:
+            lock.close()
+            index += 1
+
+class PublishSpool:
+    """
+    Append-only спул на диске для публикаций, не прошедших из-за
+    недоступного брокера. Сообщения пишутся в сегменты фиксированного
+    размера; replay отправляет их пачками и удаляет сегмент целиком,
+    когда он весь подтверждён брокером. Прогресс внутри сегмента
+    сохраняется в <сегмент>.ack, поэтому после падения повторно уйдёт
+    не больше одной пачки (доставка at-least-once).
+
+    fsync: always — после каждой записи; interval — не чаще раза в
+    fsync_interval секунд (при падении процесса данные уже в page cache,
+    теряются только при падении узла); never — на усмотрение ОС.
+    """
+    def __init__(
+        self,
+        directory: str,
+        segment_bytes: int = 16 * 1024 * 1024,
+        max_bytes: int = 1024 * 1024 * 1024,
+        fsync: str = "interval",
+        fsync_interval: float = 1.0
+    ):
+        if fsync not in FSYNC_POLICIES:
+            raise ValueError(f"Unknown spool fsync policy {fsync!r}, expected one of {FSYNC_POLICIES}")
+        self.directory, self._dir_lock = _claim_directory(directory)
+        self._segment_bytes = max(1, segment_bytes)
+        self._max_bytes = max_bytes
+        self._fsync = fsync
+        self._fsync_interval = fsync_interval
+        self._last_sync = time.monotonic()
+        self._lock = threading.Lock()
+        self._replay_lock = asyncio.Lock()
+        self._active: Optional[IO] = None
+        self._active_path: Optional[str] = None
+        self._active_size = 0
+        self._sealed: List[str] = []
+        self._seq = 0
+        self.records = 0
+        self.bytes = 0
+        self._recover()
+
+    def _recover(self) -> None:
+        """Учесть сегменты, оставшиеся от прошлого запуска."""
+        names = sorted(n for n in os.listdir(self.directory) if n.endswith(_SUFFIX))
+        for name in names:
+            path = os.path.join(self.directory, name)
+            records, _ = read_segment(path, self._read_ack(path))
+            if not records:
+                self._remove(path)
+                continue
+            self._sealed.append(path)
+            self.records += len(records)
+            self.bytes += records[-1].end - self._read_ack(path)
+            self._seq = max(self._seq, int(name[:-len(_SUFFIX)]))
+        if self.records:
+            log.warning(f"Publish spool {self.directory}: {self.records} messages from a previous run")
+        self._update_gauges()
+
+    @staticmethod
+    def _read_ack(path: str) -> int:
+        try:
+            with open(path + _ACK_SUFFIX) as f:
+                return int(f.read() or 0)
+        except FileNotFoundError:
+            return 0
+
+    @staticmethod
+    def _write_ack(path: str, offset: int) -> None:
+        tmp = path + _ACK_SUFFIX + ".tmp"
+        with open(tmp, "w") as f:
+            f.write(str(offset))
+        os.replace(tmp, path + _ACK_SUFFIX)
+
+    @staticmethod
+    def _remove(path: str) -> None:
+        for name in (path, path + _ACK_SUFFIX):
+            try:
+                os.remove(name)
+            except FileNotFoundError:
+                pass
+
+    def _update_gauges(self) -> None:
+        SPOOL_DEPTH.set(self.records)
+        SPOOL_BYTES.set(self.bytes)
+
+    def _seal(self) -> None:
+        """Закрыть активный сегмент: дальнейшие записи пойдут в новый."""
+        if self._active is None:
+            return
+        self._active.flush()
+        if self._fsync != "never":
+            os.fsync(self._active.fileno())
+        self._active.close()
+        self._sealed.append(self._active_path)
+        self._active = None
+        self._active_path = None
+
+    def _append(self, msg: SpooledMessage) -> None:
+        record = _encode(msg)
+        with self._lock:
+            if self.bytes + len(record) > self._max_bytes:
+                SPOOL_REJECTED.inc()
+                raise SpoolFullError(f"Publish spool is full ({self.bytes} bytes)")
+            if self._active is not None and self._active_size + len(record) > self._segment_bytes:
+                self._seal()
+            if self._active is None:
+                self._seq += 1
+                self._active_path = os.path.join(self.directory, f"{self._seq:012d}{_SUFFIX}")
+                self._active = open(self._active_path, "ab")
+                self._active_size = 0
+            self._active.write(record)
+            self._active.flush()
+            now = time.monotonic()
+            if self._fsync == "always" or (
+                self._fsync == "interval" and now - self._last_sync >= self._fsync_interval
+            ):
+                os.fsync(self._active.fileno())
+                self._last_sync = now
+            self._active_size += len(record)
+            self.records += 1
+            self.bytes += len(record)
+        SPOOL_WRITES.inc()
+        self._update_gauges()
+
+    async def append(
+        self,
+        exchange: str,
+        routing_key: str,
+        body: bytes,
+        headers: Optional[Dict[str, Any]] = None,
+        content_type: Optional[str] = None,
+        content_encoding: Optional[str] = None
+    ) -> None:
+        """Записать сообщение в спул (SpoolFullError при превышении max_bytes)."""
+        msg = SpooledMessage(
+            exchange, routing_key, bytes(body), dict(headers or {}), content_type,
+            content_encoding=content_encoding
+        )
+        await asyncio.to_thread(self._append, msg)
+
+    async def replay(
+        self,
+        publish_batch: Callable[[List[SpooledMessage]], Awaitable[None]],
+        batch_size: int = 100
+    ) -> int:
+        """
+        Отправить накопленное пачками по batch_size через publish_batch
+        (должен вернуться после confirm всех сообщений пачки). Ошибка
+        publish_batch прерывает replay, оставшееся ждёт следующего вызова.
+        Возвращает число отправленных сообщений.
+        """
+        sent = 0
+        async with self._replay_lock:
+            with self._lock:
+                self._seal()
+                segments = list(self._sealed)
+            for path in segments:
+                offset = self._read_ack(path)
+                records, _ = await asyncio.to_thread(read_segment, path, offset)
+                for i in range(0, len(records), max(1, batch_size)):
+                    batch = records[i:i + batch_size]
+                    await publish_batch(batch)
+                    await asyncio.to_thread(self._write_ack, path, batch[-1].end)
+                    with self._lock:
+                        self.records -= len(batch)
+                        self.bytes -= batch[-1].end - offset
+                    offset = batch[-1].end
+                    sent += len(batch)
+                    SPOOL_REPLAYED.inc(len(batch))
+                    self._update_gauges()
+                with self._lock:
+                    self._sealed.remove(path)
+                await asyncio.to_thread(self._remove, path)
+        if sent:
+            log.info(f"Replayed {sent} spooled messages, {self.records} left")
+        return sent
+
+    def close(self) -> None:
+        with self._lock:
+            self._seal()
+        self._dir_lock.close()
@@ -0,0 +1,217 @@
+# src/music_adapter/clients/balancer.py
+import asyncio
+import logging
+import random
+from collections import deque
+from typing import Any, Awaitable, Callable, Iterable, List, Optional, Set
+import prometheus_client
+from aiohttp import ClientConnectorError
+
+from music_adapter.clients.circuit import CircuitOpenError, endpoint_name, get_breaker
+from music_adapter.config.settings import get_settings
+
+settings = get_settings()
+log = logging.getLogger(__name__)
+
+ENDPOINT_LATENCY_EWMA = prometheus_client.Gauge(
+    "adapter_endpoint_latency_ewma_seconds",
+    "EWMA latency of a service endpoint",
+    ["service", "endpoint"],
+    multiprocess_mode="liveall"
+)
+ENDPOINT_OUTSTANDING = prometheus_client.Gauge(
+    "adapter_endpoint_outstanding_requests",
+    "Requests in flight to a service endpoint",
+    ["service", "endpoint"],
+    multiprocess_mode="livesum"
+)
+HEDGED_REQUESTS = prometheus_client.Counter(
+    "adapter_hedged_requests_total",
+    "Hedged duplicate requests: sent, and won by the duplicate",
+    ["service", "result"]
+)
+
+EWMA_ALPHA = 0.3
+
+def parse_endpoints(primary: str, extra: str = "") -> List[str]:
+    """Основной URL + реплики через запятую, без дублей."""
+    urls: List[str] = []
+    for url in [primary, *extra.split(",")]:
+        url = url.strip()
+        if url and url not in urls:
+            urls.append(url)
+    return urls
+
+class Endpoint:
+    def __init__(self, service: str, url: str):
+        self.url = url
+        self.name = endpoint_name(url)
+        self.breaker = get_breaker(url)
+        self.ewma = 0.0  # 0 — ещё не опрошен, выбирается первым
+        self.outstanding = 0
+        self._ewma_gauge = ENDPOINT_LATENCY_EWMA.labels(service=service, endpoint=self.name)
+        self._outstanding_gauge = ENDPOINT_OUTSTANDING.labels(service=service, endpoint=self.name)
+
+    def observe(self, latency: float) -> None:
+        self.ewma = latency if self.ewma == 0.0 else EWMA_ALPHA * latency + (1 - EWMA_ALPHA) * self.ewma
+        self._ewma_gauge.set(self.ewma)
+
+    def update_outstanding(self, delta: int) -> None:
+        self.outstanding += delta
+        self._outstanding_gauge.set(self.outstanding)
+
+class LoadBalancer:
+    """
+    Балансировка запросов к репликам одного сервиса.
+
+    ewma — минимум ewma * (outstanding + 1): быстрая реплика получает
+    больше запросов, но не все сразу; least_outstanding — минимум
+    запросов в работе. Реплики с открытым Circuit Breaker пропускаются,
+    при ошибке запрос повторяется на следующей реплике.
+
+    Hedging: если ответа нет дольше p95 (HEDGE_QUANTILE) последних
+    запросов, дубликат уходит на вторую реплику, берётся первый успешный
+    ответ. Только для идемпотентных запросов: call(..., idempotent=False)
+    не дублирует запрос и переходит на другую реплику, только если
+    запрос точно не был отправлен (открытая цепь, нет соединения).
+    """
+    def __init__(
+        self,
+        service: str,
+        urls: Iterable[str],
+        strategy: str = "ewma",
+        hedge: bool = False,
+        hedge_quantile: float = 0.95,
+        hedge_min_delay: float = 0.05,
+        hedge_min_samples: int = 20,
+        window: int = 256,
+    ):
+        if strategy not in ("ewma", "least_outstanding"):
+            raise ValueError(f"Unknown load balancing strategy {strategy!r}")
+        self.service = service
+        self.endpoints = [Endpoint(service, url) for url in urls]
+        if not self.endpoints:
+            raise ValueError(f"No endpoints configured for service={service}")
+        self._strategy = strategy
+        self._hedge = hedge
+        self._hedge_quantile = hedge_quantile
+        self._hedge_min_delay = hedge_min_delay
+        self._hedge_min_samples = hedge_min_samples
+        self._latencies: deque = deque(maxlen=window)
+
+    def _score(self, ep: Endpoint):
+        if self._strategy == "least_outstanding":
+            return ep.outstanding, ep.ewma
+        return ep.ewma * (ep.outstanding + 1)
+
+    def pick(self, exclude: Optional[Set[str]] = None) -> Optional[Endpoint]:
+        candidates = [
+            ep for ep in self.endpoints
+            if ep.breaker.allow_request() and not (exclude and ep.url in exclude)
+        ]
+        if not candidates:
+            return None
+        # random — чтобы при равных оценках нагрузка не уходила в первую реплику
+        return min(candidates, key=lambda ep: (self._score(ep), random.random()))
+
+    def hedge_delay(self) -> Optional[float]:
+        """Задержка перед дубликатом; None — статистики ещё мало."""
+        if len(self._latencies) < self._hedge_min_samples:
+            return None
+        ordered = sorted(self._latencies)
+        index = min(len(ordered) - 1, int(len(ordered) * self._hedge_quantile))
+        return max(self._hedge_min_delay, ordered[index])
+
+    async def call(
+        self,
+        request: Callable[[str], Awaitable[Any]],
+        hedge: Optional[bool] = None,
+        idempotent: bool = True
+    ) -> Any:
+        """
+        request(url) выполняет запрос к выбранной реплике.
+        """
+        hedge = idempotent and (self._hedge if hedge is None else hedge)
+        tried: Set[str] = set()
+        last_error: Optional[BaseException] = None
+        while True:
+            ep = self.pick(tried)
+            if ep is None:
+                break
+            tried.add(ep.url)
+            try:
+                if hedge and len(self.endpoints) > 1:
+                    return await self._hedged(request, ep, tried)
+                return await self._attempt(request, ep)
+            except Exception as e:
+                if not idempotent and not isinstance(e, (CircuitOpenError, ClientConnectorError)):
+                    raise
+                last_error = e
+                log.warning(f"Request to {self.service} at {ep.name} failed: {e}")
+        if last_error is not None:
+            raise last_error
+        raise CircuitOpenError(f"Circuit open for service={self.service}")
+
+    async def _attempt(self, request: Callable[[str], Awaitable[Any]], ep: Endpoint) -> Any:
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        ep.update_outstanding(1)
+        try:
+            result = await request(ep.url)
+        except BaseException:
+            # медленный или упавший ответ тоже учитывается в ewma
+            ep.observe(loop.time() - start)
+            raise
+        finally:
+            ep.update_outstanding(-1)
+        latency = loop.time() - start
+        ep.observe(latency)
+        self._latencies.append(latency)
+        return result
+
+    async def _hedged(
+        self,
+        request: Callable[[str], Awaitable[Any]],
+        primary: Endpoint,
+        tried: Set[str]
+    ) -> Any:
+        delay = self.hedge_delay()
+        if delay is None:
+            return await self._attempt(request, primary)
+        first = asyncio.ensure_future(self._attempt(request, primary))
+        tasks = [first]
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=delay)
+            if done:
+                return first.result()
+            backup = self.pick(tried)
+            if backup is None:
+                return await first
+            tried.add(backup.url)
+            HEDGED_REQUESTS.labels(service=self.service, result="sent").inc()
+            second = asyncio.ensure_future(self._attempt(request, backup))
+            tasks.append(second)
+            pending = set(tasks)
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                winners = [task for task in done if task.exception() is None]
+                if winners:
+                    if winners[0] is second:
+                        HEDGED_REQUESTS.labels(service=self.service, result="won").inc()
+                    return winners[0].result()
+            return first.result()  # обе попытки упали — ошибка основной
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+
+def from_settings(service: str, primary: str, extra: str = "") -> LoadBalancer:
+    return LoadBalancer(
+        service,
+        parse_endpoints(primary, extra),
+        strategy=settings.LB_STRATEGY,
+        hedge=settings.HEDGE_ENABLED,
+        hedge_quantile=settings.HEDGE_QUANTILE,
+        hedge_min_delay=settings.HEDGE_MIN_DELAY,
+        hedge_min_samples=settings.HEDGE_MIN_SAMPLES,
+    )
@@ -0,0 +1,88 @@
+# src/music_adapter/clients/batcher.py
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, List, Optional, Set, Tuple
+import prometheus_client
+
+log = logging.getLogger(__name__)
+
+BATCH_SIZE = prometheus_client.Histogram(
+    "adapter_batch_size",
+    "Number of items sent in one batched request",
+    ["service"],
+    buckets=(1, 2, 4, 8, 16, 32, 64, 128),
+)
+
+class MicroBatcher:
+    """
+    Собирает конкурентные вызовы submit() в пачки по времени (window)
+    и размеру (max_size), отправляет одним вызовом send_batch и
+    раздаёт результаты обратно ожидающим.
+
+    send_batch получает список элементов и возвращает список той же длины;
+    элемент-исключение отдаётся только своему вызывающему.
+    """
+    def __init__(
+        self,
+        send_batch: Callable[[List[Any]], Awaitable[List[Any]]],
+        max_size: int,
+        window: float,
+        service: str = "batch",
+    ):
+        self._send_batch = send_batch
+        self._max_size = max(1, max_size)
+        self._window = window
+        self._service = service
+        self._pending: List[Tuple[Any, asyncio.Future]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._inflight: Set[asyncio.Task] = set()
+
+    async def submit(self, item: Any) -> Any:
+        loop = asyncio.get_running_loop()
+        fut = loop.create_future()
+        self._pending.append((item, fut))
+        if len(self._pending) >= self._max_size:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self._window, self._flush)
+        return await fut
+
+    def _flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, []
+        if not batch:
+            return
+        task = asyncio.ensure_future(self._run(batch))
+        self._inflight.add(task)
+        task.add_done_callback(self._inflight.discard)
+
+    async def _run(self, batch: List[Tuple[Any, asyncio.Future]]) -> None:
+        BATCH_SIZE.labels(service=self._service).observe(len(batch))
+        try:
+            results = await self._send_batch([item for item, _ in batch])
+            if len(results) != len(batch):
+                raise RuntimeError(
+                    f"Batch response size mismatch: sent {len(batch)}, got {len(results)}"
+                )
+        except Exception as e:
+            log.error(f"Batch request to {self._service} failed: {e}")
+            for _, fut in batch:
+                if not fut.done():
+                    fut.set_exception(e)
+            return
+
+        for (_, fut), result in zip(batch, results):
+            if fut.done():  # вызывающий уже отменён
+                continue
+            if isinstance(result, BaseException):
+                fut.set_exception(result)
+            else:
+                fut.set_result(result)
+
+    async def close(self) -> None:
+        """Отправить накопленное и дождаться незавершённых пачек."""
+        self._flush()
+        if self._inflight:
+            await asyncio.gather(*self._inflight, return_exceptions=True)
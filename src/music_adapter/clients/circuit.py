@@ -0,0 +1,76 @@
+# src/music_adapter/clients/circuit.py
+import logging
+import time
+from typing import Dict, Optional
+import prometheus_client
+from yarl import URL
+
+from music_adapter.config.settings import get_settings
+
+settings = get_settings()
+log = logging.getLogger(__name__)
+
+CIRCUIT_OPEN = prometheus_client.Gauge(
+    "adapter_circuit_open",
+    "1 if the circuit breaker of an endpoint is open",
+    ["endpoint"],
+    multiprocess_mode="livemax"
+)
+
+class CircuitOpenError(RuntimeError):
+    """Запрос отбит открытой цепью (endpoint временно считается недоступным)."""
+
+class CircuitBreaker:
+    """
+    Circuit Breaker одного endpoint'а: после threshold неудач подряд
+    запросы отбиваются сразу. Через reset_timeout запросы снова
+    пропускаются (half-open): успех закрывает цепь, неудача открывает
+    её на следующий интервал.
+    """
+    def __init__(self, name: str, threshold: int, reset_timeout: float):
+        self.name = name
+        self._threshold = threshold
+        self._reset_timeout = reset_timeout
+        self._fail_streak = 0
+        self._opened_at: Optional[float] = None
+        self._gauge = CIRCUIT_OPEN.labels(endpoint=name)
+
+    @property
+    def is_open(self) -> bool:
+        if self._opened_at is None:
+            return False
+        return time.monotonic() - self._opened_at < self._reset_timeout
+
+    def allow_request(self) -> bool:
+        return not self.is_open
+
+    def record_success(self) -> None:
+        self._fail_streak = 0
+        if self._opened_at is not None:
+            log.info(f"Circuit closed for {self.name}")
+            self._opened_at = None
+            self._gauge.set(0)
+
+    def record_failure(self) -> None:
+        self._fail_streak += 1
+        if self._fail_streak >= self._threshold and not self.is_open:
+            log.warning(f"Circuit opened for {self.name} after {self._fail_streak} failures")
+            self._opened_at = time.monotonic()
+            self._gauge.set(1)
+
+# Breaker'ы по endpoint'у (URL без query): не привязаны к event loop и HTTP-сессии;
+# два сервиса на одном host:port не размыкают цепи друг друга
+_breakers: Dict[str, CircuitBreaker] = {}
+
+def endpoint_name(url: str) -> str:
+    return str(URL(url).with_query(None).with_fragment(None)).rstrip("/")
+
+def get_breaker(url: str) -> CircuitBreaker:
+    """Breaker endpoint'а, которому принадлежит url."""
+    name = endpoint_name(url)
+    breaker = _breakers.get(name)
+    if breaker is None:
+        breaker = _breakers[name] = CircuitBreaker(
+            name, settings.CIRCUIT_FAILURE_THRESHOLD, settings.CIRCUIT_RESET_TIMEOUT
+        )
+    return breaker
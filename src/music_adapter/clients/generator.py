@@ -1,20 +1,87 @@
-from typing import Dict, Any
+from typing import Dict, Any, Optional
 import logging
 
-from music_adapter.clients.http_client import post_json
+from music_adapter.clients import http_client
+from music_adapter.clients.balancer import LoadBalancer, from_settings
 from music_adapter.config.settings import get_settings
+from music_adapter.core.cache import DiskCache, LRUCache, ResultCache, content_key
 
 settings = get_settings()
 log = logging.getLogger(__name__)
+SERVICE = "generate"  # метка метрик и бакет RATE_LIMITS для всех запросов к генератору
+_cache: Optional[ResultCache] = None
+_balancer: Optional[LoadBalancer] = None
 
 async def generate(clean_text: str, gen_type: str = "image") -> Dict[str, Any]:
     """
     Вызывает внешний сервис генерации.
     Ожидает: {"url": str, "status": str}
+    Результат кэшируется по хэшу (clean_text, gen_type).
     """
     log.debug("Calling generation service")
     payload = {
         "clean_text": clean_text,
         "type": gen_type
     }
-    return await post_json(settings.GENERATION_URL, payload)
\ No newline at end of file
+
+    def call():
+        # генерация не идемпотентна: без hedging и без повтора на другой реплике
+        # после того, как запрос мог дойти до сервиса
+        return _get_balancer().call(
+            lambda url: http_client.post_json(url, payload, service=SERVICE), idempotent=False
+        )
+
+    if not settings.GENERATION_CACHE_ENABLED:
+        return await call()
+    return await _get_cache().get_or_compute(content_key(gen_type, clean_text), call)
+
+def _jobs_url() -> str:
+    # задачи не балансируются: job_id известен только реплике, принявшей задачу
+    if settings.GENERATION_JOBS_URL:
+        return settings.GENERATION_JOBS_URL.rstrip("/")
+    return settings.GENERATION_URL.rstrip("/") + "/jobs"
+
+async def submit_job(clean_text: str, gen_type: str, callback_url: Optional[str]) -> str:
+    """
+    Поставить долгую генерацию в очередь генератора.
+    POST {jobs_url} → {"job_id": str}; по завершении генератор вызывает callback_url.
+    """
+    log.debug("Submitting generation job")
+    payload = {
+        "clean_text": clean_text,
+        "type": gen_type,
+        "callback_url": callback_url,
+    }
+    resp = await http_client.post_json(_jobs_url(), payload, service=SERVICE)
+    return str(resp["job_id"])
+
+async def get_job(job_id: str) -> Dict[str, Any]:
+    """
+    Статус задачи (запасной путь, если webhook не пришёл).
+    GET {jobs_url}/{job_id} → {"status": str, "url"?: str, "error"?: str}
+    """
+    # один breaker на все задачи, а не на каждый job_id
+    return await http_client.get_json(f"{_jobs_url()}/{job_id}", service=SERVICE, endpoint=_jobs_url())
+
+def _get_balancer() -> LoadBalancer:
+    global _balancer
+    if _balancer is None:
+        _balancer = from_settings(SERVICE, settings.GENERATION_URL, settings.GENERATION_URLS)
+    return _balancer
+
+def _get_cache() -> ResultCache:
+    global _cache
+    if _cache is None:
+        disk = None
+        if settings.GENERATION_CACHE_PATH:
+            disk = DiskCache(settings.GENERATION_CACHE_PATH, ttl=settings.GENERATION_CACHE_TTL)
+        memory = LRUCache(
+            settings.GENERATION_CACHE_SIZE, ttl=settings.GENERATION_CACHE_TTL, name="generation"
+        )
+        _cache = ResultCache("generation", memory, disk)
+    return _cache
+
+def close() -> None:
+    """Закрыть дисковый уровень кэша при shutdown."""
+    if _cache is not None:
+        _cache.close()
@@ -1,78 +1,262 @@
 # src/music_adapter/clients/http_client.py
 import asyncio
+import contextvars
 import logging
-from typing import Any, Dict
+import time
+from typing import Any, Dict, Optional
 import aiohttp
+import prometheus_client
 from aiohttp import ClientError, ClientResponseError
 from opentelemetry import trace
 
+from music_adapter.clients.circuit import CircuitOpenError, get_breaker
+from music_adapter.clients.ratelimit import get_limiter, parse_retry_after
 from music_adapter.config.settings import get_settings
+from music_adapter.core import codec
+from music_adapter.core.compression import compress
 from music_adapter.core.utils import retry_with_backoff, record_request
 
 settings = get_settings()
 tracer = trace.get_tracer(__name__)
 log = logging.getLogger(__name__)
 
+HTTP_POOL_IN_USE = prometheus_client.Gauge(
+    "adapter_http_pool_connections_in_use",
+    "Connections currently acquired from the shared HTTP pool",
+    ["pool"],
+    multiprocess_mode="livesum"
+)
+HTTP_POOL_LIMIT = prometheus_client.Gauge(
+    "adapter_http_pool_limit",
+    "Configured HTTP pool limits",
+    ["pool", "scope"],
+    multiprocess_mode="livemax"
+)
+HTTP_POOL_WAIT = prometheus_client.Histogram(
+    "adapter_http_pool_wait_seconds",
+    "Time spent waiting for a free connection in the HTTP pool",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+)
+
+_JSON_HEADERS = {"Content-Type": "application/json"}
+
+REQUEST_RETRIES = 3
+# повторы внутри запроса; 0, когда повторяет RetryScheduler через очередь задержки брокера
+_request_retries = REQUEST_RETRIES
+
+def set_request_retries(retries: int) -> None:
+    """Число повторов HTTP-запроса внутри обработчика (выставляет MusicAdapter.open)."""
+    global _request_retries
+    _request_retries = retries
+
+DEFAULT_POOL = "default"
+# пул запросов текущей задачи (lane события), см. use_pool
+CURRENT_POOL: contextvars.ContextVar = contextvars.ContextVar("http_pool", default=DEFAULT_POOL)
+
+def _pool_trace_config() -> aiohttp.TraceConfig:
+    """Замер ожидания свободного соединения (очередь в TCPConnector)."""
+    async def on_queued_start(session, ctx, params):
+        ctx.queued_at = asyncio.get_running_loop().time()
+
+    async def on_queued_end(session, ctx, params):
+        HTTP_POOL_WAIT.observe(asyncio.get_running_loop().time() - ctx.queued_at)
+
+    config = aiohttp.TraceConfig()
+    config.on_connection_queued_start.append(on_queued_start)
+    config.on_connection_queued_end.append(on_queued_end)
+    return config
+
 class HTTPClient:
     """
     Асинхронный HTTP-клиент с единой aiohttp.Session,
-    retry/backoff, метриками и Circuit Breaker.
+    retry/backoff, метриками и Circuit Breaker на каждый endpoint.
+    Создаётся внутри работающего event loop (см. init_client).
+    Отдельный пул (pool) — свой TCPConnector со своими лимитами.
     """
-    def __init__(self):
-        self._session = aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=settings.HTTP_TIMEOUT))
-        # простейший CB: считаем неудачи подряд
-        self._fail_streak = 0
-        self._cb_threshold = 5
-        self._cb_reset_interval = 60  # сек
-        self._last_failure_time = None
-
-    async def post_json(self, url: str, payload: Dict[str, Any]) -> Dict[str, Any]:
-        service = url.rsplit("/", 1)[-1] or "http"
-        start_ns = trace.time_ns()
-
-        # Circuit Breaker: если слишком много ошибок подряд и мало времени прошло — кидаем сразу
-        if self._fail_streak >= self._cb_threshold:
-            elapsed = asyncio.get_event_loop().time() - (self._last_failure_time or 0)
-            if elapsed < self._cb_reset_interval:
-                raise RuntimeError(f"Circuit open for service={service}")
-            # иначе сбросить счётчик после таймаута
-            self._fail_streak = 0
+    def __init__(self, pool: str = DEFAULT_POOL, per_host: Optional[int] = None):
+        self._loop = asyncio.get_running_loop()
+        self.pool = pool
+        # 0 — пул на хост по размеру prefetch: столько запросов одновременно в работе
+        per_host = per_host or settings.HTTP_POOL_PER_HOST or settings.BROKER_PREFETCH
+        self._connector = aiohttp.TCPConnector(
+            limit=settings.HTTP_POOL_LIMIT,
+            limit_per_host=per_host,
+            keepalive_timeout=settings.HTTP_KEEPALIVE,
+            use_dns_cache=True,
+            ttl_dns_cache=settings.HTTP_DNS_TTL,
+        )
+        self._session = aiohttp.ClientSession(
+            connector=self._connector,
+            timeout=aiohttp.ClientTimeout(
+                total=settings.HTTP_TIMEOUT,
+                connect=settings.HTTP_CONNECT_TIMEOUT,
+                sock_read=settings.HTTP_READ_TIMEOUT,
+            ),
+            trace_configs=[_pool_trace_config()],
+        )
+        self._in_use = HTTP_POOL_IN_USE.labels(pool=pool)
+        HTTP_POOL_LIMIT.labels(pool=pool, scope="total").set(settings.HTTP_POOL_LIMIT)
+        HTTP_POOL_LIMIT.labels(pool=pool, scope="per_host").set(per_host)
+
+    async def post_json(
+        self,
+        url: str,
+        payload: Dict[str, Any],
+        service: Optional[str] = None,
+        endpoint: Optional[str] = None
+    ) -> Dict[str, Any]:
+        return await self.request_json("POST", url, payload, service=service, endpoint=endpoint)
+
+    async def get_json(
+        self,
+        url: str,
+        service: Optional[str] = None,
+        endpoint: Optional[str] = None
+    ) -> Dict[str, Any]:
+        return await self.request_json("GET", url, service=service, endpoint=endpoint)
+
+    async def request_json(
+        self,
+        method: str,
+        url: str,
+        payload: Optional[Dict[str, Any]] = None,
+        service: Optional[str] = None,
+        endpoint: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """
+        service — логический сервис (preprocess, generate): метка метрик и
+        бакет RATE_LIMITS, общий для всех его endpoint'ов (пачки, задачи).
+        Без него — последний сегмент пути URL.
+        endpoint — URL, по которому ведётся Circuit Breaker (реплика
+        балансировщика, базовый URL задач); по умолчанию — сам url.
+        """
+        service = service or url.rsplit("/", 1)[-1] or "http"
+        start_ns = time.time_ns()
+
+        # Circuit Breaker endpoint'а: отказ одной реплики не закрывает другие сервисы
+        breaker = get_breaker(endpoint or url)
+        if not breaker.allow_request():
+            raise CircuitOpenError(f"Circuit open for service={service} endpoint={breaker.name}")
+
+        limiter = get_limiter(service)
+        # тело кодируется сразу в bytes, ответ разбирается из bytes без str-копии
+        data = codec.dumps(payload) if payload is not None else None
+        headers = _JSON_HEADERS
+        if data is not None and settings.COMPRESSION_HTTP:
+            data, encoding = compress(data, "http")
+            if encoding is not None:
+                headers = {**_JSON_HEADERS, "Content-Encoding": encoding}
 
         async def _do_request():
-            async with self._session.post(url, json=payload) as resp:
-                resp.raise_for_status()
-                return await resp.json()
+            throttled = 0
+            while True:
+                if limiter is not None:
+                    await limiter.acquire()
+                async with self._session.request(method, url, data=data, headers=headers) as resp:
+                    self._in_use.set(self.connections_in_use)
+                    # 429 при лимите — ждём токен заново, не тратя попытки retry_with_backoff
+                    if (
+                        resp.status == 429 and limiter is not None
+                        and throttled < settings.RATE_LIMIT_MAX_THROTTLED
+                    ):
+                        await limiter.throttled(parse_retry_after(resp.headers.get("Retry-After")))
+                        throttled += 1
+                        continue
+                    resp.raise_for_status()
+                    return codec.loads(await resp.read())
 
-        with tracer.start_as_current_span(f"HTTP POST {service}"):
+        with tracer.start_as_current_span(f"HTTP {method} {service}"):
             try:
-                result = await retry_with_backoff(_do_request, retries=3, base_delay=0.5)
-                latency = (trace.time_ns() - start_ns) / 1e9
+                try:
+                    result = await retry_with_backoff(_do_request, retries=_request_retries, base_delay=0.5)
+                finally:
+                    self._in_use.set(self.connections_in_use)
+                latency = (time.time_ns() - start_ns) / 1e9
                 record_request(service, "success", latency)
-                # сброс цепочки неудач
-                self._fail_streak = 0
+                breaker.record_success()
                 return result
             except ClientResponseError as e:
-                latency = (trace.time_ns() - start_ns) / 1e9
+                latency = (time.time_ns() - start_ns) / 1e9
                 record_request(service, f"error_{e.status}", latency)
-                self._fail_streak += 1
-                self._last_failure_time = asyncio.get_event_loop().time()
+                # 429 — исчерпана квота, а не отказ endpoint'а: цепь не размыкаем
+                if e.status != 429:
+                    breaker.record_failure()
                 log.error(f"HTTP {service} returned {e.status}")
                 raise
             except ClientError as e:
-                latency = (trace.time_ns() - start_ns) / 1e9
+                latency = (time.time_ns() - start_ns) / 1e9
                 record_request(service, "client_error", latency)
-                self._fail_streak += 1
-                self._last_failure_time = asyncio.get_event_loop().time()
+                breaker.record_failure()
                 log.error(f"HTTP client error for {service}: {e}")
                 raise
             except Exception as e:
-                latency = (trace.time_ns() - start_ns) / 1e9
+                latency = (time.time_ns() - start_ns) / 1e9
                 record_request(service, "error", latency)
-                self._fail_streak += 1
-                self._last_failure_time = asyncio.get_event_loop().time()
-                log.error(f"Unexpected error in HTTPClient.post_json: {e}")
+                breaker.record_failure()
+                log.error(f"Unexpected error in HTTPClient.request_json: {e}")
                 raise
 
+    @property
+    def connections_in_use(self) -> int:
+        # у TCPConnector нет публичного счётчика занятых соединений
+        return len(getattr(self._connector, "_acquired", ()))
+
+    @property
+    def closed(self) -> bool:
+        return self._session.closed
+
     async def close(self):
         """Закрыть сессию при shutdown."""
         await self._session.close()
+
+# Общие на процесс клиенты по пулам: создаются в MusicAdapter.start, закрываются в shutdown
+_clients: Dict[str, HTTPClient] = {}
+_pool_limits: Dict[str, int] = {}
+
+def configure_pool(pool: str, per_host: int) -> None:
+    """Лимит соединений на хост для отдельного пула (применяется при создании клиента)."""
+    _pool_limits[pool] = per_host
+
+def use_pool(pool: str) -> contextvars.Token:
+    """Запросы текущей задачи (и порождённых ею) пойдут через пул pool."""
+    return CURRENT_POOL.set(pool)
+
+async def init_client() -> HTTPClient:
+    """Создать общий клиент (идемпотентно)."""
+    return get_client()
+
+def get_client(pool: Optional[str] = None) -> HTTPClient:
+    """
+    Вернуть клиент пула (по умолчанию — пула текущей задачи), создав его
+    при первом обращении. Клиент привязан к event loop, поэтому в новом
+    loop создаётся заново.
+    """
+    pool = pool or CURRENT_POOL.get()
+    client = _clients.get(pool)
+    if client is None or client.closed or client._loop is not asyncio.get_running_loop():
+        client = _clients[pool] = HTTPClient(pool, _pool_limits.get(pool))
+    return client
+
+def pool_ready() -> bool:
+    """Общий пул создан и не закрыт (для /ready)."""
+    client = _clients.get(DEFAULT_POOL)
+    return client is not None and not client.closed
+
+async def close_client() -> None:
+    clients = list(_clients.values())
+    _clients.clear()
+    for client in clients:
+        await client.close()
+
+async def post_json(
+    url: str,
+    payload: Dict[str, Any],
+    service: Optional[str] = None,
+    endpoint: Optional[str] = None
+) -> Dict[str, Any]:
+    """POST JSON через общий пул соединений."""
+    return await get_client().post_json(url, payload, service=service, endpoint=endpoint)
+
+async def get_json(url: str, service: Optional[str] = None, endpoint: Optional[str] = None) -> Dict[str, Any]:
+    """GET JSON через общий пул соединений."""
+    return await get_client().get_json(url, service=service, endpoint=endpoint)
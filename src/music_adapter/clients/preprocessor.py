@@ -1,20 +1,72 @@
-from typing import Dict, Any
+from typing import Dict, Any, List, Optional
 import logging
 
-from music_adapter.clients.http_client import post_json
+from music_adapter.clients.balancer import LoadBalancer, from_settings
+from music_adapter.clients.batcher import MicroBatcher
+from music_adapter.clients import http_client
 from music_adapter.config.settings import get_settings
 
 settings = get_settings()
 log = logging.getLogger(__name__)
+SERVICE = "preprocess"  # метка метрик и бакет RATE_LIMITS, в т.ч. для пачек
+_batcher: Optional[MicroBatcher] = None
+_balancer: Optional[LoadBalancer] = None
 
 async def preprocess(text: str, lang: str = "ru") -> Dict[str, Any]:
     """
     Вызывает внешний сервис предобработки.
     Ожидает: {"clean_text": str, "features": dict}
+    При PREPROCESS_BATCH_ENABLED запрос уходит в общей пачке.
     """
     log.debug("Calling preprocessor service")
     payload = {
         "text": text,
         "options": {"lang": lang}
     }
-    return await post_json(settings.PREPROCESS_URL, payload)
\ No newline at end of file
+    if settings.PREPROCESS_BATCH_ENABLED:
+        return await _get_batcher().submit(payload)
+    return await _get_balancer().call(lambda url: http_client.post_json(url, payload, service=SERVICE))
+
+def _batch_url(base: str) -> str:
+    if settings.PREPROCESS_BATCH_URL:
+        return settings.PREPROCESS_BATCH_URL
+    return base.rstrip("/") + "/batch"
+
+async def _send_batch(payloads: List[Dict[str, Any]]) -> List[Any]:
+    """
+    POST {"items": [...]} → {"results": [...]}.
+    Элемент результата с ключом "error" — ошибка только этого события.
+    """
+    body = {"items": payloads}
+    resp = await _get_balancer().call(lambda url: http_client.post_json(
+        _batch_url(url), body, service=SERVICE, endpoint=url
+    ))
+    results: List[Any] = []
+    for item in resp["results"]:
+        if isinstance(item, dict) and "error" in item:
+            results.append(RuntimeError(f"Preprocess failed: {item['error']}"))
+        else:
+            results.append(item)
+    return results
+
+def _get_balancer() -> LoadBalancer:
+    global _balancer
+    if _balancer is None:
+        _balancer = from_settings(SERVICE, settings.PREPROCESS_URL, settings.PREPROCESS_URLS)
+    return _balancer
+
+def _get_batcher() -> MicroBatcher:
+    global _batcher
+    if _batcher is None:
+        _batcher = MicroBatcher(
+            _send_batch,
+            max_size=settings.PREPROCESS_BATCH_MAX_SIZE,
+            window=settings.PREPROCESS_BATCH_WINDOW_MS / 1000,
+            service=SERVICE,
+        )
+    return _batcher
+
+async def close() -> None:
+    """Отправить накопленную пачку при shutdown."""
+    if _batcher is not None:
+        await _batcher.close()
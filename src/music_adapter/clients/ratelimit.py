@@ -0,0 +1,225 @@
+# src/music_adapter/clients/ratelimit.py
+import asyncio
+import fcntl
+import logging
+import os
+import struct
+import time
+from contextlib import asynccontextmanager
+from email.utils import parsedate_to_datetime
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+import prometheus_client
+
+from music_adapter.config.settings import get_settings
+
+settings = get_settings()
+log = logging.getLogger(__name__)
+
+RATE_LIMIT_WAIT = prometheus_client.Histogram(
+    "adapter_rate_limit_wait_seconds",
+    "Time a request waited for a rate limit token",
+    ["service"],
+    buckets=(0.001, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+)
+RATE_LIMIT_RATE = prometheus_client.Gauge(
+    "adapter_rate_limit_rate",
+    "Current allowed request rate (tokens per second), lowered on 429",
+    ["service"],
+    multiprocess_mode="livemax"
+)
+RATE_LIMIT_THROTTLED = prometheus_client.Counter(
+    "adapter_rate_limit_throttled_total",
+    "429 responses from a rate limited service",
+    ["service"]
+)
+
+def parse_rate_limits(value: str) -> Dict[str, Tuple[float, float]]:
+    """ "generate:10/20,process:50" → {service: (токенов в секунду, burst)}; burst по умолчанию = rate."""
+    result: Dict[str, Tuple[float, float]] = {}
+    for part in value.split(","):
+        part = part.strip()
+        if not part:
+            continue
+        name, sep, spec = part.partition(":")
+        rate, _, burst = spec.partition("/")
+        try:
+            if not sep or not name.strip():
+                raise ValueError
+            result[name.strip()] = (float(rate), float(burst or rate))
+        except ValueError:
+            raise ValueError(f"Invalid rate limit {part!r}, expected service:rate[/burst]") from None
+    return result
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Retry-After: секунды или HTTP-дата → секунды ожидания (None, если не разобрать)."""
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError, IndexError, OverflowError):
+        return None
+
+class TokenBucket:
+    """
+    Token bucket сервиса: rate токенов в секунду, не больше burst впрок.
+    Ожидающие встают в очередь (FIFO) и спят до появления токена, не
+    блокируя event loop. На 429 скорость умножается на backoff (не ниже
+    min_factor от заданной) и бакет закрывается на Retry-After; затем
+    скорость линейно возвращается к заданной за recovery секунд.
+    """
+    _clock = staticmethod(time.monotonic)
+
+    def __init__(
+        self,
+        name: str,
+        rate: float,
+        burst: float,
+        min_factor: float = 0.1,
+        backoff: float = 0.5,
+        recovery: float = 30.0
+    ):
+        if rate <= 0:
+            raise ValueError(f"Rate limit for {name} must be positive")
+        self.name = name
+        self.max_rate = rate
+        self.burst = max(1.0, burst)
+        self._min_rate = rate * min_factor
+        self._backoff = backoff
+        self._recovery = recovery
+        # токены, время обновления, текущая скорость, закрыт до (Retry-After)
+        self._state = [self.burst, self._clock(), rate, 0.0]
+        self._queue = asyncio.Lock()
+        self._wait = RATE_LIMIT_WAIT.labels(service=name)
+        self._rate = RATE_LIMIT_RATE.labels(service=name)
+        self._rate.set(rate)
+
+    @asynccontextmanager
+    async def _locked(self) -> AsyncIterator[None]:
+        yield
+
+    def _load(self) -> List[float]:
+        return self._state
+
+    def _store(self, state: List[float]) -> None:
+        self._state = state
+
+    def _advance(self, state: List[float], now: float) -> List[float]:
+        tokens, updated, rate, blocked_until = state
+        elapsed = max(0.0, now - updated)
+        if rate < self.max_rate:
+            rate = self.max_rate if self._recovery <= 0 else min(
+                self.max_rate, rate + self.max_rate * elapsed / self._recovery
+            )
+        return [min(self.burst, tokens + elapsed * rate), now, rate, blocked_until]
+
+    async def _take(self) -> float:
+        """Взять токен; 0 — взят, иначе сколько ждать до следующей попытки."""
+        async with self._locked():
+            now = self._clock()
+            state = self._advance(self._load(), now)
+            if now < state[3]:
+                wait = state[3] - now
+            elif state[0] >= 1.0:
+                state[0] -= 1.0
+                wait = 0.0
+            else:
+                wait = (1.0 - state[0]) / state[2]
+            self._store(state)
+        self._rate.set(state[2])
+        return wait
+
+    async def acquire(self) -> None:
+        start = time.monotonic()
+        async with self._queue:
+            while True:
+                wait = await self._take()
+                if wait <= 0:
+                    break
+                await asyncio.sleep(wait)
+        self._wait.observe(time.monotonic() - start)
+
+    async def throttled(self, retry_after: Optional[float] = None) -> None:
+        """Сервис ответил 429: снизить скорость и выдержать паузу."""
+        async with self._locked():
+            now = self._clock()
+            state = self._advance(self._load(), now)
+            state[2] = max(self._min_rate, state[2] * self._backoff)
+            state[0] = min(state[0], 0.0)
+            pause = retry_after if retry_after is not None else 1.0 / state[2]
+            state[3] = max(state[3], now + min(pause, settings.RATE_LIMIT_MAX_RETRY_AFTER))
+            self._store(state)
+        RATE_LIMIT_THROTTLED.labels(service=self.name).inc()
+        self._rate.set(state[2])
+        log.warning(f"{self.name} throttled (429), rate lowered to {state[2]:.2f}/s")
+
+class FileTokenBucket(TokenBucket):
+    """
+    Бакет, общий для процессов одного хоста (воркеры --workers N):
+    состояние — 32 байта в файле под flock. Критическая секция —
+    чтение и запись четырёх чисел; flock берётся без блокировки
+    (LOCK_NB), а занятый другим процессом — повторяется через
+    LOCK_RETRY, не останавливая event loop.
+    Время — wall clock: файл переживает рестарты процессов.
+    """
+    _clock = staticmethod(time.time)
+    _FORMAT = struct.Struct("<dddd")
+    LOCK_RETRY = 0.0005
+
+    def __init__(self, name: str, rate: float, burst: float, path: str, **kwargs):
+        super().__init__(name, rate, burst, **kwargs)
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+
+    @asynccontextmanager
+    async def _locked(self) -> AsyncIterator[None]:
+        while True:
+            try:
+                fcntl.flock(self._fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                break
+            except BlockingIOError:
+                await asyncio.sleep(self.LOCK_RETRY)
+        try:
+            yield
+        finally:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+
+    def _load(self) -> List[float]:
+        data = os.pread(self._fd, self._FORMAT.size, 0)
+        if len(data) < self._FORMAT.size:
+            return [self.burst, self._clock(), self.max_rate, 0.0]
+        return list(self._FORMAT.unpack(data))
+
+    def _store(self, state: List[float]) -> None:
+        os.pwrite(self._fd, self._FORMAT.pack(*state), 0)
+
+    def close(self) -> None:
+        os.close(self._fd)
+
+# Бакеты по сервису (метка service в adapter_request_total), создаются при первом запросе
+_limiters: Dict[str, Optional[TokenBucket]] = {}
+
+def get_limiter(service: str) -> Optional[TokenBucket]:
+    """Бакет сервиса из RATE_LIMITS или None, если лимит не задан."""
+    if service in _limiters:
+        return _limiters[service]
+    limits = parse_rate_limits(settings.RATE_LIMITS)
+    limiter = None
+    if service in limits:
+        rate, burst = limits[service]
+        kwargs = dict(
+            min_factor=settings.RATE_LIMIT_MIN_FACTOR,
+            backoff=settings.RATE_LIMIT_BACKOFF,
+            recovery=settings.RATE_LIMIT_RECOVERY,
+        )
+        if settings.RATE_LIMIT_SHARED_DIR:
+            path = os.path.join(settings.RATE_LIMIT_SHARED_DIR, f"{service}.bucket")
+            limiter = FileTokenBucket(service, rate, burst, path, **kwargs)
+        else:
+            limiter = TokenBucket(service, rate, burst, **kwargs)
+    _limiters[service] = limiter
+    return limiter
@@ -1,27 +1,185 @@
 import os
 from functools import lru_cache
-from pydantic import BaseSettings, Field, AnyHttpUrl
+from typing import Optional
+from urllib.parse import urlsplit
+from pydantic import BaseSettings, Field, validator
+
+def _check_http_url(value: Optional[str]) -> Optional[str]:
+    # вместо AnyHttpUrl: его регулярное выражение компилируется ~0.1 с при старте
+    if value is None:
+        return None
+    parts = urlsplit(value)
+    if parts.scheme not in ("http", "https") or not parts.hostname:
+        raise ValueError(f"invalid http(s) URL {value!r}")
+    return value
 
 class Settings(BaseSettings):
     # Broker
+    BROKER_BACKEND: str = Field("rabbitmq", env="BROKER_BACKEND")  # rabbitmq | kafka | memory
     BROKER_URL: str = Field(..., env="BROKER_URL")
     IN_TOPIC: str = Field("raw.music.events", env="IN_TOPIC")
     OUT_TOPIC: str = Field("processed.music.events", env="OUT_TOPIC")
+    KAFKA_GROUP_ID: str = Field("music-adapter", env="KAFKA_GROUP_ID")
+    KAFKA_MAX_POLL_RECORDS: int = Field(500, env="KAFKA_MAX_POLL_RECORDS")
+    KAFKA_LINGER_MS: int = Field(5, env="KAFKA_LINGER_MS")
 
     # Services
-    PREPROCESS_URL: AnyHttpUrl = Field(..., env="PREPROCESS_URL")
-    GENERATION_URL: AnyHttpUrl = Field(..., env="GENERATION_URL")
+    PREPROCESS_URL: str = Field(..., env="PREPROCESS_URL")
+    GENERATION_URL: str = Field(..., env="GENERATION_URL")
+
+    # Дополнительные реплики сервисов (через запятую), балансировка и hedging
+    PREPROCESS_URLS: str = Field("", env="PREPROCESS_URLS")
+    GENERATION_URLS: str = Field("", env="GENERATION_URLS")
+    LB_STRATEGY: str = Field("ewma", env="LB_STRATEGY")  # ewma | least_outstanding
+    CIRCUIT_FAILURE_THRESHOLD: int = Field(5, env="CIRCUIT_FAILURE_THRESHOLD")
+    CIRCUIT_RESET_TIMEOUT: float = Field(60.0, env="CIRCUIT_RESET_TIMEOUT")
+    HEDGE_ENABLED: bool = Field(False, env="HEDGE_ENABLED")
+    HEDGE_QUANTILE: float = Field(0.95, env="HEDGE_QUANTILE")
+    HEDGE_MIN_DELAY: float = Field(0.05, env="HEDGE_MIN_DELAY")
+    HEDGE_MIN_SAMPLES: int = Field(20, env="HEDGE_MIN_SAMPLES")
+
+    # Rate limiting по сервисам (метка service): "generate:10/20" — 10 запросов/с, burst 20
+    RATE_LIMITS: str = Field("", env="RATE_LIMITS")
+    RATE_LIMIT_BACKOFF: float = Field(0.5, env="RATE_LIMIT_BACKOFF")
+    RATE_LIMIT_MIN_FACTOR: float = Field(0.1, env="RATE_LIMIT_MIN_FACTOR")
+    RATE_LIMIT_RECOVERY: float = Field(30.0, env="RATE_LIMIT_RECOVERY")
+    RATE_LIMIT_MAX_RETRY_AFTER: float = Field(60.0, env="RATE_LIMIT_MAX_RETRY_AFTER")
+    RATE_LIMIT_MAX_THROTTLED: int = Field(5, env="RATE_LIMIT_MAX_THROTTLED")
+    RATE_LIMIT_SHARED_DIR: Optional[str] = Field(None, env="RATE_LIMIT_SHARED_DIR")
+
+    # Preprocess micro-batching (opt-in)
+    PREPROCESS_BATCH_ENABLED: bool = Field(False, env="PREPROCESS_BATCH_ENABLED")
+    PREPROCESS_BATCH_URL: Optional[str] = Field(None, env="PREPROCESS_BATCH_URL")
+    PREPROCESS_BATCH_WINDOW_MS: int = Field(10, env="PREPROCESS_BATCH_WINDOW_MS")
+    PREPROCESS_BATCH_MAX_SIZE: int = Field(32, env="PREPROCESS_BATCH_MAX_SIZE")
+
+    # Generation result cache: одинаковые (текст, тип) получают один артефакт — включается явно
+    GENERATION_CACHE_ENABLED: bool = Field(False, env="GENERATION_CACHE_ENABLED")
+    GENERATION_CACHE_SIZE: int = Field(1024, env="GENERATION_CACHE_SIZE")
+    GENERATION_CACHE_TTL: int = Field(3600, env="GENERATION_CACHE_TTL")
+    GENERATION_CACHE_PATH: Optional[str] = Field(None, env="GENERATION_CACHE_PATH")
 
     # Timeouts & Prefetch
     HTTP_TIMEOUT: int = Field(10, env="HTTP_TIMEOUT")
     BROKER_PREFETCH: int = Field(10, env="BROKER_PREFETCH")
+    BROKER_PUBLISH_CHANNELS: int = Field(2, env="BROKER_PUBLISH_CHANNELS")
+    BROKER_PUBLISH_MAX_PENDING: int = Field(256, env="BROKER_PUBLISH_MAX_PENDING")
+
+    # Adaptive concurrency (AIMD по MSG_LATENCY / MSG_COUNT), меняет QoS на лету
+    ADAPTIVE_CONCURRENCY_ENABLED: bool = Field(False, env="ADAPTIVE_CONCURRENCY_ENABLED")
+    ADAPTIVE_MIN_LIMIT: int = Field(2, env="ADAPTIVE_MIN_LIMIT")
+    ADAPTIVE_MAX_LIMIT: int = Field(100, env="ADAPTIVE_MAX_LIMIT")
+    ADAPTIVE_INTERVAL: float = Field(5.0, env="ADAPTIVE_INTERVAL")
+    ADAPTIVE_ERROR_RATE: float = Field(0.05, env="ADAPTIVE_ERROR_RATE")
+    ADAPTIVE_LATENCY_TOLERANCE: float = Field(2.0, env="ADAPTIVE_LATENCY_TOLERANCE")
+    ADAPTIVE_BACKOFF: float = Field(0.7, env="ADAPTIVE_BACKOFF")
+
+    # HTTP connection pool
+    HTTP_CONNECT_TIMEOUT: float = Field(3.0, env="HTTP_CONNECT_TIMEOUT")
+    HTTP_READ_TIMEOUT: float = Field(10.0, env="HTTP_READ_TIMEOUT")
+    HTTP_POOL_LIMIT: int = Field(100, env="HTTP_POOL_LIMIT")
+    HTTP_POOL_PER_HOST: int = Field(0, env="HTTP_POOL_PER_HOST")  # 0 = BROKER_PREFETCH
+    HTTP_KEEPALIVE: float = Field(30.0, env="HTTP_KEEPALIVE")
+    HTTP_DNS_TTL: int = Field(300, env="HTTP_DNS_TTL")
+
+    # Pipeline: лимиты параллелизма стадий и размер очередей между ними
+    PIPELINE_QUEUE_SIZE: int = Field(10, env="PIPELINE_QUEUE_SIZE")
+    PIPELINE_DECODE_CONCURRENCY: int = Field(2, env="PIPELINE_DECODE_CONCURRENCY")
+    PIPELINE_PREPROCESS_CONCURRENCY: int = Field(10, env="PIPELINE_PREPROCESS_CONCURRENCY")
+    PIPELINE_GENERATE_CONCURRENCY: int = Field(10, env="PIPELINE_GENERATE_CONCURRENCY")
+    PIPELINE_PUBLISH_CONCURRENCY: int = Field(10, env="PIPELINE_PUBLISH_CONCURRENCY")
+    PIPELINE_DRAIN_TIMEOUT: float = Field(30.0, env="PIPELINE_DRAIN_TIMEOUT")
+
+    # Instrumentation: задержка event loop и /debug/profile
+    LOOP_LAG_INTERVAL: float = Field(0.5, env="LOOP_LAG_INTERVAL")
+    LOOP_LAG_WARN: float = Field(0.5, env="LOOP_LAG_WARN")
+    DEBUG_PROFILE_ENABLED: bool = Field(False, env="DEBUG_PROFILE_ENABLED")  # только для отладки
+    PROFILE_MAX_SECONDS: float = Field(60.0, env="PROFILE_MAX_SECONDS")
+    PROFILE_INTERVAL_MS: float = Field(5.0, env="PROFILE_INTERVAL_MS")
+
+    # Priority lanes по generate_type: "lane:значение" через запятую
+    LANES_ENABLED: bool = Field(False, env="LANES_ENABLED")
+    LANE_CONCURRENCY: str = Field("image:8,mp4:2", env="LANE_CONCURRENCY")
+    LANE_BORROW: str = Field("image:4", env="LANE_BORROW")  # сколько слотов можно занять у простаивающих
+    LANE_POOL_LIMIT: str = Field("", env="LANE_POOL_LIMIT")  # по умолчанию — LANE_CONCURRENCY
+    LANE_QUEUES: str = Field("", env="LANE_QUEUES")  # отдельные очереди, напр. "mp4:raw.music.events.mp4"
+    LANE_PREFETCH: str = Field("", env="LANE_PREFETCH")  # для отдельных очередей, по умолчанию — LANE_CONCURRENCY
+    LANE_DEFAULT: str = Field("image", env="LANE_DEFAULT")
+
+    # Idempotency: пропуск повторно доставленных событий по id
+    IDEMPOTENCY_ENABLED: bool = Field(False, env="IDEMPOTENCY_ENABLED")
+    IDEMPOTENCY_MAX_ENTRIES: int = Field(50000, env="IDEMPOTENCY_MAX_ENTRIES")
+    IDEMPOTENCY_TTL: int = Field(24 * 3600, env="IDEMPOTENCY_TTL")
+    IDEMPOTENCY_PATH: Optional[str] = Field(None, env="IDEMPOTENCY_PATH")
+    IDEMPOTENCY_DUPLICATES: str = Field("drop", env="IDEMPOTENCY_DUPLICATES")  # drop | republish
+
+    # Publish spool: результаты, не опубликованные из-за недоступного брокера, пишутся на диск
+    SPOOL_ENABLED: bool = Field(False, env="SPOOL_ENABLED")
+    SPOOL_DIR: str = Field("spool", env="SPOOL_DIR")
+    SPOOL_SEGMENT_BYTES: int = Field(16 * 1024 * 1024, env="SPOOL_SEGMENT_BYTES")
+    SPOOL_MAX_BYTES: int = Field(1024 * 1024 * 1024, env="SPOOL_MAX_BYTES")
+    SPOOL_FSYNC: str = Field("interval", env="SPOOL_FSYNC")  # always | interval | never
+    SPOOL_FSYNC_INTERVAL: float = Field(1.0, env="SPOOL_FSYNC_INTERVAL")
+    SPOOL_REPLAY_BATCH: int = Field(100, env="SPOOL_REPLAY_BATCH")
+    SPOOL_REPLAY_INTERVAL: float = Field(5.0, env="SPOOL_REPLAY_INTERVAL")
+
+    # Delayed retry: упавшие на временной ошибке события ждут в очередях с TTL, а не в обработчике
+    RETRY_ENABLED: bool = Field(False, env="RETRY_ENABLED")
+    RETRY_DELAYS: str = Field("5,30,120", env="RETRY_DELAYS")  # секунды, уровень на попытку
+    RETRY_MAX_ATTEMPTS: int = Field(3, env="RETRY_MAX_ATTEMPTS")
+
+    # Async generation jobs: долгие типы генерации паркуются до webhook/опроса
+    ASYNC_JOBS_ENABLED: bool = Field(False, env="ASYNC_JOBS_ENABLED")
+    ASYNC_JOB_TYPES: str = Field("mp4", env="ASYNC_JOB_TYPES")  # через запятую
+    GENERATION_JOBS_URL: Optional[str] = Field(None, env="GENERATION_JOBS_URL")
+    JOB_CALLBACK_URL: Optional[str] = Field(None, env="JOB_CALLBACK_URL")
+    JOB_CALLBACK_SECRET: Optional[str] = Field(None, env="JOB_CALLBACK_SECRET")  # HMAC-подпись webhook'а
+    JOB_STORE_PATH: str = Field("pending_jobs.db", env="JOB_STORE_PATH")
+    JOB_POLL_INTERVAL: float = Field(30.0, env="JOB_POLL_INTERVAL")
+    JOB_POLL_AFTER: float = Field(120.0, env="JOB_POLL_AFTER")
+    JOB_TIMEOUT: float = Field(6 * 3600.0, env="JOB_TIMEOUT")
 
     # JSON schema
     SCHEMA_PATH: str = Field("schemas/event_schema.json", env="SCHEMA_PATH")
+    SCHEMA_FAST_PATH: bool = Field(True, env="SCHEMA_FAST_PATH")
+
+    # Compression: тела от COMPRESSION_MIN_BYTES сжимаются (zstd | gzip); входящие
+    # сообщения с content_encoding распаковываются всегда
+    COMPRESSION_ALGORITHM: str = Field("zstd", env="COMPRESSION_ALGORITHM")
+    COMPRESSION_MIN_BYTES: int = Field(1024, env="COMPRESSION_MIN_BYTES")
+    COMPRESSION_LEVEL: int = Field(3, env="COMPRESSION_LEVEL")
+    COMPRESSION_BROKER: bool = Field(False, env="COMPRESSION_BROKER")
+    COMPRESSION_HTTP: bool = Field(False, env="COMPRESSION_HTTP")
+
+    # JSON codec: auto | orjson | msgspec | json
+    JSON_CODEC: str = Field("auto", env="JSON_CODEC")
+
+    # Logging: через очередь в фоновый поток; json | text
+    LOG_LEVEL: str = Field("INFO", env="LOG_LEVEL")
+    LOG_FORMAT: str = Field("text", env="LOG_FORMAT")  # text | json
+    LOG_QUEUE_SIZE: int = Field(10000, env="LOG_QUEUE_SIZE")
+    LOG_SAMPLE_RATE: float = Field(1.0, env="LOG_SAMPLE_RATE")  # доля INFO-записей о событиях
+
+    # Tracing: хвостовое сэмплирование трасс перед OTLP-экспортом
+    TRACE_TAIL_SAMPLING: bool = Field(False, env="TRACE_TAIL_SAMPLING")
+    TRACE_SAMPLE_RATE: float = Field(0.1, env="TRACE_SAMPLE_RATE")  # доля обычных трасс
+    TRACE_LATENCY_THRESHOLD: float = Field(2.0, env="TRACE_LATENCY_THRESHOLD")  # медленнее — сохраняются всегда
+    TRACE_BUFFER_MAX_SPANS: int = Field(10000, env="TRACE_BUFFER_MAX_SPANS")
+    TRACE_BUFFER_TTL: float = Field(60.0, env="TRACE_BUFFER_TTL")
 
     # Health endpoint
     HEALTH_PORT: int = Field(8000, env="HEALTH_PORT")
 
+    # Multi-process mode (python -m music_adapter.main --workers N)
+    WORKERS: int = Field(1, env="WORKERS")
+    WORKER_RESTART_DELAY: float = Field(1.0, env="WORKER_RESTART_DELAY")
+    PROMETHEUS_MULTIPROC_DIR: Optional[str] = Field(None, env="PROMETHEUS_MULTIPROC_DIR")
+
+    _http_urls = validator(
+        "PREPROCESS_URL", "GENERATION_URL", "PREPROCESS_BATCH_URL",
+        "GENERATION_JOBS_URL", "JOB_CALLBACK_URL", allow_reuse=True
+    )(_check_http_url)
+
     class Config:
         env_file = ".env"
         env_file_encoding = "utf-8"
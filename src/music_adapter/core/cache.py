@@ -0,0 +1,188 @@
+# src/music_adapter/core/cache.py
+import asyncio
+import hashlib
+import json
+import logging
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional
+import prometheus_client
+
+log = logging.getLogger(__name__)
+
+CACHE_HITS = prometheus_client.Counter(
+    "adapter_cache_hits_total",
+    "Cache hits",
+    ["cache", "tier"]
+)
+CACHE_MISSES = prometheus_client.Counter(
+    "adapter_cache_misses_total",
+    "Cache misses (upstream call made)",
+    ["cache"]
+)
+CACHE_EVICTIONS = prometheus_client.Counter(
+    "adapter_cache_evictions_total",
+    "Entries evicted from the in-memory tier",
+    ["cache", "reason"]
+)
+
+def content_key(*parts: str) -> str:
+    """Ключ по содержимому: sha256 от частей, разделённых \\0."""
+    h = hashlib.sha256()
+    for part in parts:
+        h.update(part.encode("utf-8"))
+        h.update(b"\0")
+    return h.hexdigest()
+
+class LRUCache:
+    """
+    Ограниченный по числу записей LRU с TTL.
+    """
+    def __init__(self, max_entries: int, ttl: float, name: str = "cache"):
+        self._data: "OrderedDict[str, tuple]" = OrderedDict()
+        self._max_entries = max_entries
+        self._ttl = ttl
+        self._name = name
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def get(self, key: str) -> Optional[Any]:
+        item = self._data.get(key)
+        if item is None:
+            return None
+        value, expires_at = item
+        if expires_at <= time.monotonic():
+            del self._data[key]
+            CACHE_EVICTIONS.labels(cache=self._name, reason="expired").inc()
+            return None
+        self._data.move_to_end(key)
+        return value
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        self._data[key] = (value, time.monotonic() + (ttl if ttl is not None else self._ttl))
+        self._data.move_to_end(key)
+        while len(self._data) > self._max_entries:
+            self._data.popitem(last=False)
+            CACHE_EVICTIONS.labels(cache=self._name, reason="size").inc()
+
+    def pop(self, key: str) -> Optional[Any]:
+        item = self._data.pop(key, None)
+        return item[0] if item else None
+
+class DiskCache:
+    """
+    Дисковый уровень на SQLite: переживает рестарт процесса.
+    Значения хранятся в JSON; вызовы выполняются в пуле потоков.
+    """
+    def __init__(self, path: str, ttl: float):
+        self._ttl = ttl
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        with self._lock, self._db:
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS cache ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)"
+            )
+            self._db.execute("DELETE FROM cache WHERE expires_at <= ?", (time.time(),))
+
+    def _get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            row = self._db.execute(
+                "SELECT value, expires_at FROM cache WHERE key = ?", (key,)
+            ).fetchone()
+        if row is None:
+            return None
+        if row[1] <= time.time():
+            with self._lock, self._db:
+                self._db.execute("DELETE FROM cache WHERE key = ?", (key,))
+            return None
+        return json.loads(row[0])
+
+    def _set(self, key: str, value: Any) -> None:
+        with self._lock, self._db:
+            self._db.execute(
+                "INSERT OR REPLACE INTO cache (key, value, expires_at) VALUES (?, ?, ?)",
+                (key, json.dumps(value), time.time() + self._ttl),
+            )
+
+    async def get(self, key: str) -> Optional[Any]:
+        return await asyncio.to_thread(self._get, key)
+
+    async def set(self, key: str, value: Any) -> None:
+        await asyncio.to_thread(self._set, key, value)
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
+
+class ResultCache:
+    """
+    Двухуровневый кэш результатов (память + опционально диск)
+    с single-flight: одновременные одинаковые запросы делят один вызов.
+    """
+    def __init__(self, name: str, memory: LRUCache, disk: Optional[DiskCache] = None):
+        self._name = name
+        self._memory = memory
+        self._disk = disk
+        self._inflight: Dict[str, asyncio.Future] = {}
+
+    async def get(self, key: str) -> Optional[Any]:
+        value = self._memory.get(key)
+        if value is not None:
+            CACHE_HITS.labels(cache=self._name, tier="memory").inc()
+            return value
+        if self._disk is not None:
+            value = await self._disk.get(key)
+            if value is not None:
+                CACHE_HITS.labels(cache=self._name, tier="disk").inc()
+                self._memory.set(key, value)
+                return value
+        return None
+
+    async def set(self, key: str, value: Any) -> None:
+        self._memory.set(key, value)
+        if self._disk is not None:
+            try:
+                await self._disk.set(key, value)
+            except Exception as e:
+                log.warning(f"Disk cache write failed for {self._name}: {e}")
+
+    async def get_or_compute(
+        self,
+        key: str,
+        compute: Callable[[], Awaitable[Any]]
+    ) -> Any:
+        value = await self.get(key)
+        if value is not None:
+            return value
+
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            CACHE_HITS.labels(cache=self._name, tier="inflight").inc()
+            return await asyncio.shield(inflight)
+
+        CACHE_MISSES.labels(cache=self._name).inc()
+        fut = asyncio.get_running_loop().create_future()
+        # ошибку могут не забрать, если ожидающих нет
+        fut.add_done_callback(lambda f: f.cancelled() or f.exception())
+        self._inflight[key] = fut
+        try:
+            value = await compute()
+        except asyncio.CancelledError:
+            fut.cancel()
+            raise
+        except Exception as e:
+            fut.set_exception(e)
+            raise
+        finally:
+            self._inflight.pop(key, None)
+        fut.set_result(value)
+        await self.set(key, value)
+        return value
+
+    def close(self) -> None:
+        if self._disk is not None:
+            self._disk.close()
@@ -0,0 +1,51 @@
+# src/music_adapter/core/codec.py
+import json
+import logging
+from typing import Any, Callable, Tuple, Union
+
+from music_adapter.config.settings import get_settings
+
+settings = get_settings()
+log = logging.getLogger(__name__)
+
+Buffer = Union[bytes, bytearray, memoryview]
+
+def _stdlib() -> Tuple[Callable[[Buffer], Any], Callable[[Any], bytes]]:
+    def loads(buf: Buffer) -> Any:
+        # json.loads принимает bytes/bytearray, но не memoryview
+        return json.loads(bytes(buf) if isinstance(buf, memoryview) else buf)
+
+    def dumps(obj: Any) -> bytes:
+        return json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+    return loads, dumps
+
+def _orjson() -> Tuple[Callable[[Buffer], Any], Callable[[Any], bytes]]:
+    import orjson
+    return orjson.loads, orjson.dumps
+
+def _msgspec() -> Tuple[Callable[[Buffer], Any], Callable[[Any], bytes]]:
+    import msgspec
+    return msgspec.json.Decoder().decode, msgspec.json.Encoder().encode
+
+_CODECS = {"orjson": _orjson, "msgspec": _msgspec, "json": _stdlib}
+
+def get_codec(name: str = "auto") -> Tuple[str, Callable[[Buffer], Any], Callable[[Any], bytes]]:
+    """
+    Вернуть (имя, loads, dumps). "auto" — orjson, затем msgspec, затем stdlib.
+    loads читает прямо из bytes/bytearray/memoryview тела сообщения,
+    dumps сразу отдаёт bytes для публикации/HTTP.
+    """
+    names = ["orjson", "msgspec", "json"] if name == "auto" else [name]
+    for candidate in names:
+        if candidate not in _CODECS:
+            raise ValueError(f"Unknown JSON codec {candidate!r}")
+        try:
+            loads_fn, dumps_fn = _CODECS[candidate]()
+        except ImportError:
+            continue
+        return candidate, loads_fn, dumps_fn
+    raise ValueError(f"JSON codec {name!r} is not available")
+
+CODEC_NAME, loads, dumps = get_codec(settings.JSON_CODEC)
+log.debug(f"Using JSON codec {CODEC_NAME}")
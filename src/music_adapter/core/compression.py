@@ -0,0 +1,105 @@
+# src/music_adapter/core/compression.py
+import gzip
+import logging
+import time
+import zlib
+from typing import Optional, Tuple
+import prometheus_client
+
+from music_adapter.config.settings import get_settings
+
+settings = get_settings()
+log = logging.getLogger(__name__)
+
+ENCODINGS = ("zstd", "gzip")
+MAX_DECOMPRESSED = 64 * 1024 * 1024  # защита от «zip-бомб» во входящих сообщениях
+
+COMPRESSION_INPUT = prometheus_client.Counter(
+    "adapter_compression_input_bytes_total",
+    "Bytes before compression (payloads that were compressed)",
+    ["target"]
+)
+COMPRESSION_OUTPUT = prometheus_client.Counter(
+    "adapter_compression_output_bytes_total",
+    "Bytes after compression",
+    ["target"]
+)
+COMPRESSION_SKIPPED = prometheus_client.Counter(
+    "adapter_compression_skipped_total",
+    "Payloads sent uncompressed: below the size threshold or not compressible",
+    ["target", "reason"]
+)
+COMPRESSION_CPU = prometheus_client.Histogram(
+    "adapter_compression_cpu_seconds",
+    "CPU time of the calling thread spent compressing or decompressing one payload",
+    ["op", "encoding"],
+    buckets=(0.00001, 0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.05)
+)
+
+def _zstd():
+    import zstandard
+    return zstandard
+
+def resolve_encoding(name: str) -> str:
+    """COMPRESSION_ALGORITHM → доступный алгоритм: без пакета zstandard zstd заменяется gzip."""
+    if name not in ENCODINGS:
+        raise ValueError(f"Unknown compression algorithm {name!r}, expected one of {ENCODINGS}")
+    if name == "zstd":
+        try:
+            _zstd()
+        except ImportError:
+            log.warning("zstandard is not installed, falling back to gzip compression")
+            return "gzip"
+    return name
+
+_encoding: Optional[str] = None
+
+def _compress(data: bytes, encoding: str, level: int) -> bytes:
+    if encoding == "zstd":
+        return _zstd().ZstdCompressor(level=level).compress(data)
+    return gzip.compress(data, compresslevel=level, mtime=0)
+
+def compress(data: bytes, target: str) -> Tuple[bytes, Optional[str]]:
+    """
+    Сжать тело для target (broker | http), если оно не меньше
+    COMPRESSION_MIN_BYTES. Возвращает (тело, content-encoding или None —
+    тело отправляется как есть, если сжатие ничего не выиграло).
+    """
+    global _encoding
+    if len(data) < settings.COMPRESSION_MIN_BYTES:
+        COMPRESSION_SKIPPED.labels(target=target, reason="small").inc()
+        return data, None
+    if _encoding is None:
+        _encoding = resolve_encoding(settings.COMPRESSION_ALGORITHM)
+    start = time.thread_time()
+    packed = _compress(data, _encoding, settings.COMPRESSION_LEVEL)
+    COMPRESSION_CPU.labels(op="compress", encoding=_encoding).observe(time.thread_time() - start)
+    if len(packed) >= len(data):
+        COMPRESSION_SKIPPED.labels(target=target, reason="incompressible").inc()
+        return data, None
+    COMPRESSION_INPUT.labels(target=target).inc(len(data))
+    COMPRESSION_OUTPUT.labels(target=target).inc(len(packed))
+    return packed, _encoding
+
+def decompress(data: bytes, encoding: Optional[str], max_size: int = MAX_DECOMPRESSED) -> bytes:
+    """Тело по content-encoding; без кодировки (или identity) возвращается как есть."""
+    if not encoding or encoding == "identity":
+        return data
+    start = time.thread_time()
+    if encoding == "gzip":
+        inflater = zlib.decompressobj(wbits=31)
+        try:
+            result = inflater.decompress(data, max_size)
+        except zlib.error as e:
+            raise ValueError(f"Invalid gzip payload: {e}") from None
+        if inflater.unconsumed_tail:
+            raise ValueError(f"Decompressed payload exceeds {max_size} bytes")
+    elif encoding == "zstd":
+        try:
+            result = _zstd().ZstdDecompressor().decompress(data, max_output_size=max_size)
+        except _zstd().ZstdError as e:
+            raise ValueError(f"Invalid zstd payload: {e}") from None
+    else:
+        raise ValueError(f"Unsupported content encoding {encoding!r}")
+    COMPRESSION_CPU.labels(op="decompress", encoding=encoding).observe(time.thread_time() - start)
+    return result
@@ -0,0 +1,184 @@
+# src/music_adapter/core/concurrency.py
+import asyncio
+import logging
+from typing import Awaitable, Callable, Collection, Optional, Tuple
+import prometheus_client
+
+log = logging.getLogger(__name__)
+
+CONCURRENCY_LIMIT = prometheus_client.Gauge(
+    "adapter_concurrency_limit",
+    "Current adaptive limit of in-flight messages",
+    multiprocess_mode="livesum"
+)
+CONCURRENCY_ADJUSTMENTS = prometheus_client.Counter(
+    "adapter_concurrency_adjustments_total",
+    "Adjustments made by the adaptive concurrency controller",
+    ["direction"]
+)
+
+class AdaptiveLimiter:
+    """
+    Семафор с изменяемым во время работы лимитом.
+    Запоминает пик одновременных захватов, чтобы контроллер видел,
+    упирается ли нагрузка в лимит.
+    """
+    def __init__(self, limit: int):
+        self._limit = limit
+        self._in_flight = 0
+        self._peak = 0
+        self._cond = asyncio.Condition()
+
+    @property
+    def limit(self) -> int:
+        return self._limit
+
+    @property
+    def in_flight(self) -> int:
+        return self._in_flight
+
+    def take_peak(self) -> int:
+        """Пик за окно с прошлого вызова."""
+        peak, self._peak = self._peak, self._in_flight
+        return peak
+
+    async def set_limit(self, limit: int) -> None:
+        async with self._cond:
+            self._limit = limit
+            self._cond.notify_all()
+
+    async def acquire(self) -> None:
+        async with self._cond:
+            await self._cond.wait_for(lambda: self._in_flight < self._limit)
+            self._in_flight += 1
+            self._peak = max(self._peak, self._in_flight)
+
+    async def release(self) -> None:
+        async with self._cond:
+            self._in_flight -= 1
+            self._cond.notify()
+
+    async def __aenter__(self):
+        await self.acquire()
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.release()
+
+def _histogram_totals(histogram) -> Tuple[float, float]:
+    total, count = 0.0, 0.0
+    for metric in histogram.collect():
+        for sample in metric.samples:
+            if sample.name.endswith("_sum"):
+                total += sample.value
+            elif sample.name.endswith("_count"):
+                count += sample.value
+    return total, count
+
+def _counter_totals(counter, error_statuses: Collection[str]) -> Tuple[float, float]:
+    total, errors = 0.0, 0.0
+    for metric in counter.collect():
+        for sample in metric.samples:
+            if not sample.name.endswith("_total"):
+                continue
+            total += sample.value
+            if sample.labels.get("status") in error_statuses:
+                errors += sample.value
+    return total, errors
+
+class AdaptiveConcurrencyController:
+    """
+    AIMD-регулятор числа сообщений в работе.
+
+    Раз в interval читает приращения гистограммы задержки и счётчика
+    исходов (MSG_LATENCY / MSG_COUNT; ошибки — error_statuses, в т.ч.
+    отложенные повторы), сравнивает среднюю задержку с
+    базовой (медленно плавающим минимумом):
+      * ошибок больше error_rate или задержка выше baseline * tolerance —
+        лимит умножается на backoff;
+      * лимит был достигнут за окно — лимит +1;
+      * иначе лимит не меняется.
+    Лимит держится в [floor, ceiling]; on_change применяет его к брокеру (QoS).
+    """
+    def __init__(
+        self,
+        limiter: AdaptiveLimiter,
+        latency,
+        outcomes,
+        floor: int,
+        ceiling: int,
+        interval: float = 5.0,
+        error_rate: float = 0.05,
+        tolerance: float = 2.0,
+        backoff: float = 0.7,
+        on_change: Optional[Callable[[int], Awaitable[None]]] = None,
+        error_statuses: Collection[str] = ("error", "retry"),
+    ):
+        self._limiter = limiter
+        self._latency = latency
+        self._outcomes = outcomes
+        self._floor = floor
+        self._ceiling = ceiling
+        self._interval = interval
+        self._error_rate = error_rate
+        self._tolerance = tolerance
+        self._backoff = backoff
+        self._on_change = on_change
+        self._error_statuses = error_statuses
+        self._baseline: Optional[float] = None
+        self._last_latency = _histogram_totals(latency)
+        self._last_outcomes = _counter_totals(outcomes, error_statuses)
+        CONCURRENCY_LIMIT.set(limiter.limit)
+
+    def _window(self) -> Tuple[Optional[float], float]:
+        lat_sum, lat_count = _histogram_totals(self._latency)
+        total, errors = _counter_totals(self._outcomes, self._error_statuses)
+        d_sum, d_count = lat_sum - self._last_latency[0], lat_count - self._last_latency[1]
+        d_total, d_errors = total - self._last_outcomes[0], errors - self._last_outcomes[1]
+        self._last_latency = (lat_sum, lat_count)
+        self._last_outcomes = (total, errors)
+        avg = d_sum / d_count if d_count else None
+        err = d_errors / d_total if d_total else 0.0
+        return avg, err
+
+    async def adjust(self) -> int:
+        avg, err = self._window()
+        peak = self._limiter.take_peak()
+        limit = self._limiter.limit
+
+        if avg is not None:
+            if self._baseline is None or avg < self._baseline:
+                self._baseline = avg
+            else:
+                # baseline медленно подтягивается к новой «норме»
+                self._baseline += (avg - self._baseline) * 0.05
+
+        if err > self._error_rate or (
+            avg is not None and avg > self._baseline * self._tolerance
+        ):
+            new_limit = max(self._floor, int(limit * self._backoff))
+        elif peak >= limit:
+            new_limit = min(self._ceiling, limit + 1)
+        else:
+            new_limit = limit
+
+        if new_limit != limit:
+            direction = "up" if new_limit > limit else "down"
+            CONCURRENCY_ADJUSTMENTS.labels(direction=direction).inc()
+            log.info(
+                f"Concurrency limit {limit} -> {new_limit} "
+                f"(avg_latency={avg}, error_rate={err:.3f}, peak={peak})"
+            )
+            await self._limiter.set_limit(new_limit)
+            CONCURRENCY_LIMIT.set(new_limit)
+            if self._on_change is not None:
+                await self._on_change(new_limit)
+        return new_limit
+
+    async def run(self) -> None:
+        while True:
+            await asyncio.sleep(self._interval)
+            try:
+                await self.adjust()
+            except Exception as e:
+                log.warning(f"Adaptive concurrency adjust failed: {e}")
@@ -0,0 +1,91 @@
+# src/music_adapter/core/idempotency.py
+import asyncio
+import logging
+from typing import Any, Dict, Optional, Tuple
+import prometheus_client
+
+from music_adapter.core.cache import DiskCache, LRUCache
+
+log = logging.getLogger(__name__)
+
+DUPLICATE_EVENTS = prometheus_client.Counter(
+    "adapter_duplicate_events_total",
+    "Redelivered or duplicate events skipped before preprocess/generate",
+    ["state"]
+)
+
+NEW = "new"
+IN_PROGRESS = "in_progress"
+DONE = "done"
+
+class IdempotencyStore:
+    """
+    Обработанные и обрабатываемые event id.
+
+    Завершённые события хранятся в LRU с TTL (и опционально в SQLite,
+    чтобы дедупликация переживала рестарт) вместе с выходным событием.
+    Обрабатываемые — только в памяти процесса: после падения такое
+    событие считается необработанным и проходит конвейер заново.
+    """
+    def __init__(self, memory: LRUCache, disk: Optional[DiskCache] = None):
+        self._memory = memory
+        self._disk = disk
+        self._inflight: Dict[str, asyncio.Future] = {}
+
+    async def begin(self, event_id: str) -> Tuple[str, Any]:
+        """
+        (NEW, None) — событие взято в обработку, по окончании нужен
+        complete() или abandon(); (IN_PROGRESS, future) — то же событие
+        уже в конвейере, future вернёт его результат (None при ошибке);
+        (DONE, output) — событие уже обработано.
+        """
+        inflight = self._inflight.get(event_id)
+        if inflight is not None:
+            DUPLICATE_EVENTS.labels(state=IN_PROGRESS).inc()
+            return IN_PROGRESS, inflight
+        output = self._memory.get(event_id)
+        if output is not None:
+            DUPLICATE_EVENTS.labels(state=DONE).inc()
+            return DONE, output
+
+        # регистрируем до обращения к диску, чтобы дубль не проскочил в этот await
+        fut = asyncio.get_running_loop().create_future()
+        self._inflight[event_id] = fut
+        if self._disk is not None:
+            try:
+                output = await self._disk.get(event_id)
+            except asyncio.CancelledError:
+                # отмена до возврата NEW: вызывающий не сделает ни complete, ни abandon
+                self._resolve(event_id, None)
+                raise
+            except Exception as e:
+                log.warning(f"Idempotency store read failed: {e}")
+            if output is not None:
+                self._memory.set(event_id, output)
+                self._resolve(event_id, output)
+                DUPLICATE_EVENTS.labels(state=DONE).inc()
+                return DONE, output
+        return NEW, None
+
+    async def complete(self, event_id: str, output: Dict[str, Any]) -> None:
+        """Событие обработано: запомнить выходное событие."""
+        self._memory.set(event_id, output)
+        self._resolve(event_id, output)
+        if self._disk is not None:
+            try:
+                await self._disk.set(event_id, output)
+            except Exception as e:
+                log.warning(f"Idempotency store write failed: {e}")
+
+    def abandon(self, event_id: str) -> None:
+        """Обработка не удалась: повторная доставка обработается заново."""
+        self._resolve(event_id, None)
+
+    def _resolve(self, event_id: str, output: Optional[Dict[str, Any]]) -> None:
+        fut = self._inflight.pop(event_id, None)
+        if fut is not None and not fut.done():
+            fut.set_result(output)
+
+    def close(self) -> None:
+        if self._disk is not None:
+            self._disk.close()
@@ -0,0 +1,63 @@
+# src/music_adapter/core/instrumentation.py
+import asyncio
+import logging
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator
+import prometheus_client
+
+log = logging.getLogger(__name__)
+
+STAGE_LATENCY = prometheus_client.Histogram(
+    "adapter_stage_duration_seconds",
+    "Time spent in one step of message handling",
+    ["stage"],
+    buckets=(0.0001, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+)
+IN_FLIGHT = prometheus_client.Gauge(
+    "adapter_in_flight_messages",
+    "Messages delivered by the broker and not yet acked or rejected",
+    multiprocess_mode="livesum"
+)
+LOOP_LAG = prometheus_client.Histogram(
+    "adapter_event_loop_lag_seconds",
+    "Delay of event loop callbacks beyond their scheduled time",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+)
+
+# label-дочки создаются один раз: labels() на горячем пути заметно дороже observe()
+_stage_children: Dict[str, prometheus_client.Histogram] = {}
+
+def observe_stage(stage: str, seconds: float) -> None:
+    child = _stage_children.get(stage)
+    if child is None:
+        child = _stage_children[stage] = STAGE_LATENCY.labels(stage=stage)
+    child.observe(seconds)
+
+@contextmanager
+def stage_timer(stage: str) -> Iterator[None]:
+    """with stage_timer("decode"): ... → adapter_stage_duration_seconds{stage="decode"}."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe_stage(stage, time.perf_counter() - start)
+
+class LoopLagMonitor:
+    """
+    Задержка event loop: спим interval и меряем, насколько позже
+    проснулись. Рост означает блокирующий код или перегруженный loop.
+    """
+    def __init__(self, interval: float = 0.5, warn_threshold: float = 0.5):
+        self._interval = interval
+        self._warn_threshold = warn_threshold
+
+    async def run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            started = loop.time()
+            await asyncio.sleep(self._interval)
+            lag = max(0.0, loop.time() - started - self._interval)
+            LOOP_LAG.observe(lag)
+            if lag >= self._warn_threshold:
+                log.warning(f"Event loop lag {lag:.3f}s")
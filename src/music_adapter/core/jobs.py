@@ -0,0 +1,232 @@
+# src/music_adapter/core/jobs.py
+import asyncio
+import json
+import logging
+import sqlite3
+import threading
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+import prometheus_client
+
+log = logging.getLogger(__name__)
+
+JOBS_PENDING = prometheus_client.Gauge(
+    "adapter_jobs_pending",
+    "Generation jobs parked in the pending-job table",
+    multiprocess_mode="livemax"
+)
+JOBS_COMPLETED = prometheus_client.Counter(
+    "adapter_jobs_completed_total",
+    "Async generation jobs completed",
+    ["status", "source"]
+)
+
+def is_final(result: Dict[str, Any]) -> bool:
+    """Задача завершена: есть артефакт или явная ошибка."""
+    return "url" in result or result.get("status") in ("failed", "error")
+
+def is_failed(result: Dict[str, Any]) -> bool:
+    return result.get("status") in ("failed", "error")
+
+class PendingJobStore:
+    """
+    Таблица отложенных задач генерации в SQLite.
+    Один файл могут открывать несколько процессов (режим --workers):
+    take() атомарен, так что задачу завершает ровно один процесс.
+    """
+    def __init__(self, path: str):
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=10)
+        with self._lock:
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS pending_jobs ("
+                "job_id TEXT PRIMARY KEY, event TEXT NOT NULL, "
+                "submitted_at REAL NOT NULL, result TEXT)"
+            )
+
+    def _add(
+        self,
+        job_id: str,
+        event: Dict[str, Any],
+        result: Optional[Dict[str, Any]],
+        submitted_at: Optional[float]
+    ) -> None:
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO pending_jobs (job_id, event, submitted_at, result) "
+                "VALUES (?, ?, ?, ?)",
+                (
+                    job_id, json.dumps(event), submitted_at or time.time(),
+                    json.dumps(result) if result else None
+                ),
+            )
+
+    def _take(self, job_id: str) -> Optional[Tuple[Dict[str, Any], Optional[Dict[str, Any]], float]]:
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._db.execute(
+                    "SELECT event, result, submitted_at FROM pending_jobs WHERE job_id = ?", (job_id,)
+                ).fetchone()
+                if row is not None:
+                    self._db.execute("DELETE FROM pending_jobs WHERE job_id = ?", (job_id,))
+                self._db.execute("COMMIT")
+            except Exception:
+                self._db.execute("ROLLBACK")
+                raise
+        if row is None:
+            return None
+        return json.loads(row[0]), (json.loads(row[1]) if row[1] else None), row[2]
+
+    def _record_result(self, job_id: str, result: Dict[str, Any]) -> bool:
+        with self._lock:
+            cur = self._db.execute(
+                "UPDATE pending_jobs SET result = ? WHERE job_id = ?",
+                (json.dumps(result), job_id),
+            )
+        return cur.rowcount > 0
+
+    def _with_results(self) -> List[str]:
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT job_id FROM pending_jobs WHERE result IS NOT NULL"
+            ).fetchall()
+        return [r[0] for r in rows]
+
+    def _due(self, older_than: float, limit: int) -> List[Tuple[str, float]]:
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT job_id, submitted_at FROM pending_jobs "
+                "WHERE result IS NULL AND submitted_at <= ? ORDER BY submitted_at LIMIT ?",
+                (time.time() - older_than, limit),
+            ).fetchall()
+        return [(r[0], r[1]) for r in rows]
+
+    def _count(self) -> int:
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM pending_jobs").fetchone()[0]
+
+    async def add(
+        self,
+        job_id: str,
+        event: Dict[str, Any],
+        result: Optional[Dict[str, Any]] = None,
+        submitted_at: Optional[float] = None
+    ) -> None:
+        """submitted_at — при возврате задачи в таблицу, чтобы не сбрасывать отсчёт JOB_TIMEOUT."""
+        await asyncio.to_thread(self._add, job_id, event, result, submitted_at)
+
+    async def take(self, job_id: str):
+        return await asyncio.to_thread(self._take, job_id)
+
+    async def record_result(self, job_id: str, result: Dict[str, Any]) -> bool:
+        return await asyncio.to_thread(self._record_result, job_id, result)
+
+    async def with_results(self) -> List[str]:
+        return await asyncio.to_thread(self._with_results)
+
+    async def due(self, older_than: float, limit: int = 100) -> List[Tuple[str, float]]:
+        return await asyncio.to_thread(self._due, older_than, limit)
+
+    async def count(self) -> int:
+        return await asyncio.to_thread(self._count)
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
+
+class JobTracker:
+    """
+    Долгие задачи генерации: событие паркуется в PendingJobStore,
+    сообщение ack'ается и освобождает prefetch-слот. Завершение приходит
+    webhook'ом (resolve) или находится опросом генератора (sweep).
+    """
+    def __init__(
+        self,
+        store: PendingJobStore,
+        complete: Callable[[Dict[str, Any], Dict[str, Any]], Awaitable[None]],
+        poll: Callable[[str], Awaitable[Dict[str, Any]]],
+        poll_interval: float,
+        poll_after: float,
+        timeout: float,
+    ):
+        self._store = store
+        self._complete = complete
+        self._poll = poll
+        self._poll_interval = poll_interval
+        self._poll_after = poll_after
+        self._timeout = timeout
+
+    async def park(self, job_id: str, event: Dict[str, Any]) -> None:
+        await self._store.add(job_id, event)
+        JOBS_PENDING.inc()
+
+    async def resolve(self, job_id: str, result: Dict[str, Any], source: str) -> bool:
+        """
+        Завершить задачу. False — задачи нет (уже завершена другим путём).
+        Если публикация не удалась, результат сохраняется и будет
+        повторён следующим sweep.
+        """
+        record = await self._store.take(job_id)
+        if record is None:
+            return False
+        event, _, submitted_at = record
+        await self._finish(job_id, event, result, source, submitted_at)
+        return True
+
+    async def _finish(
+        self,
+        job_id: str,
+        event: Dict[str, Any],
+        result: Dict[str, Any],
+        source: str,
+        submitted_at: float
+    ) -> None:
+        try:
+            await self._complete(event, result)
+        except Exception as e:
+            log.error(f"Completing job {job_id} failed, will retry: {e}")
+            await self._store.add(job_id, event, result, submitted_at)
+            raise
+        status = "failed" if is_failed(result) else "ok"
+        JOBS_COMPLETED.labels(status=status, source=source).inc()
+        JOBS_PENDING.dec()
+
+    async def sweep(self) -> None:
+        # результаты, записанные webhook'ом в другом процессе или не опубликованные ранее
+        for job_id in await self._store.with_results():
+            record = await self._store.take(job_id)
+            if record is None:
+                continue
+            event, result, submitted_at = record
+            try:
+                await self._finish(job_id, event, result, "stored", submitted_at)
+            except Exception:
+                continue
+
+        # опрос задач, по которым webhook так и не пришёл
+        now = time.time()
+        for job_id, submitted_at in await self._store.due(self._poll_after):
+            try:
+                if now - submitted_at > self._timeout:
+                    result = {"status": "failed", "error": "job timed out"}
+                    await self.resolve(job_id, result, source="timeout")
+                    continue
+                result = await self._poll(job_id)
+                if is_final(result):
+                    await self.resolve(job_id, result, source="poll")
+            except Exception as e:
+                log.warning(f"Polling job {job_id} failed: {e}")
+        JOBS_PENDING.set(await self._store.count())
+
+    async def run(self) -> None:
+        while True:
+            try:
+                await self.sweep()
+            except Exception as e:
+                log.warning(f"Pending job sweep failed: {e}")
+            await asyncio.sleep(self._poll_interval)
+
+    def close(self) -> None:
+        self._store.close()
@@ -0,0 +1,146 @@
+# src/music_adapter/core/lanes.py
+import asyncio
+import logging
+from typing import Any, Dict, Optional
+import prometheus_client
+
+from music_adapter.core.pipeline import Pipeline
+
+log = logging.getLogger(__name__)
+
+LANE_IN_USE = prometheus_client.Gauge(
+    "adapter_lane_slots_in_use",
+    "Concurrency slots of a lane in use (including borrowed)",
+    ["lane"],
+    multiprocess_mode="livesum"
+)
+LANE_BORROWED = prometheus_client.Gauge(
+    "adapter_lane_slots_borrowed",
+    "Slots a lane currently borrows from idle lanes",
+    ["lane"],
+    multiprocess_mode="livesum"
+)
+LANE_EVENTS = prometheus_client.Counter(
+    "adapter_lane_events_total",
+    "Events processed by a lane",
+    ["lane", "status"]
+)
+LANE_LATENCY = prometheus_client.Histogram(
+    "adapter_lane_latency_seconds",
+    "Time from entering a lane (including wait for a slot) to completion",
+    ["lane"]
+)
+
+def parse_lane_map(value: str) -> Dict[str, str]:
+    """ "image:8,mp4:2" → {"image": "8", "mp4": "2"}."""
+    result: Dict[str, str] = {}
+    for part in value.split(","):
+        part = part.strip()
+        if not part:
+            continue
+        name, sep, item = part.partition(":")
+        if not sep or not name.strip() or not item.strip():
+            raise ValueError(f"Invalid lane setting {part!r}, expected lane:value")
+        result[name.strip()] = item.strip()
+    return result
+
+class LaneScheduler:
+    """
+    Бюджеты параллелизма по lane'ам. Lane берёт свои слоты; если они
+    заняты, может занять до borrow_limit слотов у lane'а, который
+    простаивает (свободные слоты и никто не ждёт). Освободившийся слот
+    в первую очередь достаётся ожидающим своего бюджета — занятые слоты
+    возвращаются по завершении события, без вытеснения, поэтому медленным
+    lane'ам (mp4) брать взаймы не стоит.
+    """
+    def __init__(self, budgets: Dict[str, int], borrow_limits: Optional[Dict[str, int]] = None):
+        if not budgets:
+            raise ValueError("At least one lane is required")
+        self._budgets = {lane: max(1, b) for lane, b in budgets.items()}
+        self._borrow_limits = {lane: (borrow_limits or {}).get(lane, 0) for lane in budgets}
+        self._own = {lane: 0 for lane in budgets}       # свои слоты в работе
+        self._lent = {lane: 0 for lane in budgets}      # отдано взаймы
+        self._borrowed = {lane: 0 for lane in budgets}  # взято взаймы
+        self._waiting = {lane: 0 for lane in budgets}
+        self._changed = asyncio.Condition()
+
+    @property
+    def lanes(self):
+        return list(self._budgets)
+
+    def in_use(self, lane: str) -> int:
+        return self._own[lane] + self._borrowed[lane]
+
+    def _idle(self, lane: str) -> int:
+        return self._budgets[lane] - self._own[lane] - self._lent[lane]
+
+    def _try_take(self, lane: str) -> Optional[str]:
+        # "" — свой слот, имя lane'а — слот взят у него взаймы, None — ждать
+        if self._idle(lane) > 0:
+            self._own[lane] += 1
+            return ""
+        if self._borrowed[lane] >= self._borrow_limits[lane]:
+            return None
+        lenders = [
+            other for other in self._budgets
+            if other != lane and self._waiting[other] == 0 and self._idle(other) > 0
+        ]
+        if not lenders:
+            return None
+        lender = max(lenders, key=self._idle)
+        self._lent[lender] += 1
+        self._borrowed[lane] += 1
+        return lender
+
+    async def acquire(self, lane: str) -> str:
+        async with self._changed:
+            token = self._try_take(lane)
+            if token is None:
+                self._waiting[lane] += 1
+                try:
+                    while token is None:
+                        await self._changed.wait()
+                        token = self._try_take(lane)
+                finally:
+                    self._waiting[lane] -= 1
+            self._update_gauges(lane)
+            return token
+
+    async def release(self, lane: str, token: str) -> None:
+        async with self._changed:
+            if token:
+                self._lent[token] -= 1
+                self._borrowed[lane] -= 1
+            else:
+                self._own[lane] -= 1
+            self._update_gauges(lane)
+            self._changed.notify_all()
+
+    def _update_gauges(self, lane: str) -> None:
+        LANE_IN_USE.labels(lane=lane).set(self.in_use(lane))
+        LANE_BORROWED.labels(lane=lane).set(self._borrowed[lane])
+
+class Lane:
+    """
+    Lane: слот из LaneScheduler + собственный конвейер стадий после decode.
+    """
+    def __init__(self, name: str, scheduler: LaneScheduler, pipeline: Pipeline):
+        self.name = name
+        self._scheduler = scheduler
+        self.pipeline = pipeline
+        self._latency = LANE_LATENCY.labels(lane=name)
+
+    async def submit(self, value: Any) -> Any:
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        token = await self._scheduler.acquire(self.name)
+        try:
+            result = await self.pipeline.submit(value)
+        except Exception:
+            LANE_EVENTS.labels(lane=self.name, status="error").inc()
+            raise
+        finally:
+            await self._scheduler.release(self.name, token)
+            self._latency.observe(loop.time() - start)
+        LANE_EVENTS.labels(lane=self.name, status="ok").inc()
+        return result
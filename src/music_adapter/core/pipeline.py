@@ -0,0 +1,146 @@
+# src/music_adapter/core/pipeline.py
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, List, Optional
+import prometheus_client
+
+log = logging.getLogger(__name__)
+
+STAGE_QUEUE_DEPTH = prometheus_client.Gauge(
+    "adapter_stage_queue_depth",
+    "Items waiting in the inbound queue of a pipeline stage",
+    ["stage"],
+    multiprocess_mode="livesum"
+)
+STAGE_UTILIZATION = prometheus_client.Gauge(
+    "adapter_stage_utilization",
+    "Busy workers / concurrency of a pipeline stage",
+    ["stage"],
+    multiprocess_mode="liveall"
+)
+
+class Stage:
+    """
+    Стадия конвейера: обработчик, пул воркеров и входная очередь.
+    """
+    def __init__(
+        self,
+        name: str,
+        handler: Callable[[Any], Awaitable[Any]],
+        concurrency: int,
+        queue_size: int,
+    ):
+        self.name = name
+        self.handler = handler
+        self.concurrency = max(1, concurrency)
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=max(1, queue_size))
+        self.busy = 0
+        self._depth = STAGE_QUEUE_DEPTH.labels(stage=name)
+        self._utilization = STAGE_UTILIZATION.labels(stage=name)
+
+    def update_gauges(self) -> None:
+        # явные set() вместо set_function: работают и в multiprocess-режиме Prometheus
+        self._depth.set(self.queue.qsize())
+        self._utilization.set(self.busy / self.concurrency)
+
+class Done:
+    """
+    Обработчик стадии может вернуть Done(value): событие завершается
+    на этой стадии, submit() возвращает value без оставшихся стадий.
+    """
+    __slots__ = ("value",)
+
+    def __init__(self, value: Any):
+        self.value = value
+
+class _Item:
+    __slots__ = ("value", "future")
+
+    def __init__(self, value: Any, future: asyncio.Future):
+        self.value = value
+        self.future = future
+
+class Pipeline:
+    """
+    Стадии, связанные ограниченными очередями. Каждая стадия имеет
+    собственный лимит параллелизма; когда очередь следующей стадии
+    заполнена, воркер ждёт, и давление доходит до submit(), который
+    блокирует потребителя — сообщение не ack'ается и держит prefetch-слот.
+
+    submit() возвращает результат последней стадии или бросает
+    исключение стадии, на которой событие упало.
+    """
+    def __init__(self, stages: List[Stage]):
+        if not stages:
+            raise ValueError("Pipeline needs at least one stage")
+        self._stages = stages
+        self._workers: List[asyncio.Task] = []
+
+    @property
+    def stages(self) -> List[Stage]:
+        return self._stages
+
+    def start(self) -> None:
+        for index, stage in enumerate(self._stages):
+            for _ in range(stage.concurrency):
+                self._workers.append(asyncio.ensure_future(self._worker(index)))
+        log.info("Pipeline started: " + ", ".join(
+            f"{s.name}x{s.concurrency}" for s in self._stages
+        ))
+
+    async def submit(self, value: Any) -> Any:
+        fut = asyncio.get_running_loop().create_future()
+        await self._stages[0].queue.put(_Item(value, fut))
+        self._stages[0].update_gauges()
+        return await fut
+
+    async def _worker(self, index: int) -> None:
+        stage = self._stages[index]
+        next_queue: Optional[asyncio.Queue] = (
+            self._stages[index + 1].queue if index + 1 < len(self._stages) else None
+        )
+        while True:
+            item = await stage.queue.get()
+            try:
+                if item.future.done():  # вызывающий отменён
+                    continue
+                stage.busy += 1
+                stage.update_gauges()
+                try:
+                    item.value = await stage.handler(item.value)
+                finally:
+                    stage.busy -= 1
+                    stage.update_gauges()
+                if isinstance(item.value, Done):
+                    if not item.future.done():
+                        item.future.set_result(item.value.value)
+                elif next_queue is None:
+                    if not item.future.done():
+                        item.future.set_result(item.value)
+                else:
+                    await next_queue.put(item)
+                    self._stages[index + 1].update_gauges()
+            except asyncio.CancelledError:
+                if not item.future.done():
+                    item.future.cancel()
+                raise
+            except Exception as e:
+                if not item.future.done():
+                    item.future.set_exception(e)
+            finally:
+                stage.queue.task_done()
+
+    async def drain(self) -> None:
+        """Дождаться, пока все принятые события пройдут конвейер."""
+        for stage in self._stages:
+            await stage.queue.join()
+
+    async def stop(self, timeout: float) -> None:
+        try:
+            await asyncio.wait_for(self.drain(), timeout)
+        except asyncio.TimeoutError:
+            log.warning(f"Pipeline drain timed out after {timeout}s")
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers.clear()
@@ -0,0 +1,53 @@
+# src/music_adapter/core/profiler.py
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from types import FrameType
+from typing import Dict, Optional
+
+def _frame_label(frame: FrameType) -> str:
+    code = frame.f_code
+    path = code.co_filename
+    # два последних компонента пути — достаточно, чтобы отличить модули
+    short = os.path.join(os.path.basename(os.path.dirname(path)), os.path.basename(path))
+    return f"{code.co_name} ({short}:{code.co_firstlineno})"
+
+def _fold(frame: Optional[FrameType], thread_name: str) -> str:
+    labels = []
+    while frame is not None:
+        labels.append(_frame_label(frame))
+        frame = frame.f_back
+    labels.append(thread_name)
+    return ";".join(reversed(labels)).replace("\n", " ")
+
+def sample_stacks(seconds: float, interval: float = 0.005) -> Dict[str, int]:
+    """
+    Семплирующий профайлер: каждые interval секунд снимает стеки всех
+    потоков процесса (кроме своего) через sys._current_frames().
+    Возвращает {свёрнутый стек: число семплов}. Вызывается из отдельного
+    потока, event loop при этом продолжает работать.
+    """
+    own = threading.get_ident()
+    names = {t.ident: t.name for t in threading.enumerate()}
+    counts: Counter = Counter()
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        for ident, frame in sys._current_frames().items():
+            if ident == own:
+                continue
+            name = names.get(ident)
+            if name is None:
+                names = {t.ident: t.name for t in threading.enumerate()}
+                name = names.get(ident, f"thread-{ident}")
+            counts[_fold(frame, name)] += 1
+        time.sleep(interval)
+    return dict(counts)
+
+def to_folded(counts: Dict[str, int]) -> str:
+    """Формат flamegraph.pl / speedscope / inferno: "a;b;c 42" на строку."""
+    return "".join(
+        f"{stack} {count}\n"
+        for stack, count in sorted(counts.items(), key=lambda item: -item[1])
+    )
@@ -0,0 +1,101 @@
+# src/music_adapter/core/retry.py
+import asyncio
+import time
+from typing import Any, Dict, List, Optional
+import prometheus_client
+from aiohttp import ClientError, ClientResponseError
+
+from music_adapter.clients.circuit import CircuitOpenError
+
+ATTEMPT_HEADER = "x-retry-attempt"
+REASON_HEADER = "x-error-reason"
+FAILED_AT_HEADER = "x-failed-at"  # unix-время последней неудачи (фильтр replay по времени)
+
+RETRY_SCHEDULED = prometheus_client.Counter(
+    "adapter_retry_scheduled_total",
+    "Failed events sent to a delay queue for another attempt",
+    ["delay"]
+)
+RETRY_EXHAUSTED = prometheus_client.Counter(
+    "adapter_retry_exhausted_total",
+    "Events sent to DLQ after the last retry attempt"
+)
+
+def parse_retry_delays(value: str) -> List[float]:
+    """ "5,30,120" → задержки уровней в секундах (уровень i — для попытки i+1)."""
+    delays = []
+    for part in value.split(","):
+        part = part.strip()
+        if not part:
+            continue
+        try:
+            delay = float(part)
+        except ValueError:
+            raise ValueError(f"Invalid retry delay {part!r}") from None
+        if delay <= 0:
+            raise ValueError(f"Retry delay must be positive, got {part!r}")
+        delays.append(delay)
+    if not delays:
+        raise ValueError("RETRY_DELAYS is empty")
+    return delays
+
+def tier_name(prefix: str, delay: float) -> str:
+    """Имя exchange и очереди уровня задержки: raw.music.events.retry.30000ms."""
+    return f"{prefix}.retry.{int(round(delay * 1000))}ms"
+
+def is_retryable(exc: BaseException) -> bool:
+    """
+    Временные отказы: сеть, таймауты, 5xx/408/429, открытая цепь.
+    Невалидное событие или 4xx повтор не исправит — сразу в DLQ.
+    """
+    if isinstance(exc, ClientResponseError):
+        return exc.status >= 500 or exc.status in (408, 429)
+    return isinstance(exc, (ClientError, asyncio.TimeoutError, ConnectionError, CircuitOpenError))
+
+def error_reason(error: BaseException) -> str:
+    """Значение x-error-reason: тип и текст ошибки (по нему фильтрует music_adapter.replay)."""
+    return f"{type(error).__name__}: {error}"[:500]
+
+def attempt_of(headers: Optional[Dict[str, Any]]) -> int:
+    """Номер повторной попытки из заголовка (0 — первая доставка)."""
+    try:
+        return int((headers or {}).get(ATTEMPT_HEADER, 0))
+    except (TypeError, ValueError):
+        return 0
+
+class RetryScheduler:
+    """
+    Повтор упавших событий через брокер, а не sleep в обработчике:
+    событие публикуется в очередь уровня задержки (TTL очереди), по
+    истечении TTL брокер возвращает его в исходную очередь. Номер попытки —
+    в заголовке x-retry-attempt; после max_attempts или при неповторяемой
+    ошибке событие уходит в DLQ с причиной в x-error-reason.
+    Входящее сообщение подтверждает вызывающий.
+    """
+    def __init__(self, broker: Any, delays: List[float], max_attempts: int):
+        self._broker = broker
+        self.delays = delays
+        self.max_attempts = max_attempts
+
+    def delay_for(self, attempt: int) -> float:
+        """Задержка перед попыткой attempt+1; дальше последнего уровня — последний."""
+        return self.delays[min(attempt, len(self.delays) - 1)]
+
+    async def handle_failure(self, msg: Any, queue: str, error: BaseException) -> bool:
+        """True — событие отложено на повтор, False — отправлено в DLQ."""
+        headers = dict(msg.headers or {})
+        attempt = attempt_of(headers)
+        headers[REASON_HEADER] = error_reason(error)
+        headers[FAILED_AT_HEADER] = round(time.time(), 3)
+        if is_retryable(error) and attempt < self.max_attempts:
+            delay = self.delay_for(attempt)
+            headers[ATTEMPT_HEADER] = attempt + 1
+            await self._broker.publish_retry(
+                queue, msg.body, headers, msg.content_type, delay, getattr(msg, "content_encoding", None)
+            )
+            RETRY_SCHEDULED.labels(delay=f"{delay:g}").inc()
+            return True
+        if attempt:
+            RETRY_EXHAUSTED.inc()
+        await self._broker.publish_dlq(msg.body, headers, getattr(msg, "content_encoding", None))
+        return False
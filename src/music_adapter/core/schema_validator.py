@@ -1,11 +1,24 @@
 import json
-from jsonschema import validate, ValidationError
-
+from functools import lru_cache
+from typing import Any, Callable, Iterable, List, Optional
 from music_adapter.config.settings import get_settings
 
 settings = get_settings()
 _schema = None
 
+# Ключевые слова, которые не влияют на результат проверки (format без format_checker
+# тоже не проверяется — так же ведёт себя jsonschema.validate).
+_ANNOTATION_KEYWORDS = {"$schema", "$id", "title", "description", "format", "default", "examples"}
+_TYPE_CHECKS = {
+    "object": "isinstance({v}, dict)",
+    "array": "isinstance({v}, list)",
+    "string": "isinstance({v}, str)",
+    "boolean": "isinstance({v}, bool)",
+    "null": "{v} is None",
+    "integer": "(isinstance({v}, int) and not isinstance({v}, bool))",
+    "number": "(isinstance({v}, (int, float)) and not isinstance({v}, bool))",
+}
+
 def _load_schema() -> dict:
     global _schema
     if _schema is None:
@@ -13,12 +26,109 @@ def _load_schema() -> dict:
             _schema = json.load(f)
     return _schema
 
+@lru_cache()
+def get_validator():
+    """
+    Скомпилированный валидатор: схема проверяется один раз,
+    экземпляр валидатора переиспользуется для всех событий.
+    """
+    # jsonschema нужен только медленному пути — не импортируем его при старте
+    from jsonschema.validators import validator_for
+    schema = _load_schema()
+    cls = validator_for(schema)
+    cls.check_schema(schema)
+    return cls(schema)
+
+def _compile_node(schema: dict, var: str, lines: List[str], indent: str, depth: int) -> bool:
+    """
+    Генерирует проверки для одного узла схемы.
+    Возвращает False, если в узле есть неподдерживаемые ключевые слова.
+    """
+    if not isinstance(schema, dict):
+        return False
+    unsupported = set(schema) - _ANNOTATION_KEYWORDS - {"type", "properties", "required", "items"}
+    if unsupported:
+        return False
+
+    schema_type = schema.get("type")
+    if schema_type is not None:
+        if not isinstance(schema_type, str) or schema_type not in _TYPE_CHECKS:
+            return False
+        lines.append(f"{indent}if not {_TYPE_CHECKS[schema_type].format(v=var)}: return False")
+
+    if "required" in schema or "properties" in schema:
+        if schema_type != "object":
+            return False
+        for key in schema.get("required", []):
+            lines.append(f"{indent}if {key!r} not in {var}: return False")
+        for i, (key, sub) in enumerate(schema.get("properties", {}).items()):
+            child = f"_v{depth}_{i}"
+            lines.append(f"{indent}{child} = {var}.get({key!r}, _MISSING)")
+            lines.append(f"{indent}if {child} is not _MISSING:")
+            if not _compile_block(sub, child, lines, indent + "    ", depth + 1):
+                return False
+
+    if "items" in schema:
+        if schema_type != "array":
+            return False
+        item = f"_i{depth}"
+        lines.append(f"{indent}for {item} in {var}:")
+        if not _compile_block(schema["items"], item, lines, indent + "    ", depth + 1):
+            return False
+    return True
+
+def _compile_block(schema: dict, var: str, lines: List[str], indent: str, depth: int) -> bool:
+    """Тело вложенного блока: пустой подсхеме нужен хотя бы pass."""
+    start = len(lines)
+    ok = _compile_node(schema, var, lines, indent, depth)
+    if len(lines) == start:
+        lines.append(f"{indent}pass")
+    return ok
+
+def compile_fast_path(schema: dict) -> Optional[Callable[[Any], bool]]:
+    """
+    Генерирует Python-функцию, проверяющую фиксированную форму события
+    (type/properties/required/items). Для схем с другими ключевыми словами
+    возвращает None — тогда используется только jsonschema.
+    """
+    lines = ["def _fast_check(v):"]
+    if not _compile_node(schema, "v", lines, "    ", 0):
+        return None
+    lines.append("    return True")
+    namespace = {"_MISSING": object()}
+    exec(compile("\n".join(lines), "<schema-fast-path>", "exec"), namespace)
+    return namespace["_fast_check"]
+
+@lru_cache()
+def _get_fast_path() -> Optional[Callable[[Any], bool]]:
+    if not settings.SCHEMA_FAST_PATH:
+        return None
+    return compile_fast_path(_load_schema())
+
+def _check(event: Any) -> Optional[str]:
+    fast = _get_fast_path()
+    if fast is not None and fast(event):
+        return None
+    # Медленный путь: полная проверка и сообщение об ошибке как у jsonschema.validate
+    from jsonschema.exceptions import best_match
+    error = best_match(get_validator().iter_errors(event))
+    if error is None:
+        return None
+    return f"Schema validation error: {error.message}"
+
 def validate_event(event: dict) -> None:
     """
     Проверяет dict события по JSON-схеме.
-    Бросает ValidationError или ValueError.
+    Бросает ValueError с текстом ошибки валидации.
+    """
+    error = _check(event)
+    if error is not None:
+        raise ValueError(error)
+
+def validate_many(events: Iterable[dict]) -> List[Optional[str]]:
+    """
+    Пакетная проверка событий.
+    Возвращает список той же длины: None для валидного события,
+    иначе текст ошибки.
     """
-    try:
-        validate(instance=event, schema=_load_schema())
-    except ValidationError as e:
-        raise ValueError(f"Schema validation error: {e.message}")
\ No newline at end of file
+    return [_check(event) for event in events]
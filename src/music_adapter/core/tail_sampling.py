@@ -0,0 +1,165 @@
+# src/music_adapter/core/tail_sampling.py
+import threading
+import time
+from collections import OrderedDict
+from typing import List, Optional
+import prometheus_client
+from opentelemetry.context import Context
+from opentelemetry.sdk.trace import ReadableSpan, Span, SpanProcessor
+from opentelemetry.trace import StatusCode
+
+TRACE_DECISIONS = prometheus_client.Counter(
+    "adapter_trace_sampling_decisions_total",
+    "Traces decided by the tail sampler: kept as error, slow or sampled, or dropped",
+    ["decision"]
+)
+TRACE_EVICTED = prometheus_client.Counter(
+    "adapter_trace_buffer_evicted_total",
+    "Unfinished traces evicted from the span buffer before their root span ended",
+    ["reason"]
+)
+TRACE_BUFFERED = prometheus_client.Gauge(
+    "adapter_trace_buffer_spans",
+    "Spans held in the tail sampling buffer",
+    multiprocess_mode="livesum"
+)
+TRACE_PROCESSOR_TIME = prometheus_client.Histogram(
+    "adapter_trace_processor_seconds",
+    "Time spent in the tail sampler per finished span, including the decision and hand-off to the exporter",
+    buckets=(0.000001, 0.0000025, 0.000005, 0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.001)
+)
+
+_TRACE_ID_LIMIT = 1 << 64
+
+class _Trace:
+    __slots__ = ("spans", "error", "created")
+
+    def __init__(self, created: float):
+        self.spans: List[ReadableSpan] = []
+        self.error = False
+        self.created = created
+
+class TailSamplingProcessor(SpanProcessor):
+    """
+    Хвостовое сэмплирование: законченные спаны копятся по trace_id, пока не
+    закончится локальный корневой спан (handle_message), затем трасса целиком
+    уходит в delegate (BatchSpanProcessor) или отбрасывается. Всегда
+    сохраняются трассы с ошибкой (статус ERROR у любого спана) и с корнем
+    дольше latency_threshold, остальные — с долей sample_rate по trace_id.
+
+    Буфер ограничен max_spans спанами: при переполнении и по истечении ttl
+    незаконченные трассы вытесняются, начиная со старых (с ошибкой — в
+    экспорт, иначе отбрасываются). Спаны, закончившиеся после корня,
+    следуют уже принятому решению.
+    """
+
+    def __init__(
+        self,
+        delegate: SpanProcessor,
+        sample_rate: float,
+        latency_threshold: float,
+        max_spans: int = 10000,
+        ttl: float = 60.0,
+        decided_size: int = 10000
+    ):
+        self.delegate = delegate
+        self.sample_rate = min(max(sample_rate, 0.0), 1.0)
+        self._threshold_ns = int(latency_threshold * 1e9)
+        self._sample_bound = int(self.sample_rate * _TRACE_ID_LIMIT)
+        self.max_spans = max_spans
+        self.ttl = ttl
+        self._traces: "OrderedDict[int, _Trace]" = OrderedDict()
+        self._decided: "OrderedDict[int, bool]" = OrderedDict()
+        self._decided_size = decided_size
+        self._buffered = 0
+        self._lock = threading.Lock()
+
+    def on_start(self, span: Span, parent_context: Optional[Context] = None) -> None:
+        self.delegate.on_start(span, parent_context)
+
+    def on_end(self, span: ReadableSpan) -> None:
+        start = time.perf_counter()
+        trace_id = span.context.trace_id
+        with self._lock:
+            keep = self._decided.get(trace_id)
+            if keep is None:
+                export = self._buffer(trace_id, span)
+            else:
+                export = [span] if keep else []
+        # экспорт — вне лока: BatchSpanProcessor сам потокобезопасен
+        for ended in export:
+            self.delegate.on_end(ended)
+        TRACE_PROCESSOR_TIME.observe(time.perf_counter() - start)
+
+    def _buffer(self, trace_id: int, span: ReadableSpan) -> List[ReadableSpan]:
+        now = time.monotonic()
+        buffered = self._traces.get(trace_id)
+        if buffered is None:
+            buffered = self._traces[trace_id] = _Trace(now)
+        buffered.spans.append(span)
+        buffered.error = buffered.error or span.status.status_code is StatusCode.ERROR
+        self._buffered += 1
+
+        export: List[ReadableSpan] = []
+        if span.parent is None or span.parent.is_remote:
+            del self._traces[trace_id]
+            self._buffered -= len(buffered.spans)
+            decision = self._decide(trace_id, span, buffered.error)
+            TRACE_DECISIONS.labels(decision=decision).inc()
+            keep = decision != "dropped"
+            self._remember(trace_id, keep)
+            if keep:
+                export = buffered.spans
+        export.extend(self._evict(now))
+        TRACE_BUFFERED.set(self._buffered)
+        return export
+
+    def _decide(self, trace_id: int, root: ReadableSpan, error: bool) -> str:
+        if error:
+            return "kept_error"
+        if root.end_time - root.start_time >= self._threshold_ns:
+            return "kept_slow"
+        # как TraceIdRatioBased: младшие 64 бита trace_id равномерны
+        if (trace_id & (_TRACE_ID_LIMIT - 1)) < self._sample_bound:
+            return "kept_sampled"
+        return "dropped"
+
+    def _remember(self, trace_id: int, keep: bool) -> None:
+        self._decided[trace_id] = keep
+        if len(self._decided) > self._decided_size:
+            self._decided.popitem(last=False)
+
+    def _evict(self, now: float) -> List[ReadableSpan]:
+        export: List[ReadableSpan] = []
+        while self._traces:
+            trace_id, oldest = next(iter(self._traces.items()))
+            if self._buffered > self.max_spans:
+                reason = "overflow"
+            elif now - oldest.created > self.ttl:
+                reason = "expired"
+            else:
+                break
+            del self._traces[trace_id]
+            self._buffered -= len(oldest.spans)
+            TRACE_EVICTED.labels(reason=reason).inc()
+            # решение о трассе принято без корня: ошибки не теряем, остальное — в отбой
+            self._remember(trace_id, oldest.error)
+            if oldest.error:
+                export.extend(oldest.spans)
+        return export
+
+    def _drain(self) -> List[ReadableSpan]:
+        with self._lock:
+            export = [span for buffered in self._traces.values() if buffered.error for span in buffered.spans]
+            self._traces.clear()
+            self._buffered = 0
+        TRACE_BUFFERED.set(0)
+        return export
+
+    def shutdown(self) -> None:
+        for span in self._drain():
+            self.delegate.on_end(span)
+        self.delegate.shutdown()
+
+    def force_flush(self, timeout_millis: int = 30000) -> bool:
+        return self.delegate.force_flush(timeout_millis)
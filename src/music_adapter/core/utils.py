@@ -48,6 +48,6 @@ def record_request(service: str, status: str, latency: float):
 
 def to_dead_letter(msg, reason: str):
     """
-    Log and reject message without requeue.
+    Log the reason before the message is rejected without requeue.
     """
-    print(f"DLQ: message {getattr(msg, 'delivery_tag', '<unknown>')}, reason: {reason}")
\ No newline at end of file
+    logging.getLogger(__name__).warning(f"DLQ: message {getattr(msg, 'delivery_tag', '<unknown>')}, reason: {reason}")
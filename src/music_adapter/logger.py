@@ -1,23 +1,158 @@
+import atexit
+import datetime
 import logging
+import queue
 import sys
+import zlib
+from logging.handlers import QueueHandler, QueueListener
+from typing import Any, Dict, List, Optional
+import prometheus_client
 from opentelemetry import trace
-from opentelemetry.sdk.resources import SERVICE_NAME, Resource
-from opentelemetry.sdk.trace import TracerProvider
-from opentelemetry.sdk.trace.export import BatchSpanProcessor
-from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+
+from music_adapter.config.settings import get_settings
+from music_adapter.core import codec
+
+LOG_DROPPED = prometheus_client.Counter(
+    "adapter_log_dropped_total",
+    "Log records not written: sampled out or log buffer full",
+    ["reason"]
+)
+
+# атрибуты LogRecord, не попадающие в JSON как extra-поля
+_RECORD_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {
+    "message", "asctime", "trace_id", "span_id", "taskName"
+}
+_listeners: List[QueueListener] = []
 
 def init_tracer(service_name: str):
+    # SDK и OTLP-экспортер тяжёлые — импортируются только при инициализации
+    from opentelemetry.sdk.resources import SERVICE_NAME, Resource
+    from opentelemetry.sdk.trace import TracerProvider
+    from opentelemetry.sdk.trace.export import BatchSpanProcessor
+    from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+
     provider = TracerProvider(resource=Resource({SERVICE_NAME: service_name}))
     exporter = OTLPSpanExporter()
-    provider.add_span_processor(BatchSpanProcessor(exporter))
+    processor = BatchSpanProcessor(exporter)
+    settings = get_settings()
+    if settings.TRACE_TAIL_SAMPLING:
+        from music_adapter.core.tail_sampling import TailSamplingProcessor
+        processor = TailSamplingProcessor(
+            processor,
+            sample_rate=settings.TRACE_SAMPLE_RATE,
+            latency_threshold=settings.TRACE_LATENCY_THRESHOLD,
+            max_spans=settings.TRACE_BUFFER_MAX_SPANS,
+            ttl=settings.TRACE_BUFFER_TTL
+        )
+    provider.add_span_processor(processor)
     trace.set_tracer_provider(provider)
     return trace.get_tracer(service_name)
 
-def init_logger(name: str, level: int = logging.INFO):
-    handler = logging.StreamHandler(sys.stdout)
-    fmt = "%(asctime)s %(levelname)s [%(name)s] %(message)s"
-    handler.setFormatter(logging.Formatter(fmt))
+class JsonFormatter(logging.Formatter):
+    """
+    Запись — одна строка JSON: ts, level, logger, message, trace_id/span_id
+    (если запись сделана внутри спана), extra-поля (event_id и т.п.), exc.
+    """
+    def format(self, record: logging.LogRecord) -> str:
+        data: Dict[str, Any] = {
+            "ts": datetime.datetime.fromtimestamp(record.created, datetime.timezone.utc)
+                .isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        trace_id = getattr(record, "trace_id", 0)
+        if trace_id:
+            data["trace_id"] = format(trace_id, "032x")
+            data["span_id"] = format(record.span_id, "016x")
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRS:
+                data[key] = value if isinstance(value, (str, int, float, bool, type(None))) else str(value)
+        if record.exc_info:
+            data["exc"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            data["exc"] = record.exc_text
+        return codec.dumps(data).decode("utf-8")
+
+class EventSampler(logging.Filter):
+    """
+    Сэмплирование INFO/DEBUG-записей о событиях (с extra event_id): решение
+    по хэшу id, так что все записи одного события либо пишутся, либо нет.
+    Предупреждения и ошибки пишутся всегда.
+    """
+    def __init__(self, rate: float):
+        super().__init__()
+        self._threshold = int(max(0.0, min(1.0, rate)) * 0xFFFFFFFF)
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        event_id = getattr(record, "event_id", None)
+        if event_id is None or record.levelno >= logging.WARNING:
+            return True
+        if zlib.crc32(str(event_id).encode()) <= self._threshold:
+            return True
+        LOG_DROPPED.labels(reason="sampled").inc()
+        return False
+
+class BoundedQueueHandler(QueueHandler):
+    """
+    Передача записей фоновому потоку без форматирования в event loop:
+    сообщение собирается (record.getMessage) уже в потоке записи. В
+    вызывающем потоке к записи добавляются только id текущего спана.
+    Переполненный буфер не блокирует — запись отбрасывается и считается.
+    """
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        if not hasattr(record, "trace_id"):
+            ctx = trace.get_current_span().get_span_context()
+            record.trace_id = ctx.trace_id if ctx.is_valid else 0
+            record.span_id = ctx.span_id if ctx.is_valid else 0
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            LOG_DROPPED.labels(reason="overflow").inc()
+
+class DrainingQueueListener(QueueListener):
+    """
+    Остановка при полном буфере ждёт места для маркера конца, а не падает
+    с queue.Full: всё, что уже в очереди, дописывается.
+    """
+    def enqueue_sentinel(self) -> None:
+        self.queue.put(self._sentinel)
+
+def init_logger(name: str, level: Optional[Any] = None, stream=None):
+    """
+    Логгер name пишет через очередь (LOG_QUEUE_SIZE) в фоновый поток,
+    который форматирует (LOG_FORMAT: json | text) и пишет в stream (stdout).
+    Повторный вызов не добавляет обработчиков.
+    """
+    settings = get_settings()
     logger = logging.getLogger(name)
-    logger.setLevel(level)
-    logger.addHandler(handler)
-    return logger
\ No newline at end of file
+    logger.setLevel(level or settings.LOG_LEVEL)
+    if any(isinstance(h, BoundedQueueHandler) for h in logger.handlers):
+        return logger
+
+    handler = logging.StreamHandler(stream or sys.stdout)
+    if settings.LOG_FORMAT == "json":
+        handler.setFormatter(JsonFormatter())
+    else:
+        handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s [%(name)s] %(message)s"))
+    records: queue.Queue = queue.Queue(maxsize=settings.LOG_QUEUE_SIZE)
+    queue_handler = BoundedQueueHandler(records)
+    if settings.LOG_SAMPLE_RATE < 1.0:
+        queue_handler.addFilter(EventSampler(settings.LOG_SAMPLE_RATE))
+    logger.addHandler(queue_handler)
+
+    listener = DrainingQueueListener(records, handler, respect_handler_level=True)
+    listener.start()
+    _listeners.append(listener)
+    return logger
+
+def stop_logging() -> None:
+    """Дописать буферы и остановить фоновые потоки (shutdown / atexit)."""
+    while _listeners:
+        _listeners.pop().stop()
+
+atexit.register(stop_logging)
+
@@ -1,24 +1,51 @@
 # src/music_adapter/main.py
 #!/usr/bin/env python3
+import argparse
 import asyncio
+import functools
 import signal
-import json
 import logging
-from aio_pika.abc import AbstractIncomingMessage
-from prometheus_client import Counter, Histogram
+import time
+from typing import TYPE_CHECKING, Any, Dict, Optional
+from opentelemetry import trace
+from prometheus_client import Counter, Gauge, Histogram
 
 from music_adapter.config.settings import get_settings
-from music_adapter.broker.broker import Broker
+from music_adapter.broker.factory import create_broker
+from music_adapter.core import codec
+from music_adapter.core.cache import DiskCache, LRUCache
+from music_adapter.core.compression import decompress
+from music_adapter.core.concurrency import AdaptiveConcurrencyController, AdaptiveLimiter
+from music_adapter.core.instrumentation import IN_FLIGHT, LoopLagMonitor, stage_timer
+from music_adapter.core.idempotency import IN_PROGRESS, NEW, IdempotencyStore
+from music_adapter.core.jobs import JobTracker, PendingJobStore, is_failed, is_final
+from music_adapter.core.lanes import Lane, LaneScheduler, parse_lane_map
+from music_adapter.core.pipeline import Done, Pipeline, Stage
+from music_adapter.core.retry import (
+    FAILED_AT_HEADER, REASON_HEADER, RetryScheduler, error_reason, parse_retry_delays
+)
 from music_adapter.core.schema_validator import validate_event
-from music_adapter.clients.preprocessor import preprocess
-from music_adapter.clients.generator import generate
+from music_adapter.clients.preprocessor import preprocess, close as close_preprocessor
+from music_adapter.clients.generator import generate, get_job, submit_job, close as close_generator
+from music_adapter.clients.http_client import (
+    CURRENT_POOL, REQUEST_RETRIES, configure_pool, init_client, close_client, pool_ready,
+    set_request_retries, use_pool
+)
 from music_adapter.core.utils import to_dead_letter
 from music_adapter.logger import init_logger, init_tracer
-from music_adapter.api.health import run_health_server
+from music_adapter.api.health import create_app, start_health_server
+from music_adapter.api.debug import add_debug_routes
+from music_adapter.api.jobs import add_job_routes
+
+if TYPE_CHECKING:
+    from aio_pika.abc import AbstractIncomingMessage
+    from music_adapter.replay import ReplayMessage
 
 settings = get_settings()
-logger = init_logger("music_adapter")
-tracer = init_tracer("music_adapter")
+# логгер и трассировка настраиваются при запуске (main / start), не при импорте;
+# до init_tracer спаны — no-op, после — пишутся через установленный провайдер
+logger = logging.getLogger("music_adapter")
+tracer = trace.get_tracer("music_adapter")
 
 # Метрики обработки сообщений
 MSG_COUNT = Counter(
@@ -27,82 +54,497 @@ MSG_COUNT = Counter(
 MSG_LATENCY = Histogram(
     "adapter_message_processing_seconds", "Время обработки одного сообщения"
 )
+READY = Gauge(
+    "adapter_ready", "Процесс готов принимать сообщения (/ready)", multiprocess_mode="livesum"
+)
+
+class EventContext:
+    """Состояние одного события между стадиями конвейера."""
+    __slots__ = (
+        "msg", "span", "start_time", "raw", "p_res", "g_res", "job_id", "claimed", "duplicate", "lane"
+    )
+
+    def __init__(self, msg: "AbstractIncomingMessage", span, start_time: float):
+        self.msg = msg
+        self.span = span
+        self.start_time = start_time
+        self.raw = None
+        self.p_res = None
+        self.g_res = None
+        self.job_id = None  # событие припарковано как асинхронная задача
+        self.claimed = False  # событие взято в обработку в IdempotencyStore
+        self.duplicate = None  # (состояние, результат) для повторной доставки
+        self.lane = None  # задан, если сообщение пришло из очереди lane'а
 
 class MusicAdapter:
-    def __init__(self):
-        self.broker = Broker()
+    def __init__(self, serve_health: bool = True):
+        self.serve_health = serve_health
+        self.broker = create_broker()
         self.shutdown_event = asyncio.Event()
+        decode = self._stage("decode", self._decode, settings.PIPELINE_DECODE_CONCURRENCY)
+        self.lanes: Dict[str, Lane] = {}
+        if settings.LANES_ENABLED:
+            # после decode событие уходит в конвейер своего lane'а
+            self.pipeline = Pipeline([decode])
+            self.lanes = self._build_lanes()
+        else:
+            self.pipeline = Pipeline([
+                decode,
+                self._stage("preprocess", self._preprocess, settings.PIPELINE_PREPROCESS_CONCURRENCY),
+                self._stage("generate", self._generate, settings.PIPELINE_GENERATE_CONCURRENCY),
+                self._stage("publish", self._publish, settings.PIPELINE_PUBLISH_CONCURRENCY),
+            ])
+        self._active = 0  # обработчики сообщений в работе
+        self.limiter = AdaptiveLimiter(settings.BROKER_PREFETCH)
+        self._controller_task = None
+        self._lag_task = None
+        self._ready_task = None
+        self._health_runner = None
+        self._async_job_types = {
+            t.strip() for t in settings.ASYNC_JOB_TYPES.split(",") if t.strip()
+        }
+        self.dedup = None
+        if settings.IDEMPOTENCY_ENABLED:
+            disk = None
+            if settings.IDEMPOTENCY_PATH:
+                disk = DiskCache(settings.IDEMPOTENCY_PATH, ttl=settings.IDEMPOTENCY_TTL)
+            memory = LRUCache(
+                settings.IDEMPOTENCY_MAX_ENTRIES, ttl=settings.IDEMPOTENCY_TTL, name="idempotency"
+            )
+            self.dedup = IdempotencyStore(memory, disk)
+        self.retry = None
+        if settings.RETRY_ENABLED:
+            if self.broker.delayed_retry:
+                self.retry = RetryScheduler(
+                    self.broker, parse_retry_delays(settings.RETRY_DELAYS), settings.RETRY_MAX_ATTEMPTS
+                )
+            else:
+                logger.warning(f"{type(self.broker).__name__} has no delayed retry, RETRY_ENABLED ignored")
+        self._lane_queues: Dict[str, str] = {}  # lane → его отдельная очередь
+        self.jobs = None
+        self._jobs_task = None
+        if settings.ASYNC_JOBS_ENABLED:
+            self.jobs = JobTracker(
+                PendingJobStore(settings.JOB_STORE_PATH),
+                complete=self._complete_job,
+                poll=get_job,
+                poll_interval=settings.JOB_POLL_INTERVAL,
+                poll_after=settings.JOB_POLL_AFTER,
+                timeout=settings.JOB_TIMEOUT,
+            )
 
-    async def start(self):
-        run_health_server()
-        await self.broker.connect()
-        await self.broker.subscribe(settings.IN_TOPIC, self._on_message)
-        logger.info(f"Subscribed to {settings.IN_TOPIC}")
+    @staticmethod
+    def _stage(name: str, handler, concurrency: int, pool: Optional[str] = None) -> Stage:
+        # воркеры стадий живут в своих задачах — переносим span события явно
+        async def run(ctx: EventContext) -> EventContext:
+            token = use_pool(pool) if pool else None
+            try:
+                with trace.use_span(ctx.span, end_on_exit=False):
+                    return await handler(ctx)
+            finally:
+                if token is not None:
+                    CURRENT_POOL.reset(token)
+        return Stage(name, run, concurrency, settings.PIPELINE_QUEUE_SIZE)
 
-        loop = asyncio.get_event_loop()
+    def _build_lanes(self) -> Dict[str, Lane]:
+        budgets = {lane: int(v) for lane, v in parse_lane_map(settings.LANE_CONCURRENCY).items()}
+        borrow = {lane: int(v) for lane, v in parse_lane_map(settings.LANE_BORROW).items()}
+        pool_limits = parse_lane_map(settings.LANE_POOL_LIMIT)
+        if settings.LANE_DEFAULT not in budgets:
+            raise ValueError(f"LANE_DEFAULT={settings.LANE_DEFAULT!r} is not in LANE_CONCURRENCY")
+        scheduler = LaneScheduler(budgets, borrow)
+        lanes = {}
+        for lane, budget in budgets.items():
+            # воркеров стадий хватает и на занятые взаймы слоты
+            width = budget + borrow.get(lane, 0)
+            configure_pool(lane, int(pool_limits.get(lane, width)))
+            lanes[lane] = Lane(lane, scheduler, Pipeline([
+                self._stage(f"preprocess.{lane}", self._preprocess, width, pool=lane),
+                self._stage(f"generate.{lane}", self._generate, width, pool=lane),
+                self._stage(f"publish.{lane}", self._publish, width, pool=lane),
+            ]))
+        return lanes
+
+    def _lane_for(self, ctx: EventContext) -> Lane:
+        lane = ctx.lane or ctx.raw.get("generate_type", "image")
+        return self.lanes.get(lane) or self.lanes[settings.LANE_DEFAULT]
+
+    def readiness(self) -> Dict[str, bool]:
+        """Проверки /ready: соединение с брокером, подписка, HTTP-пул."""
+        checks = {
+            "broker": self.broker.is_connected(),
+            "consumer": self.broker.is_consuming(),
+            "http_pool": pool_ready(),
+        }
+        READY.set(1 if all(checks.values()) else 0)
+        return checks
+
+    async def _report_readiness(self) -> None:
+        # adapter_ready для супервизора: его /ready смотрит на воркеров через метрики
+        while True:
+            self.readiness()
+            await asyncio.sleep(1.0)
+
+    async def start(self):
+        loop = asyncio.get_running_loop()
         for sig in (signal.SIGINT, signal.SIGTERM):
             loop.add_signal_handler(sig, self.shutdown_event.set)
 
+        # health-сервер поднимается первым: /health отвечает сразу, /ready — 503,
+        # пока нет подписки. В multi-process режиме его держит супервизор
+        if self.serve_health:
+            app = create_app(ready_check=self.readiness)
+            if self.jobs is not None:
+                if settings.JOB_CALLBACK_SECRET:
+                    add_job_routes(app, self._on_job_result, settings.JOB_CALLBACK_SECRET)
+                else:
+                    logger.warning("JOB_CALLBACK_SECRET is not set, /jobs/callback disabled; jobs complete by polling")
+            if settings.DEBUG_PROFILE_ENABLED:
+                add_debug_routes(app)
+            self._health_runner = await start_health_server(app)
+        self._lag_task = asyncio.ensure_future(
+            LoopLagMonitor(settings.LOOP_LAG_INTERVAL, settings.LOOP_LAG_WARN).run()
+        )
+        await self.open()
+        await self.broker.subscribe(settings.IN_TOPIC, self._on_message)
+        logger.info(f"Subscribed to {settings.IN_TOPIC}")
+        if self.lanes:
+            await self._subscribe_lane_queues()
+        if self.jobs is not None:
+            self._jobs_task = asyncio.ensure_future(self.jobs.run())
+        if settings.ADAPTIVE_CONCURRENCY_ENABLED:
+            self._start_controller()
+        self._ready_task = asyncio.ensure_future(self._report_readiness())
+        # SDK и OTLP-экспортер грузятся уже после подписки и не в event loop
+        await asyncio.to_thread(init_tracer, "music_adapter")
+
         logger.info("MusicAdapter is running")
         await self.shutdown_event.wait()
         await self.shutdown()
 
-    async def _on_message(self, msg: AbstractIncomingMessage):
+    async def open(self) -> None:
+        """HTTP-клиент, конвейеры и соединение с брокером — всё, кроме подписок."""
+        # с планировщиком повторов слот не спит в backoff: повтор — через очередь задержки;
+        # без него (Kafka, replay) запросы повторяются внутри обработчика
+        set_request_retries(0 if self.retry is not None else REQUEST_RETRIES)
+        await init_client()
+        self.pipeline.start()
+        for lane in self.lanes.values():
+            lane.pipeline.start()
+        await self.broker.connect()
+
+    async def process(self, msg: "ReplayMessage") -> None:
+        """
+        Обработать сообщение DLQ вне подписки и общего limiter'а
+        (music_adapter.replay); причина неудачи передаётся в reject().
+        """
+        await self._on_lane_message(None, msg, replay=True)
+
+    def _start_controller(self) -> None:
+        controller = AdaptiveConcurrencyController(
+            self.limiter,
+            latency=MSG_LATENCY,
+            outcomes=MSG_COUNT,
+            floor=settings.ADAPTIVE_MIN_LIMIT,
+            ceiling=settings.ADAPTIVE_MAX_LIMIT,
+            interval=settings.ADAPTIVE_INTERVAL,
+            error_rate=settings.ADAPTIVE_ERROR_RATE,
+            tolerance=settings.ADAPTIVE_LATENCY_TOLERANCE,
+            backoff=settings.ADAPTIVE_BACKOFF,
+            on_change=self.broker.set_prefetch,
+        )
+        self._controller_task = asyncio.ensure_future(controller.run())
+
+    async def _subscribe_lane_queues(self) -> None:
+        """Отдельные очереди lane'ов: свой канал и prefetch у каждой."""
+        queues = parse_lane_map(settings.LANE_QUEUES)
+        prefetch = parse_lane_map(settings.LANE_PREFETCH)
+        budgets = parse_lane_map(settings.LANE_CONCURRENCY)
+        for lane, queue in queues.items():
+            if lane not in self.lanes:
+                raise ValueError(f"LANE_QUEUES refers to unknown lane {lane!r}")
+            count = int(prefetch.get(lane, budgets[lane]))
+            await self.broker.subscribe(queue, functools.partial(self._on_lane_message, lane), prefetch=count)
+            self._lane_queues[lane] = queue
+            logger.info(f"Subscribed lane {lane} to {queue} (prefetch={count})")
+
+    async def _on_message(self, msg: "AbstractIncomingMessage"):
+        IN_FLIGHT.inc()
+        self._active += 1
+        try:
+            async with self.limiter:
+                await self._handle(msg)
+        finally:
+            self._active -= 1
+            IN_FLIGHT.dec()
+
+    async def _on_lane_message(self, lane: str, msg: "AbstractIncomingMessage", replay: bool = False):
+        # у очереди lane'а свой prefetch — общий limiter её не ограничивает
+        IN_FLIGHT.inc()
+        self._active += 1
+        try:
+            await self._handle(msg, lane, replay)
+        finally:
+            self._active -= 1
+            IN_FLIGHT.dec()
+
+    async def _handle(self, msg: "AbstractIncomingMessage", lane: Optional[str] = None, replay: bool = False):
         start_time = asyncio.get_event_loop().time()
-        with tracer.start_as_current_span("handle_message"):
+        with tracer.start_as_current_span("handle_message") as span:
+            ctx = EventContext(msg, span, start_time)
+            ctx.lane = lane
             try:
-                raw = json.loads(msg.body)
-                validate_event(raw)
-
-                span = tracer.get_current_span()
-                span.set_attribute("event.id", raw["id"])
-                raw.setdefault("meta", {})["received_at"] = start_time
-
-                # Предобработка
-                pre_start = asyncio.get_event_loop().time()
-                p_res = await preprocess(raw["text"])
-                pre_lat = asyncio.get_event_loop().time() - pre_start
-                span.set_attribute("preprocessing.duration", pre_lat)
-
-                # Генерация
-                gen_start = asyncio.get_event_loop().time()
-                g_res = await generate(p_res["clean_text"], raw.get("generate_type", "image"))
-                gen_lat = asyncio.get_event_loop().time() - gen_start
-                span.set_attribute("generation.duration", gen_lat)
-
-                # Публикация результата
-                out_event = {
-                    "id": raw["id"],
-                    "status": g_res.get("status", "ok"),
-                    "artifact_url": g_res["url"],
-                    "meta": raw["meta"],
-                }
-                await self.broker.publish(
-                    routing_key=settings.OUT_TOPIC,
-                    body=json.dumps(out_event).encode(),
-                    headers={"correlation_id": raw["id"]},
-                )
+                # ждёт места в конвейере — так backpressure доходит до prefetch
+                await self.pipeline.submit(ctx)
+                if self.lanes and ctx.duplicate is None:
+                    await self._lane_for(ctx).submit(ctx)
+                if ctx.duplicate is not None:
+                    await self._handle_duplicate(ctx)
+                    MSG_COUNT.labels(status="duplicate").inc()
+                    return
 
-                await msg.ack()
+                # ack только после подтверждённой публикации результата
+                # (или после записи события в таблицу отложенных задач)
+                with stage_timer("ack"):
+                    await msg.ack()
                 total = asyncio.get_event_loop().time() - start_time
-                logger.info(f"Event {raw['id']} processed in {total:.2f}s")
-                MSG_COUNT.labels(status="ok").inc()
+                # event_id в extra — для сэмплирования записей о событиях (LOG_SAMPLE_RATE)
+                event_id = ctx.raw["id"]
+                if ctx.job_id is not None:
+                    logger.info(
+                        f"Event {event_id} parked as job {ctx.job_id} in {total:.2f}s",
+                        extra={"event_id": event_id}
+                    )
+                    MSG_COUNT.labels(status="parked").inc()
+                else:
+                    logger.info(f"Event {event_id} processed in {total:.2f}s", extra={"event_id": event_id})
+                    MSG_COUNT.labels(status="ok").inc()
                 MSG_LATENCY.observe(total)
 
             except Exception as e:
-                logger.error("Failed to process message", exc_info=True)
-                to_dead_letter(msg, str(e))
-                await msg.reject(requeue=False)
+                # ошибка внутри with не пробрасывается — статус спана ставится явно
+                span.record_exception(e)
+                span.set_status(trace.Status(trace.StatusCode.ERROR, str(e)))
+                event_id = ctx.raw.get("id") if isinstance(ctx.raw, dict) else None
+                if self.retry is not None:
+                    await self._retry_or_dead_letter(msg, lane, e, event_id)
+                    return
+                logger.error("Failed to process message", exc_info=True, extra={"event_id": event_id})
+                reason = error_reason(e)
+                to_dead_letter(msg, reason)
+                if replay:
+                    # ReplayMessage сам публикует в DLQ: новая причина заменяет x-error-reason
+                    await msg.reject(requeue=False, reason=reason)
+                else:
+                    await msg.reject(requeue=False)
                 MSG_COUNT.labels(status="error").inc()
+            finally:
+                # ошибка или отмена (shutdown) до complete(): дубли не должны ждать вечно;
+                # после complete() запись уже снята и abandon ничего не делает
+                if ctx.claimed:
+                    self.dedup.abandon(ctx.raw["id"])
+
+    async def _retry_or_dead_letter(
+        self, msg: "AbstractIncomingMessage", lane: Optional[str], error: Exception, event_id: Optional[str]
+    ) -> None:
+        """
+        Событие с временной ошибкой уходит в очередь задержки и вернётся в
+        свою очередь, остальные — в DLQ с x-error-reason. Входящее ack'ается
+        после публикации; если и она не удалась — reject в DLX, как раньше.
+        """
+        queue = self._lane_queues.get(lane, settings.IN_TOPIC)
+        try:
+            retried = await self.retry.handle_failure(msg, queue, error)
+        except Exception:
+            logger.error("Failed to schedule retry", exc_info=True, extra={"event_id": event_id})
+            to_dead_letter(msg, error_reason(error))
+            await msg.reject(requeue=False)
+            MSG_COUNT.labels(status="error").inc()
+            return
+        await msg.ack()
+        if retried:
+            logger.warning(f"Event {event_id} failed ({error}), retry scheduled", extra={"event_id": event_id})
+            MSG_COUNT.labels(status="retry").inc()
+        else:
+            logger.error("Failed to process message", exc_info=error, extra={"event_id": event_id})
+            MSG_COUNT.labels(status="error").inc()
+
+    async def _decode(self, ctx: EventContext) -> EventContext:
+        # декодируем прямо из буфера тела сообщения, без .decode()/копий;
+        # сжатое тело (content_encoding gzip/zstd) сначала распаковывается
+        with stage_timer("decode"):
+            raw = codec.loads(decompress(ctx.msg.body, getattr(ctx.msg, "content_encoding", None)))
+        with stage_timer("validate"):
+            validate_event(raw)
+        ctx.span.set_attribute("event.id", raw["id"])
+        raw.setdefault("meta", {})["received_at"] = ctx.start_time
+        ctx.raw = raw
+        if self.dedup is not None:
+            state, value = await self.dedup.begin(raw["id"])
+            if state != NEW:
+                # повторная доставка: preprocess/generate не вызываются
+                ctx.duplicate = (state, value)
+                return Done(ctx)
+            ctx.claimed = True
+        return ctx
+
+    async def _handle_duplicate(self, ctx: EventContext) -> None:
+        state, value = ctx.duplicate
+        if state == IN_PROGRESS:
+            # то же событие ещё в конвейере — дожидаемся его исхода
+            value = await asyncio.shield(value)
+        event_id = ctx.raw["id"]
+        if value is not None and "artifact_url" in value and settings.IDEMPOTENCY_DUPLICATES == "republish":
+            await self._publish_out(event_id, value)
+            logger.info(f"Duplicate event {event_id}: stored result republished", extra={"event_id": event_id})
+        else:
+            # исходная доставка уже опубликована, припаркована или ушла в DLQ
+            logger.info(f"Duplicate event {event_id} ({state}) dropped", extra={"event_id": event_id})
+        await ctx.msg.ack()
+
+    async def _preprocess(self, ctx: EventContext) -> EventContext:
+        pre_start = asyncio.get_event_loop().time()
+        with stage_timer("preprocess"):
+            ctx.p_res = await preprocess(ctx.raw["text"])
+        pre_lat = asyncio.get_event_loop().time() - pre_start
+        ctx.span.set_attribute("preprocessing.duration", pre_lat)
+        return ctx
+
+    async def _generate(self, ctx: EventContext) -> EventContext:
+        gen_start = asyncio.get_event_loop().time()
+        gen_type = ctx.raw.get("generate_type", "image")
+        if self.jobs is not None and gen_type in self._async_job_types:
+            # долгая генерация: отдаём задачу генератору и не держим слот до её конца
+            with stage_timer("generate"):
+                ctx.job_id = await submit_job(ctx.p_res["clean_text"], gen_type, settings.JOB_CALLBACK_URL)
+            await self.jobs.park(ctx.job_id, ctx.raw)
+            ctx.span.set_attribute("generation.job_id", ctx.job_id)
+            if ctx.claimed:
+                await self.dedup.complete(ctx.raw["id"], {"job_id": ctx.job_id})
+            return Done(ctx)  # результат опубликует JobTracker
+        with stage_timer("generate"):
+            ctx.g_res = await generate(ctx.p_res["clean_text"], gen_type)
+        gen_lat = asyncio.get_event_loop().time() - gen_start
+        ctx.span.set_attribute("generation.duration", gen_lat)
+        return ctx
+
+    @staticmethod
+    def _out_event(raw: Dict[str, Any], g_res: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            "id": raw["id"],
+            "status": g_res.get("status", "ok"),
+            "artifact_url": g_res["url"],
+            "meta": raw["meta"],
+        }
+
+    async def _publish_out(self, event_id: str, out: Dict[str, Any]) -> None:
+        with stage_timer("encode"):
+            body = codec.dumps(out)
+        with stage_timer("publish"):
+            await self.broker.publish(
+                settings.OUT_TOPIC,
+                body,
+                headers={"correlation_id": event_id},
+                content_type="application/json",
+            )
+
+    async def _publish(self, ctx: EventContext) -> EventContext:
+        out = self._out_event(ctx.raw, ctx.g_res)
+        await self._publish_out(ctx.raw["id"], out)
+        if ctx.claimed:
+            await self.dedup.complete(ctx.raw["id"], out)
+        return ctx
+
+    async def _on_job_result(self, job_id: str, result: Dict[str, Any]) -> bool:
+        """Webhook генератора: промежуточные статусы игнорируются."""
+        if not is_final(result):
+            return False
+        return await self.jobs.resolve(job_id, result, source="webhook")
+
+    async def _complete_job(self, raw: Dict[str, Any], result: Dict[str, Any]) -> None:
+        """Публикация результата припаркованного события (или отправка в DLQ)."""
+        if is_failed(result):
+            reason = result.get("error", "generation job failed")
+            logger.error(f"Generation job for event {raw['id']} failed: {reason}", extra={"event_id": raw["id"]})
+            await self.broker.publish_dlq(
+                codec.dumps(raw), headers={REASON_HEADER: reason, FAILED_AT_HEADER: round(time.time(), 3)}
+            )
+            return
+        out = self._out_event(raw, result)
+        await self._publish_out(raw["id"], out)
+        if self.dedup is not None:
+            await self.dedup.complete(raw["id"], out)
+        logger.info(f"Event {raw['id']} completed by async job", extra={"event_id": raw["id"]})
+
+    async def _wait_handlers(self, timeout: float) -> float:
+        """
+        Дождаться обработчиков уже принятых сообщений: между конвейерами
+        (decode → lane) событие не лежит ни в одной очереди, и drain его
+        не видит. Возвращает остаток таймаута для остановки конвейеров.
+        """
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        while self._active and loop.time() < deadline:
+            await asyncio.sleep(0.05)
+        if self._active:
+            logger.warning(f"{self._active} messages still in progress after {timeout}s")
+        return max(0.1, deadline - loop.time())
 
     async def shutdown(self):
         logger.info("Shutting down MusicAdapter")
+        # сначала перестаём брать новые сообщения, затем дообрабатываем принятые:
+        # обработчики ждёт _wait_handlers, уже после снятия готовности
+        await self.broker.stop_consuming(timeout=0)
+        if self._controller_task is not None:
+            self._controller_task.cancel()
+        if self._lag_task is not None:
+            self._lag_task.cancel()
+        if self._ready_task is not None:
+            self._ready_task.cancel()
+        READY.set(0)
+        if self._health_runner is not None:
+            await self._health_runner.cleanup()
+        remaining = await self._wait_handlers(settings.PIPELINE_DRAIN_TIMEOUT)
+        await self.pipeline.stop(remaining)
+        for lane in self.lanes.values():
+            await lane.pipeline.stop(remaining)
+        if self._jobs_task is not None:
+            self._jobs_task.cancel()
+        await close_preprocessor()
         await self.broker.close()
+        if self.jobs is not None:
+            self.jobs.close()
+        if self.dedup is not None:
+            self.dedup.close()
+        close_generator()
+        await close_client()
         await asyncio.sleep(0.1)
         logger.info("Shutdown complete")
 
-if __name__ == "__main__":
+def _worker_main():
+    """Точка входа процесса-воркера в режиме --workers N."""
+    init_logger("music_adapter")
+    try:
+        asyncio.run(MusicAdapter(serve_health=False).start())
+    except KeyboardInterrupt:
+        pass
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="music_adapter.main")
+    parser.add_argument(
+        "--workers", type=int, default=settings.WORKERS,
+        help="число процессов-воркеров (>1 — режим супервизора)"
+    )
+    args = parser.parse_args(argv)
+    init_logger("music_adapter")
+    if args.workers > 1:
+        from music_adapter.supervisor import run_supervisor
+        run_supervisor(args.workers, _worker_main)
+        return
     try:
         asyncio.run(MusicAdapter().start())
     except KeyboardInterrupt:
-        logging.getLogger().info("Interrupted by user, exiting")
\ No newline at end of file
+        logging.getLogger().info("Interrupted by user, exiting")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,353 @@
+# src/music_adapter/replay.py
+"""
+Повторная обработка DLQ через обычный конвейер адаптера:
+
+    python -m music_adapter.replay --reason "ClientConnectorError" \\
+        --since 2025-05-10T12:00:00 --parallel 4 --rate 20
+
+Отдельный процесс рядом с живыми воркерами: берёт сообщения из DLQ,
+подходящие под фильтр (причина x-error-reason, время неудачи) пропускает
+через конвейер не больше --parallel одновременно и не быстрее --rate в
+секунду, остальные возвращает в конец DLQ. Прогон заканчивается, когда
+DLQ пройдена по кругу, пуста или задан --max-events.
+"""
+import argparse
+import asyncio
+import datetime
+import json
+import logging
+import os
+import re
+import signal
+import time
+import uuid
+from typing import Any, Awaitable, Callable, Dict, Optional, Set
+
+from music_adapter.broker.base import BrokerBackend
+from music_adapter.clients.ratelimit import TokenBucket
+from music_adapter.core.retry import ATTEMPT_HEADER, FAILED_AT_HEADER, REASON_HEADER
+
+log = logging.getLogger(__name__)
+
+# сообщение уже просмотрено этим прогоном (возвращено в конец DLQ)
+RUN_HEADER = "x-replay-run"
+
+def parse_time(value: str) -> float:
+    """ISO 8601 → unix-время; без часового пояса — UTC."""
+    parsed = datetime.datetime.fromisoformat(value.strip().replace("Z", "+00:00"))
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=datetime.timezone.utc)
+    return parsed.timestamp()
+
+def failed_at(headers: Dict[str, Any]) -> Optional[float]:
+    """
+    Время неудачи: x-failed-at (DLQ-публикации адаптера), иначе время из
+    x-death (reject в DLX, его проставляет RabbitMQ). None — неизвестно.
+    """
+    value = headers.get(FAILED_AT_HEADER)
+    if value is not None:
+        try:
+            return float(value)
+        except (TypeError, ValueError):
+            pass
+    deaths = headers.get("x-death")
+    if deaths:
+        died = deaths[0].get("time") if isinstance(deaths[0], dict) else None
+        if isinstance(died, datetime.datetime):
+            if died.tzinfo is None:
+                died = died.replace(tzinfo=datetime.timezone.utc)
+            return died.timestamp()
+    return None
+
+class ReplayFilter:
+    """Отбор сообщений DLQ: регулярное выражение по x-error-reason и интервал времени неудачи."""
+    __slots__ = ("reason", "since", "until")
+
+    def __init__(self, reason: Optional[str] = None, since: Optional[float] = None, until: Optional[float] = None):
+        self.reason = re.compile(reason) if reason else None
+        self.since = since
+        self.until = until
+
+    def matches(self, headers: Dict[str, Any]) -> bool:
+        if self.reason is not None and not self.reason.search(str(headers.get(REASON_HEADER, ""))):
+            return False
+        if self.since is not None or self.until is not None:
+            at = failed_at(headers)
+            if at is None:
+                return False
+            if self.since is not None and at < self.since:
+                return False
+            if self.until is not None and at >= self.until:
+                return False
+        return True
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "reason": self.reason.pattern if self.reason else None,
+            "since": self.since,
+            "until": self.until,
+        }
+
+class ReplayMessage:
+    """
+    Сообщение DLQ для конвейера. Номер попытки сбрасывается (повторы
+    заново), reject без requeue возвращает сообщение в конец DLQ с меткой
+    прогона: у самой DLQ нет DLX, обычный reject его бы потерял.
+    Причина новой неудачи (reason в reject) заменяет прежний x-error-reason.
+    """
+    def __init__(self, replayer: "DLQReplayer", msg: Any):
+        self._replayer = replayer
+        self._msg = msg
+        self.body = msg.body
+        self.headers = {k: v for k, v in (msg.headers or {}).items() if k != ATTEMPT_HEADER}
+        self.headers[RUN_HEADER] = replayer.run_id
+        self.content_type = msg.content_type
+        self.content_encoding = getattr(msg, "content_encoding", None)
+        self.delivery_tag = msg.delivery_tag
+        self.failed = False
+
+    async def ack(self) -> None:
+        await self._msg.ack()
+
+    async def reject(self, requeue: bool = False, reason: Optional[str] = None) -> None:
+        if requeue:
+            await self._msg.reject(requeue=True)
+            return
+        self.failed = True
+        self.headers[FAILED_AT_HEADER] = round(time.time(), 3)
+        if reason is not None:
+            self.headers[REASON_HEADER] = reason
+        await self._replayer.broker.publish_dlq(self.body, self.headers, self.content_encoding)
+        await self._msg.ack()
+
+class Checkpoint:
+    """JSON-файл прогресса: id прогона (метка просмотренных), фильтр, счётчики."""
+    def __init__(self, path: Optional[str]):
+        self.path = path
+
+    def load(self) -> Optional[Dict[str, Any]]:
+        if not self.path or not os.path.exists(self.path):
+            return None
+        with open(self.path) as f:
+            return json.load(f)
+
+    def save(self, state: Dict[str, Any]) -> None:
+        if not self.path:
+            return
+        tmp = f"{self.path}.tmp"
+        with open(tmp, "w") as f:
+            json.dump(state, f, indent=2)
+        os.replace(tmp, self.path)
+
+class DLQReplayer:
+    """
+    Цикл повторной обработки. Сообщения DLQ берутся пачками (consume_batch)
+    не больше числа свободных слотов: не подошедшие под фильтр сразу
+    публикуются в конец DLQ с меткой прогона, подошедшие обрабатываются
+    process() — не больше parallel одновременно, не быстрее rate в секунду.
+    Встретив своё же помеченное сообщение, прогон понимает, что прошёл
+    DLQ по кругу, и останавливается. dry_run — только подсчёт по причинам.
+    """
+    def __init__(
+        self,
+        broker: BrokerBackend,
+        process: Callable[[Any], Awaitable[None]],
+        replay_filter: ReplayFilter,
+        run_id: Optional[str] = None,
+        parallel: int = 4,
+        rate: float = 0.0,
+        dry_run: bool = False,
+        max_events: int = 0,
+        idle_timeout: float = 5.0,
+        report_interval: float = 10.0,
+        checkpoint: Optional[Checkpoint] = None,
+        stats: Optional[Dict[str, Any]] = None
+    ):
+        self.broker = broker
+        self._process = process
+        self.filter = replay_filter
+        self.run_id = run_id or uuid.uuid4().hex[:12]
+        self.parallel = max(1, parallel)
+        self._limiter = TokenBucket("replay", rate, max(1.0, min(rate, self.parallel))) if rate > 0 else None
+        self.dry_run = dry_run
+        self.max_events = max_events
+        self.idle_timeout = idle_timeout
+        self.report_interval = report_interval
+        self.checkpoint = checkpoint or Checkpoint(None)
+        self.stats: Dict[str, Any] = {"selected": 0, "ok": 0, "failed": 0, "skipped": 0, "reasons": {}}
+        self.stats.update(stats or {})
+        self._processed_here = 0
+        self._tasks: Set[asyncio.Task] = set()
+        self._stop = asyncio.Event()
+        self._interrupted = False
+        self._started = time.monotonic()
+        self._reported = self._started
+
+    def stop(self) -> None:
+        """Остановиться после обработки взятых сообщений (SIGINT/SIGTERM)."""
+        self._interrupted = True
+        self._stop.set()
+
+    async def _return(self, msg: Any) -> None:
+        """В конец DLQ с меткой прогона (публикация подтверждена до ack)."""
+        headers = dict(msg.headers or {})
+        headers[RUN_HEADER] = self.run_id
+        await self.broker.publish_dlq(msg.body, headers, getattr(msg, "content_encoding", None))
+        await msg.ack()
+
+    async def _replay(self, msg: Any) -> None:
+        if self._limiter is not None:
+            await self._limiter.acquire()
+        proxy = ReplayMessage(self, msg)
+        try:
+            await self._process(proxy)
+        except Exception:
+            log.exception(f"Replay of message {msg.delivery_tag} failed")
+            proxy.failed = True
+        self.stats["failed" if proxy.failed else "ok"] += 1
+        self._processed_here += 1
+
+    async def _dispatch(self, msg: Any) -> None:
+        headers = msg.headers or {}
+        if headers.get(RUN_HEADER) == self.run_id:
+            # DLQ пройдена по кругу: дальше — уже просмотренные этим прогоном
+            await self._return(msg)
+            self._stop.set()
+            return
+        if self._limit_reached():
+            # взято пачкой сверх --max-events: вернуть без метки, его увидит следующий прогон
+            await msg.reject(requeue=True)
+            return
+        if not self.filter.matches(headers):
+            self.stats["skipped"] += 1
+            await self._return(msg)
+            return
+        self.stats["selected"] += 1
+        reason = str(headers.get(REASON_HEADER, "unknown")).split(":", 1)[0]
+        self.stats["reasons"][reason] = self.stats["reasons"].get(reason, 0) + 1
+        if self.dry_run:
+            await self._return(msg)
+            return
+        task = asyncio.ensure_future(self._replay(msg))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def run(self) -> Dict[str, Any]:
+        loop = asyncio.get_running_loop()
+        # не больше prefetch неподтверждённых: остальное DLQ остаётся в брокере
+        await self.broker.set_prefetch(self.parallel * 2)
+        poll = min(0.5, self.idle_timeout)
+        idle_since = loop.time()
+        while not self._stop.is_set() and not self._limit_reached():
+            free = self.parallel - len(self._tasks)
+            if free <= 0:
+                await asyncio.wait(self._tasks, return_when=asyncio.FIRST_COMPLETED)
+                continue
+            batch = await self.broker.consume_batch(self.broker.dlq, free, poll)
+            if batch:
+                idle_since = loop.time()
+            elif not self._tasks and loop.time() - idle_since >= self.idle_timeout:
+                break
+            for msg in batch:
+                await self._dispatch(msg)
+            self._maybe_report()
+        if self._tasks:
+            await asyncio.gather(*self._tasks)
+        await self.broker.stop_consuming()
+        return self._save(done=not self._interrupted and not self._limit_reached())
+
+    def _limit_reached(self) -> bool:
+        return bool(self.max_events) and self.stats["selected"] >= self.max_events
+
+    def _maybe_report(self) -> None:
+        now = time.monotonic()
+        if now - self._reported < self.report_interval:
+            return
+        self._reported = now
+        state = self._save(done=False)
+        log.info(
+            f"Replay {self.run_id}: {state['stats']['selected']} selected, {state['stats']['ok']} ok, "
+            f"{state['stats']['failed']} failed, {state['stats']['skipped']} skipped, "
+            f"{state['events_per_s']} events/s"
+        )
+
+    def _save(self, done: bool) -> Dict[str, Any]:
+        elapsed = time.monotonic() - self._started
+        state = {
+            "run_id": self.run_id,
+            "dry_run": self.dry_run,
+            "filter": self.filter.to_dict(),
+            "stats": self.stats,
+            "elapsed_s": round(elapsed, 1),
+            "events_per_s": round(self._processed_here / elapsed, 1) if elapsed > 0 else 0.0,
+            "done": done,
+            "updated_at": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds"),
+        }
+        self.checkpoint.save(state)
+        return state
+
+async def replay(args: argparse.Namespace) -> Dict[str, Any]:
+    from music_adapter.main import MusicAdapter
+
+    checkpoint = Checkpoint(args.checkpoint)
+    state = checkpoint.load() if args.resume else None
+    if state is not None and state.get("done"):
+        log.info(f"Replay {state['run_id']} is already complete, nothing to resume")
+        return state
+    saved_filter = (state or {}).get("filter", {})
+    replay_filter = ReplayFilter(
+        args.reason if args.reason is not None else saved_filter.get("reason"),
+        parse_time(args.since) if args.since else saved_filter.get("since"),
+        parse_time(args.until) if args.until else saved_filter.get("until"),
+    )
+
+    adapter = MusicAdapter(serve_health=False)
+    # неудачи возвращаются в DLQ, а не в очереди повторов перед живым потребителем
+    adapter.retry = None
+    replayer = DLQReplayer(
+        adapter.broker,
+        adapter.process,
+        replay_filter,
+        run_id=state["run_id"] if state else None,
+        parallel=args.parallel,
+        rate=args.rate,
+        dry_run=args.dry_run,
+        max_events=args.max_events,
+        idle_timeout=args.idle_timeout,
+        report_interval=args.report_interval,
+        checkpoint=checkpoint,
+        stats=state["stats"] if state else None,
+    )
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, replayer.stop)
+    await adapter.open()
+    log.info(f"Replay {replayer.run_id} started: filter={replay_filter.to_dict()}, dry_run={args.dry_run}")
+    try:
+        return await replayer.run()
+    finally:
+        await adapter.shutdown()
+
+def main(argv=None):
+    from music_adapter.logger import init_logger
+
+    parser = argparse.ArgumentParser(
+        prog="music_adapter.replay", description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--reason", help="регулярное выражение по x-error-reason")
+    parser.add_argument("--since", help="время неудачи не раньше (ISO 8601, UTC по умолчанию)")
+    parser.add_argument("--until", help="время неудачи раньше (ISO 8601)")
+    parser.add_argument("--parallel", type=int, default=4, help="сообщений в обработке одновременно")
+    parser.add_argument("--rate", type=float, default=10.0, help="событий в секунду, 0 — без ограничения")
+    parser.add_argument("--dry-run", action="store_true", help="только подсчитать подходящие по причинам")
+    parser.add_argument("--max-events", type=int, default=0, help="обработать не больше N событий")
+    parser.add_argument("--checkpoint", default="replay.checkpoint.json", help="файл прогресса")
+    parser.add_argument("--resume", action="store_true", help="продолжить прогон из --checkpoint")
+    parser.add_argument("--idle-timeout", type=float, default=5.0, help="завершить, если DLQ пуста N секунд")
+    parser.add_argument("--report-interval", type=float, default=10.0)
+    args = parser.parse_args(argv)
+    init_logger("music_adapter")
+    print(json.dumps(asyncio.run(replay(args)), indent=2, ensure_ascii=False))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,180 @@
+# src/music_adapter/supervisor.py
+import asyncio
+import logging
+import multiprocessing
+import os
+import signal
+import tempfile
+from typing import Callable, List, Optional, Tuple
+
+from aiohttp import web
+from prometheus_client import CollectorRegistry, Counter, Gauge, multiprocess
+
+from music_adapter.api.health import create_app, start_health_server
+from music_adapter.api.jobs import add_job_routes
+from music_adapter.config.settings import get_settings
+from music_adapter.core.jobs import PendingJobStore, is_final
+
+settings = get_settings()
+log = logging.getLogger(__name__)
+
+def prepare_multiprocess_dir() -> str:
+    """
+    Каталог для файлов метрик prometheus_client multiprocess mode.
+    Должен быть в окружении до импорта prometheus_client в воркерах.
+    """
+    path = settings.PROMETHEUS_MULTIPROC_DIR or tempfile.mkdtemp(prefix="music_adapter_metrics_")
+    os.makedirs(path, exist_ok=True)
+    for name in os.listdir(path):  # метрики прошлого запуска
+        if name.endswith(".db"):
+            os.remove(os.path.join(path, name))
+    os.environ["PROMETHEUS_MULTIPROC_DIR"] = path
+    return path
+
+class _Worker:
+    def __init__(self, index: int):
+        self.index = index
+        self.process: Optional[multiprocessing.process.BaseProcess] = None
+        self.restarts = 0
+
+class Supervisor:
+    """
+    Запускает N процессов-воркеров (у каждого свой MusicAdapter, своё
+    подключение к брокеру и свой HTTP-пул), перезапускает упавшие и
+    держит единый health-сервер: /health по всем воркерам, /ready — есть
+    ли готовый воркер, /metrics — агрегат через Prometheus multiprocess mode.
+
+    Воркеры стартуют через spawn, а не fork: дочерний процесс заново
+    импортирует prometheus_client уже с PROMETHEUS_MULTIPROC_DIR и не
+    наследует event loop и сокеты родителя.
+    """
+    def __init__(self, workers: int, target: Callable[[], None]):
+        self._target = target
+        self._ctx = multiprocessing.get_context("spawn")
+        self._workers: List[_Worker] = [_Worker(i) for i in range(workers)]
+        self._stopping = False
+        self._registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(self._registry)
+        self._alive = Gauge(
+            "adapter_workers_alive", "Alive worker processes", registry=self._registry
+        )
+        self._restarts = Counter(
+            "adapter_worker_restarts_total", "Worker process restarts", registry=self._registry
+        )
+
+    def _spawn(self, worker: _Worker) -> None:
+        worker.process = self._ctx.Process(
+            target=self._target, name=f"music-adapter-worker-{worker.index}", daemon=False
+        )
+        worker.process.start()
+        log.info(f"Worker {worker.index} started, pid={worker.process.pid}")
+
+    async def health(self, request):
+        """
+        GET /health → состояние всех воркеров.
+        503, если живых воркеров нет.
+        """
+        workers = [
+            {
+                "index": w.index,
+                "pid": w.process.pid if w.process else None,
+                "alive": bool(w.process and w.process.is_alive()),
+                "restarts": w.restarts,
+            }
+            for w in self._workers
+        ]
+        alive = sum(w["alive"] for w in workers)
+        if alive == len(workers):
+            status, code = "ok", 200
+        elif alive:
+            status, code = "degraded", 200
+        else:
+            status, code = "down", 503
+        return web.json_response({"status": status, "workers": workers}, status=code)
+
+    def readiness(self):
+        """
+        /ready: хотя бы один воркер готов. Воркеры выставляют adapter_ready,
+        супервизор читает сумму по живым процессам из multiprocess-метрик.
+        """
+        ready = self._registry.get_sample_value("adapter_ready") or 0
+        return {"workers": ready >= 1}
+
+    async def _monitor(self) -> None:
+        while not self._stopping:
+            for worker in self._workers:
+                proc = worker.process
+                if proc is None or proc.is_alive() or self._stopping:
+                    continue
+                log.error(f"Worker {worker.index} (pid={proc.pid}) exited with code {proc.exitcode}")
+                multiprocess.mark_process_dead(proc.pid)
+                # пауза растёт при частых падениях, чтобы не крутить рестарты впустую
+                await asyncio.sleep(min(30.0, settings.WORKER_RESTART_DELAY * 2 ** min(worker.restarts, 5)))
+                if self._stopping:
+                    break
+                worker.restarts += 1
+                self._restarts.inc()
+                self._spawn(worker)
+            self._alive.set(sum(1 for w in self._workers if w.process and w.process.is_alive()))
+            await asyncio.sleep(1.0)
+
+    async def _stop_workers(self) -> None:
+        for worker in self._workers:
+            if worker.process and worker.process.is_alive():
+                worker.process.terminate()  # SIGTERM → graceful shutdown воркера
+        deadline = asyncio.get_running_loop().time() + settings.PIPELINE_DRAIN_TIMEOUT + 5
+        for worker in self._workers:
+            proc = worker.process
+            if proc is None:
+                continue
+            while proc.is_alive() and asyncio.get_running_loop().time() < deadline:
+                await asyncio.sleep(0.1)
+            if proc.is_alive():
+                log.warning(f"Worker {worker.index} did not stop in time, killing")
+                proc.kill()
+            proc.join(timeout=1)
+            multiprocess.mark_process_dead(proc.pid)
+
+    def build_app(self) -> Tuple[web.Application, Optional[PendingJobStore]]:
+        """Health-приложение супервизора и таблица задач (если ASYNC_JOBS_ENABLED)."""
+        app = create_app(self._registry, self.health, ready_check=self.readiness)
+        store = None
+        if settings.ASYNC_JOBS_ENABLED:
+            # webhook приходит сюда; результат записывается в общую таблицу,
+            # и его публикует воркер при очередном sweep
+            store = PendingJobStore(settings.JOB_STORE_PATH)
+
+            async def on_result(job_id: str, result: dict) -> bool:
+                return is_final(result) and await store.record_result(job_id, result)
+
+            if settings.JOB_CALLBACK_SECRET:
+                add_job_routes(app, on_result, settings.JOB_CALLBACK_SECRET)
+            else:
+                log.warning("JOB_CALLBACK_SECRET is not set, /jobs/callback disabled; jobs complete by polling")
+        return app, store
+
+    async def run(self) -> None:
+        stop = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(sig, stop.set)
+
+        for worker in self._workers:
+            self._spawn(worker)
+        app, store = self.build_app()
+        runner = await start_health_server(app)
+        monitor = asyncio.ensure_future(self._monitor())
+        log.info(f"Supervisor running {len(self._workers)} workers")
+
+        await stop.wait()
+        log.info("Supervisor shutting down workers")
+        self._stopping = True
+        monitor.cancel()
+        await self._stop_workers()
+        await runner.cleanup()
+        if store is not None:
+            store.close()
+
+def run_supervisor(workers: int, target: Callable[[], None]) -> None:
+    prepare_multiprocess_dir()
+    asyncio.run(Supervisor(workers, target).run())
@@ -0,0 +1,29 @@
+import pytest
+from aiohttp import web
+from music_adapter.api.debug import add_debug_routes
+
+@pytest.mark.asyncio
+async def test_profile_returns_folded_stacks(aiohttp_client):
+    app = web.Application()
+    add_debug_routes(app)
+    client = await aiohttp_client(app)
+    resp = await client.get("/debug/profile", params={"seconds": "0.1", "interval_ms": "5"})
+    assert resp.status == 200
+    lines = (await resp.text()).splitlines()
+    assert lines and all(line.rsplit(" ", 1)[1].isdigit() for line in lines)
+    resp = await client.get("/debug/profile", params={"seconds": "abc"})
+    assert resp.status == 400
+
+@pytest.mark.asyncio
+async def test_profile_clamps_interval_and_duration(aiohttp_client, monkeypatch):
+    from music_adapter.api import debug
+    calls = []
+    monkeypatch.setattr(debug, "sample_stacks", lambda seconds, interval: calls.append((seconds, interval)) or {})
+    app = web.Application()
+    add_debug_routes(app)
+    client = await aiohttp_client(app)
+    resp = await client.get("/debug/profile", params={"seconds": "1e9", "interval_ms": "0.0001"})
+    assert resp.status == 200
+    assert calls == [(debug.settings.PROFILE_MAX_SECONDS, debug.MIN_INTERVAL)]
+    resp = await client.get("/debug/profile", params={"seconds": "nan"})
+    assert resp.status == 400
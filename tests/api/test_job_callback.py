@@ -0,0 +1,46 @@
+import json
+import pytest
+from aiohttp import web
+from music_adapter.api.jobs import SIGNATURE_HEADER, add_job_routes, sign
+
+SECRET = "s3cret"
+
+def _signed(payload, secret=SECRET):
+    body = json.dumps(payload).encode()
+    return {"data": body, "headers": {SIGNATURE_HEADER: sign(secret, body), "Content-Type": "application/json"}}
+
+@pytest.mark.asyncio
+async def test_job_callback_route(aiohttp_client):
+    received = []
+    async def on_result(job_id, result):
+        received.append((job_id, result["status"]))
+        return True
+    app = web.Application()
+    add_job_routes(app, on_result, SECRET)
+    client = await aiohttp_client(app)
+    resp = await client.post("/jobs/callback", **_signed({"job_id": "j1", "status": "done", "url": "u"}))
+    assert resp.status == 200
+    assert await resp.json() == {"accepted": True}
+    assert received == [("j1", "done")]
+    resp = await client.post("/jobs/callback", **_signed({"status": "done"}))
+    assert resp.status == 400
+
+@pytest.mark.asyncio
+async def test_job_callback_rejects_unsigned_requests(aiohttp_client):
+    received = []
+    async def on_result(job_id, result):
+        received.append(job_id)
+        return True
+    app = web.Application()
+    add_job_routes(app, on_result, SECRET)
+    client = await aiohttp_client(app)
+    payload = {"job_id": "j1", "status": "done", "url": "http://evil"}
+    resp = await client.post("/jobs/callback", json=payload)
+    assert resp.status == 401
+    resp = await client.post("/jobs/callback", **_signed(payload, secret="guess"))
+    assert resp.status == 401
+    resp = await client.post("/jobs/callback", data=b"{}", headers={SIGNATURE_HEADER: "sha256=ф"})
+    assert resp.status == 401
+    assert received == []
+    with pytest.raises(ValueError):
+        add_job_routes(web.Application(), on_result, "")
@@ -0,0 +1,19 @@
+import pytest
+from music_adapter.api.health import create_app
+
+@pytest.mark.asyncio
+async def test_ready_reflects_checks(aiohttp_client):
+    checks = {"broker": True, "consumer": False, "http_pool": True}
+    client = await aiohttp_client(create_app(ready_check=lambda: dict(checks)))
+    resp = await client.get("/ready")
+    assert resp.status == 503
+    assert (await resp.json())["checks"] == checks
+    checks["consumer"] = True
+    resp = await client.get("/ready")
+    assert resp.status == 200
+    assert (await resp.json())["status"] == "ready"
+
+@pytest.mark.asyncio
+async def test_health_does_not_depend_on_readiness(aiohttp_client):
+    client = await aiohttp_client(create_app(ready_check=lambda: {"broker": False}))
+    assert (await client.get("/health")).status == 200
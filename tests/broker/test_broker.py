@@ -7,4 +7,23 @@ async def test_broker_init():
     assert b._conn is None
     assert b._channel is None
 
-# Нельзя тестировать connect/publish без реального брокера, здесь мы лишь проверяем атрибуты
+# Нельзя тестировать connect/publish без реального брокера, здесь мы лишь проверяем атрибуты;
+# поведение потребителя проверяется на MemoryBroker (test_memory.py)
+
+class _Channel:
+    is_closed = False
+
+    def __init__(self):
+        self.qos = []
+
+    async def set_qos(self, **kwargs):
+        self.qos.append(kwargs)
+
+@pytest.mark.asyncio
+async def test_set_prefetch_applies_to_running_consumer():
+    # QoS на потребителя не действует на уже запущенного — лимит ставится на канал
+    b = Broker()
+    b._channel = _Channel()
+    await b.set_prefetch(12)
+    assert b._prefetch == 12
+    assert b._channel.qos == [{"prefetch_count": 12, "global_": True}]
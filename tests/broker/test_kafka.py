@@ -0,0 +1,114 @@
+import asyncio
+from types import SimpleNamespace
+import pytest
+from music_adapter.broker.kafka import KafkaBroker, OffsetTracker, _TopicConsumer, bootstrap_servers
+
+def test_bootstrap_servers():
+    assert bootstrap_servers("kafka://k1:9092,k2:9092") == "k1:9092,k2:9092"
+    assert bootstrap_servers("k1:9092") == "k1:9092"
+
+def test_offsets_commit_contiguous_prefix_only():
+    t = OffsetTracker()
+    for offset in (10, 11, 13):  # 12 — пропуск в топике (compaction)
+        t.delivered("p0", offset)
+    t.done("p0", 11)
+    assert t.ready() == {}
+    t.done("p0", 10)
+    assert t.ready() == {"p0": 12}
+    t.done("p0", 13)
+    assert t.ready() == {"p0": 14}
+    t.revoke(["p0"])
+    t.done("p0", 14)  # ack после ребаланса игнорируется
+    assert t.ready() == {}
+
+class FakeConsumer:
+    """getmany/commit как у AIOKafkaConsumer; records — [(партиция, запись)]."""
+    def __init__(self, records):
+        self.records = records
+        self.commits = []
+
+    async def getmany(self, timeout_ms=0, max_records=None):
+        if not self.records:
+            await asyncio.sleep(timeout_ms / 1000)
+            return {}
+        taken, self.records = self.records[:max_records], self.records[max_records:]
+        batch = {}
+        for tp, record in taken:
+            batch.setdefault(tp, []).append(record)
+        return batch
+
+    async def commit(self, offsets):
+        self.commits.append(dict(offsets))
+
+    async def stop(self):
+        pass
+
+def _record(partition, offset):
+    return SimpleNamespace(
+        topic="in", partition=partition, offset=offset, value=f"{partition}:{offset}".encode(),
+        headers=[("correlation_id", b"x"), ("content-type", b"application/json")]
+    )
+
+def _broker(records):
+    broker = KafkaBroker()
+    consumer = FakeConsumer([(f"p{p}", _record(p, o)) for p, o in records])
+    broker._sources["in"] = _TopicConsumer(consumer)
+    return broker, consumer
+
+@pytest.mark.asyncio
+async def test_partitions_processed_in_parallel_offsets_committed_after_ack():
+    broker, consumer = _broker([(0, 0), (0, 1), (0, 2), (1, 0), (1, 1)])
+    held = []
+
+    async def handler(msg):
+        held.append(msg)
+
+    await broker.subscribe("in", handler, prefetch=10)
+    await asyncio.sleep(0.01)
+    assert len(held) == 5  # все записи пачки сразу, по обеим партициям
+    assert held[0].content_type == "application/json" and held[0].headers == {"correlation_id": "x"}
+
+    by_key = {(m.tp, m.offset): m for m in held}
+    await by_key[("p0", 1)].ack()
+    assert consumer.commits == []  # offset 0 ещё в работе
+    await by_key[("p0", 0)].ack()
+    await by_key[("p1", 0)].ack()
+    assert consumer.commits == [{"p0": 2}, {"p1": 1}]
+    await broker.stop_consuming()
+
+@pytest.mark.asyncio
+async def test_prefetch_bounds_unacked_records():
+    broker, _ = _broker([(0, o) for o in range(5)])
+    held = []
+
+    async def handler(msg):
+        held.append(msg)
+
+    await broker.subscribe("in", handler, prefetch=2)
+    await asyncio.sleep(0.01)
+    assert len(held) == 2
+    await held[0].ack()
+    await asyncio.sleep(0.01)
+    assert len(held) == 3
+    await broker.stop_consuming()
+
+@pytest.mark.asyncio
+async def test_close_after_stop_consuming_does_not_stop_again(monkeypatch):
+    broker, _ = _broker([(0, 0)])
+    held = []
+
+    async def handler(msg):
+        held.append(msg)
+
+    await broker.subscribe("in", handler)
+    await asyncio.sleep(0.01)
+    await held[0].ack()
+    await broker.stop_consuming(timeout=0)
+    calls = []
+
+    async def stop_consuming(timeout=10.0):
+        calls.append(timeout)
+
+    monkeypatch.setattr(broker, "stop_consuming", stop_consuming)
+    await broker.close()
+    assert calls == [] and not broker._sources
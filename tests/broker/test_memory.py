@@ -0,0 +1,76 @@
+import asyncio
+import pytest
+from music_adapter.broker.memory import MemoryBroker
+
+@pytest.mark.asyncio
+async def test_prefetch_limits_unacked_deliveries():
+    broker = MemoryBroker(prefetch=2)
+    await broker.connect()
+    held = []
+    async def handler(msg):
+        held.append(msg)
+    await broker.subscribe("in", handler)
+    for i in range(5):
+        broker.inject("in", str(i).encode())
+    await asyncio.sleep(0.01)
+    assert len(held) == 2
+    await held[0].ack()
+    await asyncio.sleep(0.01)
+    assert len(held) == 3
+    await broker.close()
+
+@pytest.mark.asyncio
+async def test_publish_and_reject_to_dlq():
+    broker = MemoryBroker()
+    await broker.connect()
+    async def handler(msg):
+        if msg.body == b"bad":
+            await msg.reject(requeue=False)
+        else:
+            await broker.publish("out", b'{"ok":true}', {"correlation_id": "1"}, "application/json")
+            await msg.ack()
+    await broker.subscribe("in", handler)
+    broker.inject("in", b"good")
+    broker.inject("in", b"bad")
+    await asyncio.sleep(0.01)
+    out = broker.published("out")
+    assert len(out) == 1 and out[0].headers["correlation_id"] == "1"
+    assert out[0].content_type == "application/json"
+    assert [m.body for m in broker.published("dlq")] == [b"bad"]
+    await broker.close()
+
+@pytest.mark.asyncio
+async def test_connection_and_consumer_state():
+    broker = MemoryBroker()
+    assert not broker.is_connected() and not broker.is_consuming()
+    await broker.connect()
+    async def handler(msg):
+        await msg.ack()
+    await broker.subscribe("in", handler)
+    assert broker.is_connected() and broker.is_consuming()
+    await broker.close()
+    assert not broker.is_connected() and not broker.is_consuming()
+
+@pytest.mark.asyncio
+async def test_stop_consuming_waits_for_running_handlers(caplog):
+    broker = MemoryBroker()
+    await broker.connect()
+    finished = []
+
+    async def handler(msg):
+        if msg.body == b"bad":
+            raise RuntimeError("handler bug")
+        await asyncio.sleep(0.05)
+        await msg.ack()
+        finished.append(msg.body)
+
+    await broker.subscribe("in", handler)
+    broker.inject("in", b"slow")
+    broker.inject("in", b"bad")
+    await asyncio.sleep(0.01)
+    consumer = broker._batch_consumers[0]
+    assert len(consumer.handlers) == 1  # упавший обработчик уже убран из набора
+    assert "handler bug" in caplog.text
+    await broker.stop_consuming(timeout=1)
+    assert finished == [b"slow"] and not consumer.handlers
+    await broker.close()
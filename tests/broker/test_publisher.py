@@ -0,0 +1,57 @@
+import pytest
+import asyncio
+from aio_pika import Message
+from music_adapter.broker.publisher import Publisher
+
+class FakeExchange:
+    def __init__(self, name, log):
+        self.name = name
+        self.log = log
+    async def publish(self, message, routing_key):
+        await asyncio.sleep(0.01)  # ждём confirm
+        self.log.append((self.name, routing_key, message.body))
+
+class FakeChannel:
+    is_closed = False
+    def __init__(self, log):
+        self.log = log
+        self.lookups = 0
+    async def get_exchange(self, name, ensure=True):
+        self.lookups += 1
+        return FakeExchange(name, self.log)
+    async def close(self):
+        self.is_closed = True
+
+class FakeConnection:
+    def __init__(self):
+        self.log = []
+        self.channels = []
+    async def channel(self, publisher_confirms=True):
+        ch = FakeChannel(self.log)
+        self.channels.append(ch)
+        return ch
+
+@pytest.mark.asyncio
+async def test_publishes_are_pipelined_and_exchange_cached():
+    conn = FakeConnection()
+    pub = Publisher(pool_size=2, max_pending=100)
+    await pub.open(conn)
+    loop = asyncio.get_running_loop()
+    started = loop.time()
+    await asyncio.gather(*(pub.publish("ex", Message(str(i).encode()), "rk") for i in range(20)))
+    # 20 публикаций по 10 мс не ждут друг друга
+    assert loop.time() - started < 0.1
+    assert len(conn.log) == 20
+    assert [ch.lookups for ch in conn.channels] == [1, 1]
+
+@pytest.mark.asyncio
+async def test_close_flushes_pending():
+    conn = FakeConnection()
+    pub = Publisher(pool_size=1, max_pending=10)
+    await pub.open(conn)
+    task = asyncio.ensure_future(pub.publish("ex", Message(b"x"), "rk"))
+    await asyncio.sleep(0)
+    await pub.close()
+    assert conn.log == [("ex", "rk", b"x")]
+    assert conn.channels[0].is_closed
+    await task
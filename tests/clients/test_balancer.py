@@ -0,0 +1,83 @@
+import asyncio
+import pytest
+from music_adapter.clients.balancer import LoadBalancer, parse_endpoints
+from music_adapter.clients.circuit import CircuitOpenError
+
+def test_parse_endpoints():
+    assert parse_endpoints("http://a:1/p", " http://b:1/p,,http://a:1/p") == ["http://a:1/p", "http://b:1/p"]
+
+@pytest.mark.asyncio
+async def test_prefers_faster_endpoint():
+    lb = LoadBalancer("lb-fast", ["http://lb-slow:1/", "http://lb-fast:1/"])
+    lb.endpoints[0].observe(0.5)
+    lb.endpoints[1].observe(0.01)
+    calls = []
+    async def request(url):
+        calls.append(url)
+        return url
+    for _ in range(5):
+        await lb.call(request)
+    assert set(calls) == {"http://lb-fast:1/"}
+
+@pytest.mark.asyncio
+async def test_fails_over_and_skips_open_circuit():
+    lb = LoadBalancer("lb-failover", ["http://lb-down:1/", "http://lb-up:1/"])
+    lb.endpoints[1].observe(1.0)  # без ошибок выбиралась бы первая реплика
+    async def request(url):
+        if "down" in url:
+            lb.endpoints[0].breaker.record_failure()
+            raise RuntimeError("boom")
+        return "ok"
+    for _ in range(6):
+        assert await lb.call(request) == "ok"
+    assert lb.endpoints[0].breaker.is_open
+    assert lb.pick().url == "http://lb-up:1/"
+
+@pytest.mark.asyncio
+async def test_hedged_request_wins_on_slow_replica():
+    lb = LoadBalancer(
+        "lb-hedge", ["http://lb-h1:1/", "http://lb-h2:1/"],
+        hedge=True, hedge_min_delay=0.01, hedge_min_samples=1,
+    )
+    lb._latencies.append(0.01)
+    lb.endpoints[1].observe(1.0)  # основной выбирается h1
+    async def request(url):
+        if "h1" in url:
+            await asyncio.sleep(5)
+        return url
+    result = await asyncio.wait_for(lb.call(request), 1)
+    assert result == "http://lb-h2:1/"
+    assert lb.endpoints[0].outstanding == 0
+
+@pytest.mark.asyncio
+async def test_non_idempotent_request_is_not_hedged_or_resent():
+    lb = LoadBalancer(
+        "lb-gen", ["http://lb-g1:1/", "http://lb-g2:1/"],
+        hedge=True, hedge_min_delay=0.01, hedge_min_samples=1,
+    )
+    lb._latencies.append(0.01)
+    lb.endpoints[1].observe(1.0)  # основной выбирается g1
+    calls = []
+    async def slow(url):
+        calls.append(url)
+        await asyncio.sleep(0.05)
+        return url
+    assert await lb.call(slow, idempotent=False) == "http://lb-g1:1/"
+    assert calls == ["http://lb-g1:1/"]
+
+    calls.clear()
+    async def failing(url):
+        calls.append(url)
+        raise RuntimeError("timeout after the request was sent")
+    with pytest.raises(RuntimeError):
+        await lb.call(failing, idempotent=False)
+    assert len(calls) == 1
+
+    # запрос не ушёл (цепь открыта) — можно на другую реплику
+    calls.clear()
+    async def open_first(url):
+        calls.append(url)
+        if len(calls) == 1:
+            raise CircuitOpenError("open")
+        return url
+    assert await lb.call(open_first, idempotent=False) == calls[1]
@@ -0,0 +1,34 @@
+import pytest
+import asyncio
+from music_adapter.clients.batcher import MicroBatcher
+
+@pytest.mark.asyncio
+async def test_batches_concurrent_calls():
+    calls = []
+    async def send(items):
+        calls.append(list(items))
+        return [i * 2 for i in items]
+    b = MicroBatcher(send, max_size=10, window=0.01)
+    res = await asyncio.gather(*(b.submit(i) for i in range(5)))
+    assert res == [0, 2, 4, 6, 8]
+    assert calls == [[0, 1, 2, 3, 4]]
+
+@pytest.mark.asyncio
+async def test_flush_on_max_size():
+    calls = []
+    async def send(items):
+        calls.append(len(items))
+        return items
+    b = MicroBatcher(send, max_size=2, window=10)
+    res = await asyncio.gather(*(b.submit(i) for i in range(4)))
+    assert res == [0, 1, 2, 3]
+    assert calls == [2, 2]
+
+@pytest.mark.asyncio
+async def test_item_error_only_for_its_caller():
+    async def send(items):
+        return [ValueError("bad") if i == 1 else i for i in items]
+    b = MicroBatcher(send, max_size=10, window=0.01)
+    res = await asyncio.gather(*(b.submit(i) for i in range(3)), return_exceptions=True)
+    assert res[0] == 0 and res[2] == 2
+    assert isinstance(res[1], ValueError)
@@ -0,0 +1,17 @@
+from music_adapter.clients.circuit import CircuitBreaker, get_breaker
+
+def test_breaker_opens_and_recovers():
+    breaker = CircuitBreaker("http://cb:1", threshold=2, reset_timeout=0)
+    breaker.record_failure()
+    assert breaker.allow_request()
+    breaker.record_failure()
+    # reset_timeout=0 → сразу half-open, успех закрывает цепь
+    assert breaker.allow_request()
+    breaker.record_success()
+    assert not breaker.is_open
+
+def test_breakers_are_per_endpoint():
+    assert get_breaker("http://gen:8080/generate") is get_breaker("http://gen:8080/generate/?trace=1")
+    assert get_breaker("http://gen:8080/generate") is not get_breaker("http://pre:8080/preprocess")
+    # два сервиса на одном host:port не размыкают цепи друг друга
+    assert get_breaker("http://svc:8080/generate") is not get_breaker("http://svc:8080/preprocess")
@@ -1,7 +1,7 @@
 import pytest
 from music_adapter.clients.generator import generate
 
-async def dummy_post(url, payload):
+async def dummy_post(url, payload, service=None):
     return {"url": "http://img", "status": "ok"}
 
 @pytest.mark.asyncio
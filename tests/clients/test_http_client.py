@@ -18,4 +18,15 @@ async def test_post_json_success(aiohttp_unused_port, aiohttp_server):
 async def test_post_json_failure(aiohttp_unused_port):
     # Некорректный URL → должно выбросить
     with pytest.raises(Exception):
-        await post_json("http://invalid/", {})
\ No newline at end of file
+        await post_json("http://invalid/", {})
+
+@pytest.mark.asyncio
+async def test_shared_client_lifecycle():
+    from music_adapter.clients.http_client import init_client, get_client, close_client
+    client = await init_client()
+    assert get_client() is client
+    assert client.connections_in_use == 0
+    await close_client()
+    assert client.closed
+    assert get_client() is not client
+    await close_client()
@@ -3,7 +3,7 @@ from music_adapter.clients.preprocessor import preprocess
 
 class Dummy:
     called = False
-async def dummy_post(url, payload):
+async def dummy_post(url, payload, service=None):
     Dummy.called = True
     return {"clean_text": payload["text"].upper(), "features": {}}
 
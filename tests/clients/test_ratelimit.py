@@ -0,0 +1,112 @@
+import asyncio
+import fcntl
+import os
+import time
+import pytest
+from aiohttp import web
+from music_adapter.clients import ratelimit
+from music_adapter.clients.circuit import get_breaker
+from music_adapter.clients.http_client import HTTPClient
+from music_adapter.clients.ratelimit import (
+    FileTokenBucket, TokenBucket, parse_rate_limits, parse_retry_after
+)
+
+def test_parse_rate_limits():
+    assert parse_rate_limits("generate:10/20, process:5") == {"generate": (10.0, 20.0), "process": (5.0, 5.0)}
+    with pytest.raises(ValueError):
+        parse_rate_limits("generate")
+
+def test_parse_retry_after():
+    assert parse_retry_after("3") == 3.0
+    assert parse_retry_after("Wed, 21 Oct 2015 07:28:00 GMT") == 0.0  # дата в прошлом
+    assert parse_retry_after("soon") is None
+
+@pytest.mark.asyncio
+async def test_burst_then_rate():
+    bucket = TokenBucket("t", rate=50, burst=2)
+    start = time.monotonic()
+    for _ in range(4):
+        await bucket.acquire()
+    # два токена из burst, ещё два — по 20 мс
+    assert 0.03 <= time.monotonic() - start < 0.2
+
+@pytest.mark.asyncio
+async def test_throttled_lowers_rate_and_pauses():
+    bucket = TokenBucket("t", rate=100, burst=1, backoff=0.5, recovery=3600)
+    await bucket.throttled(retry_after=0.05)
+    assert await bucket._take() > 0.04
+    await asyncio.sleep(0.06)
+    await bucket.acquire()
+    assert bucket._state[2] == pytest.approx(50, rel=0.01)
+
+@pytest.mark.asyncio
+async def test_file_bucket_shared_between_instances(tmp_path):
+    path = str(tmp_path / "generate.bucket")
+    a = FileTokenBucket("shared", rate=0.01, burst=2, path=path)
+    b = FileTokenBucket("shared", rate=0.01, burst=2, path=path)
+    assert await a._take() == 0
+    assert await b._take() == 0
+    assert await a._take() > 0  # burst исчерпан обоими «процессами»
+    a.close()
+    b.close()
+
+@pytest.mark.asyncio
+async def test_file_bucket_waits_for_lock_without_blocking_loop(tmp_path):
+    path = str(tmp_path / "generate.bucket")
+    bucket = FileTokenBucket("shared", rate=100, burst=1, path=path)
+    # flock держит другой «процесс» (отдельный open — отдельная блокировка)
+    other = os.open(path, os.O_RDWR)
+    fcntl.flock(other, fcntl.LOCK_EX)
+    take = asyncio.ensure_future(bucket._take())
+    await asyncio.sleep(0.02)
+    assert not take.done()  # ждёт в loop, а не в flock
+    fcntl.flock(other, fcntl.LOCK_UN)
+    assert await asyncio.wait_for(take, 1) == 0
+    os.close(other)
+    bucket.close()
+
+@pytest.mark.asyncio
+async def test_429_waits_for_token_instead_of_failing(aiohttp_server, monkeypatch):
+    calls = []
+
+    async def limited(request):
+        calls.append(time.monotonic())
+        if len(calls) == 1:
+            return web.json_response({"error": "quota"}, status=429, headers={"Retry-After": "0.05"})
+        return web.json_response({"ok": True})
+
+    app = web.Application()
+    app.router.add_post("/limited", limited)
+    server = await aiohttp_server(app)
+    monkeypatch.setitem(ratelimit._limiters, "limited", TokenBucket("limited", rate=100, burst=5))
+    client = HTTPClient()
+    url = str(server.make_url("/limited"))
+    assert await client.post_json(url, {}) == {"ok": True}
+    assert len(calls) == 2 and calls[1] - calls[0] >= 0.05
+    assert not get_breaker(url).is_open
+    await client.close()
+
+@pytest.mark.asyncio
+async def test_job_submit_and_poll_share_generate_bucket(aiohttp_server, monkeypatch):
+    from music_adapter.clients import generator, http_client
+
+    async def submit(request):
+        return web.json_response({"job_id": "j1"})
+
+    async def status(request):
+        return web.json_response({"status": "done", "url": "u"})
+
+    app = web.Application()
+    app.router.add_post("/generate/jobs", submit)
+    app.router.add_get("/generate/jobs/j1", status)
+    server = await aiohttp_server(app)
+    bucket = TokenBucket("generate", rate=0.01, burst=2)
+    monkeypatch.setitem(ratelimit._limiters, "generate", bucket)
+    monkeypatch.setattr(generator.settings, "GENERATION_JOBS_URL", str(server.make_url("/generate/jobs")))
+    try:
+        assert await generator.submit_job("text", "mp4", None) == "j1"
+        assert (await generator.get_job("j1"))["url"] == "u"
+    finally:
+        await http_client.close_client()
+    # оба запроса взяли токены из бакета generate, а не из «jobs»/«j1»
+    assert await bucket._take() > 0
@@ -0,0 +1,51 @@
+import pytest
+import asyncio
+from music_adapter.core.cache import LRUCache, DiskCache, ResultCache, content_key
+
+def test_lru_eviction_and_ttl():
+    c = LRUCache(max_entries=2, ttl=60)
+    c.set("a", 1)
+    c.set("b", 2)
+    c.get("a")
+    c.set("c", 3)  # вытесняет b
+    assert c.get("b") is None
+    assert c.get("a") == 1
+    c.set("d", 4, ttl=0)
+    assert c.get("d") is None
+
+def test_content_key_depends_on_all_parts():
+    assert content_key("image", "text") != content_key("mp4", "text")
+    assert content_key("image", "text") == content_key("image", "text")
+
+@pytest.mark.asyncio
+async def test_single_flight_shares_upstream_call():
+    calls = {"n": 0}
+    async def compute():
+        calls["n"] += 1
+        await asyncio.sleep(0.01)
+        return {"url": "u"}
+    cache = ResultCache("test", LRUCache(10, 60))
+    res = await asyncio.gather(*(cache.get_or_compute("k", compute) for _ in range(5)))
+    assert all(r == {"url": "u"} for r in res)
+    assert calls["n"] == 1
+    assert await cache.get_or_compute("k", compute) == {"url": "u"}
+    assert calls["n"] == 1
+
+@pytest.mark.asyncio
+async def test_errors_are_not_cached():
+    async def fail():
+        raise RuntimeError("boom")
+    cache = ResultCache("test", LRUCache(10, 60))
+    with pytest.raises(RuntimeError):
+        await cache.get_or_compute("k", fail)
+    assert await cache.get("k") is None
+
+@pytest.mark.asyncio
+async def test_disk_tier_survives_restart(tmp_path):
+    path = str(tmp_path / "cache.db")
+    cache = ResultCache("test", LRUCache(10, 60), DiskCache(path, ttl=60))
+    await cache.set("k", {"url": "u"})
+    cache.close()
+    cache = ResultCache("test", LRUCache(10, 60), DiskCache(path, ttl=60))
+    assert await cache.get("k") == {"url": "u"}
+    cache.close()
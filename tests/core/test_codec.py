@@ -0,0 +1,17 @@
+import pytest
+from music_adapter.core.codec import get_codec
+
+EVENT = {"id": "1", "text": "Текст песни", "authors": ["A"], "length": 1.5}
+
+@pytest.mark.parametrize("name", ["auto", "json"])
+def test_roundtrip_from_buffers(name):
+    _, loads, dumps = get_codec(name)
+    body = dumps(EVENT)
+    assert isinstance(body, bytes)
+    assert loads(body) == EVENT
+    assert loads(bytearray(body)) == EVENT
+    assert loads(memoryview(body)) == EVENT
+
+def test_unknown_codec():
+    with pytest.raises(ValueError):
+        get_codec("nope")
@@ -0,0 +1,79 @@
+import gzip
+import os
+import pytest
+from aiohttp import web
+from music_adapter.broker.memory import MemoryBroker
+from music_adapter.clients import http_client
+from music_adapter.core import compression
+from music_adapter.core.compression import compress, decompress
+
+LYRICS = ("Верни мне мой 2008-й, верни мне мой 2008-й\n" * 80).encode("utf-8")
+
+@pytest.fixture
+def gzip_settings(monkeypatch):
+    monkeypatch.setattr(compression.settings, "COMPRESSION_ALGORITHM", "gzip")
+    monkeypatch.setattr(compression.settings, "COMPRESSION_MIN_BYTES", 256)
+    monkeypatch.setattr(compression, "_encoding", None)
+
+def test_threshold_and_round_trip(gzip_settings):
+    assert compress(b'{"id": "e1"}', "broker") == (b'{"id": "e1"}', None)
+    packed, encoding = compress(LYRICS, "broker")
+    assert encoding == "gzip" and len(packed) < len(LYRICS) // 10
+    assert decompress(packed, encoding) == LYRICS
+    assert decompress(LYRICS, None) == LYRICS
+
+def test_incompressible_payload_is_sent_as_is(gzip_settings):
+    noise = os.urandom(4096)
+    assert compress(noise, "http") == (noise, None)
+
+def test_decompress_rejects_bombs_and_unknown_encodings():
+    bomb = gzip.compress(b"\0" * 10000)
+    with pytest.raises(ValueError):
+        decompress(bomb, "gzip", max_size=1000)
+    with pytest.raises(ValueError):
+        decompress(b"not gzip", "gzip")
+    with pytest.raises(ValueError):
+        decompress(b"x", "br")
+
+def test_zstd_round_trip(monkeypatch):
+    pytest.importorskip("zstandard")
+    monkeypatch.setattr(compression, "_encoding", "zstd")
+    packed, encoding = compress(LYRICS, "broker")
+    assert encoding == "zstd" and decompress(packed, "zstd") == LYRICS
+
+@pytest.mark.asyncio
+async def test_broker_publish_sets_content_encoding(gzip_settings, monkeypatch):
+    from music_adapter.broker import base
+    monkeypatch.setattr(base.settings, "COMPRESSION_BROKER", True)
+    broker = MemoryBroker()
+    await broker.publish("out", LYRICS, content_type="application/json")
+    await broker.publish("out", b"{}")
+    big, small = broker.published("out")
+    assert big.content_encoding == "gzip" and decompress(big.body, big.content_encoding) == LYRICS
+    assert small.content_encoding is None and small.body == b"{}"
+    # уже закодированное тело (пересылка в DLQ) не сжимается повторно
+    await broker.publish_dlq(big.body, {}, "gzip")
+    assert broker.published("dlq")[0].body == big.body
+
+@pytest.mark.asyncio
+async def test_http_request_body_is_compressed(gzip_settings, monkeypatch, aiohttp_server):
+    monkeypatch.setattr(http_client.settings, "COMPRESSION_HTTP", True)
+    seen = {}
+
+    async def handler(request):
+        seen["encoding"] = request.headers.get("Content-Encoding")
+        # aiohttp-сервер распаковывает тело по Content-Encoding сам
+        seen["payload"] = await request.json()
+        return web.json_response({"ok": True})
+
+    app = web.Application()
+    app.router.add_post("/process", handler)
+    server = await aiohttp_server(app)
+    client = http_client.HTTPClient("compression-test")
+    try:
+        result = await client.post_json(f"http://{server.host}:{server.port}/process", {"text": LYRICS.decode()})
+    finally:
+        await client.close()
+    assert result == {"ok": True}
+    assert seen["encoding"] == "gzip"
+    assert seen["payload"] == {"text": LYRICS.decode()}
@@ -0,0 +1,92 @@
+import pytest
+import asyncio
+from prometheus_client import CollectorRegistry, Counter, Histogram
+from music_adapter.broker.memory import MemoryBroker
+from music_adapter.core.concurrency import AdaptiveLimiter, AdaptiveConcurrencyController
+
+def _metrics():
+    registry = CollectorRegistry()
+    latency = Histogram("lat_seconds", "latency", registry=registry)
+    outcomes = Counter("msgs", "messages", ["status"], registry=registry)
+    return latency, outcomes
+
+@pytest.mark.asyncio
+async def test_limiter_blocks_at_limit_and_can_grow():
+    limiter = AdaptiveLimiter(1)
+    await limiter.acquire()
+    waiter = asyncio.ensure_future(limiter.acquire())
+    await asyncio.sleep(0)
+    assert not waiter.done()
+    await limiter.set_limit(2)
+    await asyncio.wait_for(waiter, 1)
+    assert limiter.in_flight == 2
+
+@pytest.mark.asyncio
+async def test_additive_increase_when_saturated():
+    latency, outcomes = _metrics()
+    limiter = AdaptiveLimiter(4)
+    applied = []
+    async def on_change(n):
+        applied.append(n)
+    ctl = AdaptiveConcurrencyController(limiter, latency, outcomes, floor=2, ceiling=5, on_change=on_change)
+    for _ in range(4):
+        await limiter.acquire()
+    for _ in range(10):
+        latency.observe(0.1)
+        outcomes.labels(status="ok").inc()
+    assert await ctl.adjust() == 5
+    assert await ctl.adjust() == 5  # потолок
+    assert applied == [5]
+
+@pytest.mark.asyncio
+async def test_multiplicative_decrease_on_errors_and_latency():
+    latency, outcomes = _metrics()
+    limiter = AdaptiveLimiter(10)
+    ctl = AdaptiveConcurrencyController(limiter, latency, outcomes, floor=2, ceiling=20)
+    latency.observe(0.1)
+    outcomes.labels(status="ok").inc()
+    await ctl.adjust()  # базовая задержка 0.1
+    latency.observe(1.0)
+    outcomes.labels(status="ok").inc()
+    assert await ctl.adjust() == 7
+    outcomes.labels(status="error").inc()
+    assert await ctl.adjust() == 4
+    outcomes.labels(status="error").inc()
+    assert await ctl.adjust() == 2  # пол
+
+@pytest.mark.asyncio
+async def test_retries_count_as_errors():
+    latency, outcomes = _metrics()
+    limiter = AdaptiveLimiter(10)
+    ctl = AdaptiveConcurrencyController(limiter, latency, outcomes, floor=2, ceiling=20)
+    outcomes.labels(status="ok").inc()
+    outcomes.labels(status="retry").inc()
+    assert await ctl.adjust() == 7
+
+@pytest.mark.asyncio
+async def test_increase_delivers_more_than_initial_prefetch():
+    broker = MemoryBroker(prefetch=2)
+    await broker.connect()
+    latency, outcomes = _metrics()
+    limiter = AdaptiveLimiter(2)
+    ctl = AdaptiveConcurrencyController(
+        limiter, latency, outcomes, floor=1, ceiling=4, on_change=broker.set_prefetch
+    )
+    held = []
+
+    async def handler(msg):
+        await limiter.acquire()
+        held.append(msg)
+
+    await broker.subscribe("in", handler)
+    for i in range(6):
+        broker.inject("in", str(i).encode())
+    await asyncio.sleep(0.01)
+    assert len(held) == 2
+    latency.observe(0.1)
+    outcomes.labels(status="ok").inc()
+    assert await ctl.adjust() == 3
+    await asyncio.sleep(0.01)
+    # без ack: третье сообщение пришло только потому, что вырос prefetch
+    assert len(held) == 3
+    await broker.close()
@@ -0,0 +1,62 @@
+import asyncio
+import pytest
+from music_adapter.core.cache import DiskCache, LRUCache
+from music_adapter.core.idempotency import DONE, IN_PROGRESS, NEW, IdempotencyStore
+
+@pytest.mark.asyncio
+async def test_duplicate_in_progress_waits_for_result():
+    store = IdempotencyStore(LRUCache(10, ttl=60))
+    assert await store.begin("e1") == (NEW, None)
+    state, fut = await store.begin("e1")
+    assert state == IN_PROGRESS
+    await store.complete("e1", {"id": "e1", "artifact_url": "u"})
+    assert (await asyncio.wait_for(fut, 1))["artifact_url"] == "u"
+    assert await store.begin("e1") == (DONE, {"id": "e1", "artifact_url": "u"})
+
+@pytest.mark.asyncio
+async def test_abandoned_event_is_processed_again():
+    store = IdempotencyStore(LRUCache(10, ttl=60))
+    await store.begin("e1")
+    _, fut = await store.begin("e1")
+    store.abandon("e1")
+    assert await fut is None
+    assert await store.begin("e1") == (NEW, None)
+
+@pytest.mark.asyncio
+async def test_dedup_survives_restart_with_sqlite(tmp_path):
+    path = str(tmp_path / "idem.db")
+    store = IdempotencyStore(LRUCache(10, ttl=60), DiskCache(path, ttl=60))
+    await store.begin("e1")
+    await store.complete("e1", {"id": "e1", "artifact_url": "u"})
+    store.close()
+    restarted = IdempotencyStore(LRUCache(10, ttl=60), DiskCache(path, ttl=60))
+    assert await restarted.begin("e1") == (DONE, {"id": "e1", "artifact_url": "u"})
+    assert await restarted.begin("e2") == (NEW, None)
+    restarted.close()
+
+@pytest.mark.asyncio
+async def test_abandon_after_complete_keeps_result():
+    store = IdempotencyStore(LRUCache(10, ttl=60))
+    await store.begin("e1")
+    await store.complete("e1", {"id": "e1", "artifact_url": "u"})
+    store.abandon("e1")
+    assert await store.begin("e1") == (DONE, {"id": "e1", "artifact_url": "u"})
+
+@pytest.mark.asyncio
+async def test_cancelled_begin_releases_pending_entry(tmp_path):
+    store = IdempotencyStore(LRUCache(10, ttl=60), DiskCache(str(tmp_path / "idem.db"), ttl=60))
+    release = asyncio.Event()
+
+    async def slow_get(key):
+        await release.wait()
+
+    store._disk.get = slow_get
+    task = asyncio.create_task(store.begin("e1"))
+    await asyncio.sleep(0)
+    state, fut = await store.begin("e1")
+    assert state == IN_PROGRESS
+    task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await task
+    assert await asyncio.wait_for(fut, 1) is None
+    store.close()
@@ -0,0 +1,24 @@
+import asyncio
+import time
+import pytest
+from prometheus_client import REGISTRY
+from music_adapter.core.instrumentation import LoopLagMonitor, stage_timer
+
+def _sample(name, labels=None):
+    return REGISTRY.get_sample_value(name, labels or {}) or 0.0
+
+def test_stage_timer_observes_histogram():
+    before = _sample("adapter_stage_duration_seconds_count", {"stage": "test_stage"})
+    with stage_timer("test_stage"):
+        pass
+    assert _sample("adapter_stage_duration_seconds_count", {"stage": "test_stage"}) == before + 1
+
+@pytest.mark.asyncio
+async def test_loop_lag_monitor_detects_blocking():
+    before = _sample("adapter_event_loop_lag_seconds_sum")
+    task = asyncio.ensure_future(LoopLagMonitor(interval=0.01, warn_threshold=10).run())
+    await asyncio.sleep(0)
+    time.sleep(0.1)  # блокируем loop
+    await asyncio.sleep(0.05)
+    task.cancel()
+    assert _sample("adapter_event_loop_lag_seconds_sum") - before >= 0.05
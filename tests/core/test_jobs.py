@@ -0,0 +1,72 @@
+import pytest
+from music_adapter.core.jobs import JobTracker, PendingJobStore
+
+EVENT = {"id": "e1", "meta": {}}
+
+def _tracker(tmp_path, poll_result=None, timeout=3600.0):
+    completed = []
+    async def complete(event, result):
+        completed.append((event["id"], result))
+    async def poll(job_id):
+        return poll_result or {"status": "running"}
+    store = PendingJobStore(str(tmp_path / "jobs.db"))
+    tracker = JobTracker(store, complete, poll, poll_interval=1, poll_after=0, timeout=timeout)
+    return tracker, store, completed
+
+@pytest.mark.asyncio
+async def test_webhook_completes_job_once(tmp_path):
+    tracker, store, completed = _tracker(tmp_path)
+    await tracker.park("j1", EVENT)
+    assert await tracker.resolve("j1", {"status": "done", "url": "u"}, source="webhook")
+    assert not await tracker.resolve("j1", {"status": "done", "url": "u"}, source="webhook")
+    assert completed == [("e1", {"status": "done", "url": "u"})]
+    assert await store.count() == 0
+    tracker.close()
+
+@pytest.mark.asyncio
+async def test_sweep_publishes_recorded_and_polled_results(tmp_path):
+    tracker, store, completed = _tracker(tmp_path, poll_result={"status": "done", "url": "p"})
+    await tracker.park("j1", EVENT)
+    await tracker.park("j2", {"id": "e2", "meta": {}})
+    # результат, записанный webhook'ом в другом процессе
+    assert await store.record_result("j1", {"status": "done", "url": "w"})
+    await tracker.sweep()
+    assert sorted(completed) == [("e1", {"status": "done", "url": "w"}), ("e2", {"status": "done", "url": "p"})]
+    tracker.close()
+
+@pytest.mark.asyncio
+async def test_failed_completion_is_kept_for_retry(tmp_path):
+    store = PendingJobStore(str(tmp_path / "jobs.db"))
+    async def complete(event, result):
+        raise RuntimeError("broker down")
+    async def poll(job_id):
+        return {}
+    tracker = JobTracker(store, complete, poll, poll_interval=1, poll_after=3600, timeout=3600)
+    await tracker.park("j1", EVENT)
+    with pytest.raises(RuntimeError):
+        await tracker.resolve("j1", {"status": "done", "url": "u"}, source="webhook")
+    assert await store.with_results() == ["j1"]
+    tracker.close()
+
+@pytest.mark.asyncio
+async def test_timed_out_job_fails(tmp_path):
+    tracker, store, completed = _tracker(tmp_path, timeout=-1)
+    await tracker.park("j1", EVENT)
+    await tracker.sweep()
+    assert completed[0][1]["status"] == "failed"
+    tracker.close()
+
+@pytest.mark.asyncio
+async def test_failed_completion_keeps_submission_time(tmp_path):
+    store = PendingJobStore(str(tmp_path / "jobs.db"))
+    async def complete(event, result):
+        raise RuntimeError("broker down")
+    async def poll(job_id):
+        return {}
+    tracker = JobTracker(store, complete, poll, poll_interval=1, poll_after=3600, timeout=3600)
+    await store.add("j1", EVENT, submitted_at=1000.0)
+    with pytest.raises(RuntimeError):
+        await tracker.resolve("j1", {"status": "done", "url": "u"}, source="webhook")
+    # неудачная публикация не перезапускает отсчёт JOB_TIMEOUT
+    assert (await store.take("j1"))[2] == 1000.0
+    tracker.close()
@@ -0,0 +1,41 @@
+import asyncio
+import pytest
+from music_adapter.core.lanes import LaneScheduler, parse_lane_map
+
+def test_parse_lane_map():
+    assert parse_lane_map(" image:8, mp4:2 ,") == {"image": "8", "mp4": "2"}
+    with pytest.raises(ValueError):
+        parse_lane_map("image")
+
+@pytest.mark.asyncio
+async def test_lane_borrows_idle_capacity():
+    s = LaneScheduler({"image": 1, "mp4": 2}, {"image": 1})
+    own = await s.acquire("image")
+    borrowed = await s.acquire("image")
+    assert own == "" and borrowed == "mp4"
+    # лимит заимствования исчерпан — третий ждёт
+    third = asyncio.ensure_future(s.acquire("image"))
+    await asyncio.sleep(0.01)
+    assert not third.done()
+    # у mp4 остался один свой слот
+    assert await s.acquire("mp4") == ""
+    await s.release("image", own)
+    assert await asyncio.wait_for(third, 1) == ""
+    await s.release("image", borrowed)
+    assert s.in_use("image") == 1
+
+@pytest.mark.asyncio
+async def test_no_borrowing_from_lane_with_waiters():
+    s = LaneScheduler({"image": 1, "mp4": 1}, {"mp4": 1})
+    image = await s.acquire("image")
+    mp4 = await s.acquire("mp4")
+    waiting_mp4 = asyncio.ensure_future(s.acquire("mp4"))
+    await asyncio.sleep(0.01)
+    waiting_image = asyncio.ensure_future(s.acquire("image"))
+    await asyncio.sleep(0.01)
+    # освободившийся слот image достаётся своему lane'у, а не mp4 взаймы
+    await s.release("image", image)
+    assert await asyncio.wait_for(waiting_image, 1) == ""
+    assert not waiting_mp4.done()
+    await s.release("mp4", mp4)
+    assert await asyncio.wait_for(waiting_mp4, 1) == ""
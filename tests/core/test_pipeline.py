@@ -0,0 +1,51 @@
+import pytest
+import asyncio
+from music_adapter.core.pipeline import Done, Pipeline, Stage
+
+async def _double(x):
+    return x * 2
+
+async def _inc(x):
+    if x == 6:
+        raise ValueError("bad item")
+    return x + 1
+
+@pytest.mark.asyncio
+async def test_pipeline_runs_stages_in_order():
+    p = Pipeline([Stage("double", _double, 2, 4), Stage("inc", _inc, 2, 4)])
+    p.start()
+    res = await asyncio.gather(*(p.submit(i) for i in (0, 1, 3)), return_exceptions=True)
+    await p.stop(timeout=1)
+    assert res[0] == 1 and res[1] == 3
+    # ошибка стадии достаётся только своему вызывающему
+    assert isinstance(res[2], ValueError)
+
+@pytest.mark.asyncio
+async def test_backpressure_blocks_submit():
+    release = asyncio.Event()
+    async def slow(x):
+        await release.wait()
+        return x
+    p = Pipeline([Stage("slow", slow, 1, 1)])
+    p.start()
+    first = asyncio.ensure_future(p.submit(1))   # в работе у воркера
+    second = asyncio.ensure_future(p.submit(2))  # занимает очередь
+    third = asyncio.ensure_future(p.submit(3))   # ждёт места в очереди
+    await asyncio.sleep(0.01)
+    assert p.stages[0].busy == 1
+    assert p.stages[0].queue.full()
+    assert not third.done()
+    release.set()
+    assert await asyncio.gather(first, second, third) == [1, 2, 3]
+    await p.stop(timeout=1)
+
+
+@pytest.mark.asyncio
+async def test_done_skips_remaining_stages():
+    async def short_circuit(x):
+        return Done(-x) if x < 0 else x
+    p = Pipeline([Stage("check", short_circuit, 1, 2), Stage("double", _double, 1, 2)])
+    p.start()
+    assert await p.submit(-5) == 5
+    assert await p.submit(5) == 10
+    await p.stop(timeout=1)
@@ -0,0 +1,22 @@
+import threading
+import time
+from music_adapter.core.profiler import sample_stacks, to_folded
+
+def _busy_worker(stop):
+    while not stop.is_set():
+        sum(range(1000))
+
+def test_sample_stacks_sees_other_threads():
+    stop = threading.Event()
+    t = threading.Thread(target=_busy_worker, args=(stop,), name="busy")
+    t.start()
+    try:
+        counts = sample_stacks(0.1, interval=0.005)
+    finally:
+        stop.set()
+        t.join()
+    busy = [stack for stack in counts if stack.startswith("busy;")]
+    assert busy and any("_busy_worker" in stack for stack in busy)
+    line = to_folded(counts).splitlines()[0]
+    stack, count = line.rsplit(" ", 1)
+    assert int(count) >= 1 and ";" in stack
@@ -0,0 +1,82 @@
+import asyncio
+import pytest
+from aiohttp import ClientConnectionError, ClientResponseError
+from aiohttp.client_reqrep import RequestInfo
+from yarl import URL
+from music_adapter.broker.memory import MemoryBroker
+from music_adapter.clients.circuit import CircuitOpenError
+from music_adapter.core.retry import (
+    ATTEMPT_HEADER, REASON_HEADER, RetryScheduler, is_retryable, parse_retry_delays, tier_name
+)
+
+def _http_error(status):
+    info = RequestInfo(URL("http://svc/generate"), "POST", {}, URL("http://svc/generate"))
+    return ClientResponseError(info, (), status=status)
+
+def test_parse_retry_delays():
+    assert parse_retry_delays("5, 30,120") == [5.0, 30.0, 120.0]
+    assert tier_name("raw", 0.5) == "raw.retry.500ms"
+    for bad in ("", "5,x", "0"):
+        with pytest.raises(ValueError):
+            parse_retry_delays(bad)
+
+def test_only_transient_errors_are_retryable():
+    assert is_retryable(_http_error(503))
+    assert is_retryable(_http_error(429))
+    assert is_retryable(ClientConnectionError())
+    assert is_retryable(asyncio.TimeoutError())
+    assert is_retryable(CircuitOpenError("open"))
+    assert not is_retryable(_http_error(400))
+    assert not is_retryable(ValueError("invalid event"))
+
+@pytest.mark.asyncio
+async def test_failed_event_comes_back_until_attempts_exhausted():
+    broker = MemoryBroker()
+    await broker.connect()
+    retry = RetryScheduler(broker, [0.01, 0.02], max_attempts=2)
+    attempts = []
+
+    async def handler(msg):
+        attempts.append(msg.headers.get(ATTEMPT_HEADER, 0))
+        await retry.handle_failure(msg, "in", _http_error(503))
+        await msg.ack()
+
+    await broker.subscribe("in", handler)
+    broker.inject("in", b'{"id": "e1"}', headers={"correlation_id": "e1"})
+    await asyncio.sleep(0.15)
+    assert attempts == [0, 1, 2]
+    [dead] = broker.published("dlq")
+    assert dead.body == b'{"id": "e1"}'
+    assert dead.headers[ATTEMPT_HEADER] == 2 and dead.headers["correlation_id"] == "e1"
+    assert "ClientResponseError" in dead.headers[REASON_HEADER]
+    await broker.close()
+
+@pytest.mark.asyncio
+async def test_permanent_error_goes_to_dlq_at_once():
+    broker = MemoryBroker()
+    await broker.connect()
+    retry = RetryScheduler(broker, [0.01], max_attempts=3)
+    msg = broker.inject("in", b"{}")
+    assert not await retry.handle_failure(msg, "in", ValueError("'text' is a required property"))
+    [dead] = broker.published("dlq")
+    assert dead.headers[REASON_HEADER] == "ValueError: 'text' is a required property"
+    assert ATTEMPT_HEADER not in dead.headers
+    await broker.close()
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("delayed_retry, expected", [(True, 0), (False, 3)])
+async def test_request_retries_follow_active_scheduler(monkeypatch, delayed_retry, expected):
+    from music_adapter import main
+    from music_adapter.clients import http_client
+    monkeypatch.setattr(main.settings, "BROKER_BACKEND", "memory")
+    monkeypatch.setattr(main.settings, "RETRY_ENABLED", True)
+    # без очередей задержки (Kafka) RETRY_ENABLED игнорируется — повторы остаются в обработчике
+    monkeypatch.setattr(MemoryBroker, "delayed_retry", delayed_retry)
+    monkeypatch.setattr(http_client, "_request_retries", http_client.REQUEST_RETRIES)
+    adapter = main.MusicAdapter(serve_health=False)
+    await adapter.open()
+    try:
+        assert (adapter.retry is not None) is delayed_retry
+        assert http_client._request_retries == expected
+    finally:
+        await adapter.shutdown()
@@ -1,5 +1,7 @@
 import pytest
-from music_adapter.core.schema_validator import validate_event
+from music_adapter.core.schema_validator import (
+    validate_event, validate_many, compile_fast_path, _load_schema
+)
 from jsonschema import ValidationError
 
 valid = {
@@ -22,4 +24,22 @@ def test_validate_event_ok():
 
 def test_validate_event_fail():
     with pytest.raises(ValueError):
-        validate_event(invalid)
\ No newline at end of file
+        validate_event(invalid)
+
+def test_validate_many_per_item_errors():
+    errors = validate_many([valid, invalid, valid])
+    assert errors[0] is None
+    assert "Schema validation error" in errors[1]
+    assert errors[2] is None
+
+def test_fast_path_matches_jsonschema():
+    check = compile_fast_path(_load_schema())
+    assert check is not None
+    assert check(valid)
+    assert not check(invalid)
+    # bool не является number, как и в jsonschema
+    assert not check({**valid, "length": True})
+    assert not check({**valid, "authors": ["A", 1]})
+
+def test_fast_path_unsupported_schema():
+    assert compile_fast_path({"type": "string", "minLength": 1}) is None
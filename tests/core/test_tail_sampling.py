@@ -0,0 +1,91 @@
+import pytest
+from opentelemetry import trace
+from opentelemetry.sdk.trace import TracerProvider
+from opentelemetry.sdk.trace.export import SimpleSpanProcessor
+from opentelemetry.sdk.trace.export.in_memory_span_exporter import InMemorySpanExporter
+from opentelemetry.trace import Status, StatusCode
+from music_adapter.core.tail_sampling import TailSamplingProcessor
+
+@pytest.fixture
+def exported():
+    return InMemorySpanExporter()
+
+def _tracer(exported, **kwargs):
+    kwargs.setdefault("sample_rate", 0.0)
+    kwargs.setdefault("latency_threshold", 60.0)
+    processor = TailSamplingProcessor(SimpleSpanProcessor(exported), **kwargs)
+    provider = TracerProvider(shutdown_on_exit=False)
+    provider.add_span_processor(processor)
+    return provider.get_tracer("test"), processor
+
+def _event(tracer, fail=False, end_time=None):
+    root = tracer.start_span("handle_message", start_time=0 if end_time else None)
+    with tracer.start_as_current_span("HTTP POST preprocessor", context=trace.set_span_in_context(root)):
+        pass
+    if fail:
+        root.set_status(Status(StatusCode.ERROR, "boom"))
+    root.end(end_time=end_time)
+    return root
+
+def _names(exported):
+    return [span.name for span in exported.get_finished_spans()]
+
+def test_keeps_errors_and_slow_traces_whole(exported):
+    tracer, _ = _tracer(exported, latency_threshold=1.0)
+    _event(tracer)
+    assert _names(exported) == []
+    _event(tracer, fail=True)
+    assert _names(exported) == ["HTTP POST preprocessor", "handle_message"]
+    exported.clear()
+    _event(tracer, end_time=int(1.5e9))
+    assert _names(exported) == ["HTTP POST preprocessor", "handle_message"]
+
+def test_error_in_child_span_keeps_trace(exported):
+    tracer, _ = _tracer(exported)
+    with tracer.start_as_current_span("handle_message"):
+        with pytest.raises(RuntimeError):
+            with tracer.start_as_current_span("HTTP POST generator"):
+                raise RuntimeError("503")
+    assert _names(exported) == ["HTTP POST generator", "handle_message"]
+
+def test_sample_rate_is_deterministic_by_trace_id(exported):
+    tracer, processor = _tracer(exported, sample_rate=0.25)
+    roots = [_event(tracer) for _ in range(2000)]
+    kept = {span.context.trace_id for span in exported.get_finished_spans()}
+    assert 350 < len(kept) < 650
+    assert kept == {
+        root.context.trace_id for root in roots
+        if (root.context.trace_id & ((1 << 64) - 1)) < processor._sample_bound
+    }
+
+def test_buffer_is_bounded_and_late_spans_follow_decision(exported):
+    tracer, processor = _tracer(exported, max_spans=3)
+    roots = [tracer.start_span("handle_message") for _ in range(3)]
+    for root in roots:
+        tracer.start_span("child", context=trace.set_span_in_context(root)).end()
+    failed = tracer.start_span("child", context=trace.set_span_in_context(roots[0]))
+    failed.set_status(Status(StatusCode.ERROR))
+    failed.end()
+    # четыре спана при лимите в три: вытеснена самая старая трасса, с ошибкой — в экспорт
+    assert processor._buffered == 2
+    assert [span.context.trace_id for span in exported.get_finished_spans()] == [roots[0].context.trace_id] * 2
+    roots[0].end()
+    assert len(exported.get_finished_spans()) == 3
+    roots[1].end()
+    tracer.start_span("late", context=trace.set_span_in_context(roots[1])).end()
+    assert len(exported.get_finished_spans()) == 3 and processor._buffered == 1
+
+def test_expired_traces_are_dropped_and_shutdown_flushes_errors(exported):
+    tracer, processor = _tracer(exported, ttl=0.0)
+    stuck = tracer.start_span("handle_message")
+    tracer.start_span("child", context=trace.set_span_in_context(stuck)).end()
+    _event(tracer)
+    assert processor._buffered == 0 and _names(exported) == []
+
+    tracer, processor = _tracer(exported)
+    open_root = tracer.start_span("handle_message")
+    child = tracer.start_span("child", context=trace.set_span_in_context(open_root))
+    child.set_status(Status(StatusCode.ERROR))
+    child.end()
+    processor.shutdown()
+    assert _names(exported) == ["child"]
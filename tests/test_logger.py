@@ -0,0 +1,68 @@
+import io
+import json
+import logging
+import queue
+from opentelemetry import trace
+from opentelemetry.trace import NonRecordingSpan, SpanContext
+from music_adapter.config.settings import get_settings
+from music_adapter.logger import (
+    LOG_DROPPED, BoundedQueueHandler, DrainingQueueListener, EventSampler, JsonFormatter, init_logger, stop_logging
+)
+
+def _record(level=logging.INFO, **extra):
+    record = logging.LogRecord("music_adapter.test", level, __file__, 1, "Event %s done", ("e1",), None)
+    for key, value in extra.items():
+        setattr(record, key, value)
+    return record
+
+def test_json_record_with_trace_and_extra():
+    handler = BoundedQueueHandler(queue.Queue())
+    span = NonRecordingSpan(SpanContext(trace_id=0xABC, span_id=0xDEF, is_remote=False))
+    with trace.use_span(span):
+        record = handler.prepare(_record(event_id="e1"))
+    data = json.loads(JsonFormatter().format(record))
+    assert data["message"] == "Event e1 done"
+    assert data["event_id"] == "e1"
+    assert data["trace_id"] == format(0xABC, "032x") and data["span_id"] == format(0xDEF, "016x")
+    assert data["level"] == "INFO" and data["logger"] == "music_adapter.test"
+
+def test_full_buffer_drops_instead_of_blocking():
+    handler = BoundedQueueHandler(queue.Queue(maxsize=1))
+    before = LOG_DROPPED.labels(reason="overflow")._value.get()
+    handler.handle(_record())
+    handler.handle(_record())
+    assert LOG_DROPPED.labels(reason="overflow")._value.get() == before + 1
+
+def test_stop_with_full_buffer_drains_it():
+    records = queue.Queue(maxsize=2)
+    stream = io.StringIO()
+    handler = BoundedQueueHandler(records)
+    handler.handle(_record())
+    handler.handle(_record())
+    listener = DrainingQueueListener(records, logging.StreamHandler(stream))
+    listener.start()
+    listener.stop()
+    assert stream.getvalue().count("Event e1 done") == 2
+
+def test_sampler_keeps_warnings_and_non_event_records():
+    sampler = EventSampler(0.0)
+    assert not sampler.filter(_record(event_id="e1"))
+    assert sampler.filter(_record(logging.WARNING, event_id="e1"))
+    assert sampler.filter(_record())
+    assert EventSampler(1.0).filter(_record(event_id="e1"))
+
+def test_init_logger_writes_json_from_background_thread(monkeypatch):
+    monkeypatch.setattr(get_settings(), "LOG_FORMAT", "json")
+    stream = io.StringIO()
+    logger = init_logger("music_adapter_test_logger", stream=stream)
+    logger.info("hello %s", "world", extra={"event_id": "e2"})
+    stop_logging()
+    line = json.loads(stream.getvalue().strip())
+    assert line["message"] == "hello world" and line["event_id"] == "e2"
+
+def test_stop_logging_drains_every_logger():
+    first, second = io.StringIO(), io.StringIO()
+    init_logger("music_adapter_test_first", stream=first).warning("one")
+    init_logger("music_adapter_test_second", stream=second).warning("two")
+    stop_logging()
+    assert "one" in first.getvalue() and "two" in second.getvalue()
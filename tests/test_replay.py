@@ -0,0 +1,121 @@
+import asyncio
+import datetime
+import json
+import pytest
+from music_adapter.broker.memory import MemoryBroker
+from music_adapter.core.retry import ATTEMPT_HEADER, FAILED_AT_HEADER, REASON_HEADER, error_reason
+from music_adapter.replay import (
+    RUN_HEADER, Checkpoint, DLQReplayer, ReplayFilter, failed_at, parse_time
+)
+
+async def _dlq_contents(broker):
+    batch = await broker.consume_batch("dlq", 100, 0.01)
+    for msg in batch:
+        await msg.ack()
+    return batch
+
+def _inject(broker, body, reason, at=1_700_000_000.0, **headers):
+    return broker.inject("dlq", body, {REASON_HEADER: reason, FAILED_AT_HEADER: at, **headers})
+
+def _replayer(broker, process, replay_filter=None, **kwargs):
+    kwargs.setdefault("idle_timeout", 0.05)
+    return DLQReplayer(broker, process, replay_filter or ReplayFilter(), **kwargs)
+
+def test_filter_by_reason_and_time():
+    assert parse_time("2023-11-14T22:13:20Z") == 1_700_000_000.0
+    since = ReplayFilter("Connector|5\\d\\d", since=parse_time("2023-11-14T22:00:00"))
+    assert since.matches({REASON_HEADER: "ClientConnectorError: refused", FAILED_AT_HEADER: 1_700_000_000.0})
+    assert not since.matches({REASON_HEADER: "ValueError: bad event", FAILED_AT_HEADER: 1_700_000_000.0})
+    assert not since.matches({REASON_HEADER: "ClientConnectorError", FAILED_AT_HEADER: 1_600_000_000.0})
+    # время неизвестно — под фильтр по времени не подходит
+    assert not since.matches({REASON_HEADER: "ClientConnectorError"})
+    assert ReplayFilter().matches({})
+    assert failed_at({"x-death": [{"time": datetime.datetime(2023, 11, 14, 22, 13, 20)}]}) == 1_700_000_000.0
+
+@pytest.mark.asyncio
+async def test_replays_matching_and_keeps_the_rest_in_dlq():
+    broker = MemoryBroker()
+    _inject(broker, b"e1", "ClientConnectorError: refused", **{ATTEMPT_HEADER: 3})
+    _inject(broker, b"e2", "ValueError: bad event")
+    _inject(broker, b"e3", "ClientConnectorError: refused")
+    replayed = []
+
+    async def process(msg):
+        replayed.append((msg.body, msg.headers.get(ATTEMPT_HEADER)))
+        await msg.ack()
+
+    state = await _replayer(broker, process, ReplayFilter("Connector")).run()
+    assert replayed == [(b"e1", None), (b"e3", None)]
+    assert state["stats"]["ok"] == 2 and state["stats"]["skipped"] == 1 and state["done"]
+    left = await _dlq_contents(broker)
+    assert [m.body for m in left] == [b"e2"]
+    assert left[0].headers[RUN_HEADER] == state["run_id"]
+
+@pytest.mark.asyncio
+async def test_failed_replay_goes_back_once_and_run_ends():
+    broker = MemoryBroker()
+    _inject(broker, b"e1", "TimeoutError")
+    calls = []
+
+    async def process(msg):
+        calls.append(msg.body)
+        await msg.reject(requeue=False)
+
+    state = await _replayer(broker, process, parallel=2).run()
+    await asyncio.sleep(0)
+    assert calls == [b"e1"]
+    assert state["stats"]["failed"] == 1
+    [back] = await _dlq_contents(broker)
+    assert back.body == b"e1" and back.headers[RUN_HEADER] == state["run_id"]
+
+@pytest.mark.asyncio
+async def test_dry_run_counts_reasons_without_processing():
+    broker = MemoryBroker()
+    for reason in ("ClientConnectorError: a", "ClientConnectorError: b", "ValueError: c"):
+        _inject(broker, b"e", reason)
+
+    async def process(msg):
+        raise AssertionError("dry run must not process")
+
+    state = await _replayer(broker, process, dry_run=True).run()
+    assert state["stats"]["reasons"] == {"ClientConnectorError": 2, "ValueError": 1}
+    assert len(await _dlq_contents(broker)) == 3
+
+@pytest.mark.asyncio
+async def test_resume_from_checkpoint(tmp_path):
+    path = str(tmp_path / "replay.json")
+    broker = MemoryBroker()
+    for i in range(4):
+        _inject(broker, f"e{i}".encode(), "ClientConnectorError")
+    replayed = []
+
+    async def process(msg):
+        replayed.append(msg.body)
+        await msg.ack()
+
+    first = await _replayer(broker, process, max_events=2, checkpoint=Checkpoint(path)).run()
+    assert not first["done"] and len(replayed) == 2
+    saved = Checkpoint(path).load()
+    assert saved["run_id"] == first["run_id"] and saved["stats"]["ok"] == 2
+
+    second = await _replayer(
+        broker, process, run_id=saved["run_id"], checkpoint=Checkpoint(path), stats=saved["stats"]
+    ).run()
+    assert sorted(replayed) == [b"e0", b"e1", b"e2", b"e3"]
+    assert second["done"] and second["stats"]["ok"] == 4
+    with open(path) as f:
+        assert json.load(f)["done"]
+
+@pytest.mark.asyncio
+async def test_failed_replay_records_new_reason():
+    broker = MemoryBroker()
+    _inject(broker, b"e1", "ClientConnectorError: refused")
+
+    async def process(msg):
+        # как MusicAdapter.process: причина неудачи — в reject
+        await msg.reject(requeue=False, reason=error_reason(ValueError("bad event")))
+
+    await _replayer(broker, process).run()
+    [back] = await _dlq_contents(broker)
+    assert back.headers[REASON_HEADER] == "ValueError: bad event"
+    assert not ReplayFilter("Connector").matches(back.headers)
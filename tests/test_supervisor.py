@@ -0,0 +1,59 @@
+import os
+import json
+import pytest
+from music_adapter import supervisor
+from music_adapter.supervisor import Supervisor, prepare_multiprocess_dir
+
+class FakeProcess:
+    def __init__(self, pid, alive):
+        self.pid = pid
+        self._alive = alive
+    def is_alive(self):
+        return self._alive
+
+def test_prepare_multiprocess_dir_cleans_stale_files(tmp_path, monkeypatch):
+    (tmp_path / "counter_1.db").write_bytes(b"stale")
+    monkeypatch.setattr(supervisor.settings, "PROMETHEUS_MULTIPROC_DIR", str(tmp_path))
+    monkeypatch.setenv("PROMETHEUS_MULTIPROC_DIR", "")
+    assert prepare_multiprocess_dir() == str(tmp_path)
+    assert os.environ["PROMETHEUS_MULTIPROC_DIR"] == str(tmp_path)
+    assert not (tmp_path / "counter_1.db").exists()
+
+@pytest.mark.asyncio
+async def test_health_reports_all_workers(tmp_path, monkeypatch):
+    monkeypatch.setenv("PROMETHEUS_MULTIPROC_DIR", str(tmp_path))
+    sup = Supervisor(2, target=print)
+    sup._workers[0].process = FakeProcess(10, True)
+    sup._workers[1].process = FakeProcess(11, False)
+    resp = await sup.health(None)
+    body = json.loads(resp.body)
+    assert resp.status == 200
+    assert body["status"] == "degraded"
+    assert [w["alive"] for w in body["workers"]] == [True, False]
+
+    sup._workers[0].process = FakeProcess(10, False)
+    resp = await sup.health(None)
+    assert resp.status == 503
+
+@pytest.mark.asyncio
+async def test_supervisor_app_with_async_jobs(tmp_path, monkeypatch, aiohttp_client):
+    from music_adapter.api.jobs import SIGNATURE_HEADER, sign
+    from music_adapter.core.jobs import PendingJobStore
+    monkeypatch.setenv("PROMETHEUS_MULTIPROC_DIR", str(tmp_path))
+    monkeypatch.setattr(supervisor.settings, "ASYNC_JOBS_ENABLED", True)
+    monkeypatch.setattr(supervisor.settings, "JOB_STORE_PATH", str(tmp_path / "jobs.db"))
+    monkeypatch.setattr(supervisor.settings, "JOB_CALLBACK_SECRET", None)
+    app, store = Supervisor(1, target=print).build_app()
+    # без секрета webhook не поднимается
+    assert "/jobs/callback" not in {r.resource.canonical for r in app.router.routes()}
+    store.close()
+
+    monkeypatch.setattr(supervisor.settings, "JOB_CALLBACK_SECRET", "s3cret")
+    app, store = Supervisor(1, target=print).build_app()
+    await PendingJobStore(str(tmp_path / "jobs.db")).add("j1", {"id": "e1"})
+    client = await aiohttp_client(app)
+    body = json.dumps({"job_id": "j1", "status": "done", "url": "u"}).encode()
+    resp = await client.post("/jobs/callback", data=body, headers={SIGNATURE_HEADER: sign("s3cret", body)})
+    assert resp.status == 200 and (await resp.json())["accepted"]
+    assert await store.with_results() == ["j1"]
+    store.close()